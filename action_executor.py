@@ -0,0 +1,143 @@
+"""
+Asynchronous execution of the engines' actions, decoupled from rule firing.
+
+The action rules run inside ``run()``: in production an action sends commands to the flight
+controller, and a slow or unresponsive actuator would stall inference with it. With an
+``ActionExecutor``, the action rules only enqueue their action, which costs a lock and a loop
+callback, and the executor carries it out on the event loop: coroutine handlers as tasks, plain
+handlers on a thread pool, each attempt with a timeout and failed attempts retried with an
+exponential backoff.
+
+Only the latest decision matters. An action that is still queued when a newer one arrives is
+dropped, and an action in progress is cancelled by a newer action for another overall state (a
+plain handler already running in the thread pool finishes, but its outcome is discarded). A
+repeated decision for the action in progress is ignored.
+
+Usage:
+    executor = ActionExecutor(send_to_flight_controller, timeout=0.5, retries=2)
+    executor.start()
+    engine = DecisionEngine(action_executor=executor)
+"""
+import asyncio
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from instrumentation import Histogram
+
+# Histogram bucket upper bounds of the action latency in seconds, from 1 millisecond to 10 seconds
+ACTION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class ActionExecutor:
+    """
+    Carries out the actions enqueued by the action rules off the inference path.
+
+    Parameters:
+        handler (callable): Called with the action rule name and the overall state to carry out an
+                            action; a coroutine function runs on the event loop, any other
+                            callable on the thread pool.
+        timeout (float): Seconds an attempt may take before it is abandoned.
+        retries (int): Attempts made after a failed or timed out one.
+        backoff (float): Seconds before the first retry, doubled for every further one.
+        max_workers (int): Threads of the pool running plain handlers.
+    """
+    def __init__(self, handler, timeout=1.0, retries=2, backoff=0.05, max_workers=2):
+        self.handler = handler
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.threaded = not asyncio.iscoroutinefunction(handler)
+        self.thread_pool = ThreadPoolExecutor(max_workers, thread_name_prefix="action") if self.threaded else None
+        self.loop = None
+        self.lock = threading.Lock()
+        self.latest = 0
+        self.task = None
+        self.running_state = None
+        self.counts = Counter()
+        self.latency = {}
+        self.last_error = None
+
+    def start(self):
+        """Binds the executor to the running event loop; must be called before actions are submitted."""
+        self.loop = asyncio.get_running_loop()
+
+    def submit(self, rule_name, state_value):
+        """
+        Enqueues an action. Never blocks, and may be called from any thread, e.g. an engine worker's.
+        Called on the event loop before ``start``, the executor binds to that loop.
+        """
+        if self.loop is None:
+            try:
+                self.loop = asyncio.get_running_loop()
+            except RuntimeError:
+                raise RuntimeError("ActionExecutor.start() must be called on the event loop before actions are submitted") from None
+        with self.lock:
+            self.latest += 1
+            seq = self.latest
+            self.counts["submitted"] += 1
+        self.loop.call_soon_threadsafe(self._dispatch, seq, rule_name, state_value, time.perf_counter())
+
+    def _dispatch(self, seq, rule_name, state_value, submitted_at):
+        if seq != self.latest:
+            # A newer action was submitted before this one could start
+            self.counts["superseded"] += 1
+            return
+        if self.task is not None and not self.task.done():
+            if state_value == self.running_state:
+                self.counts["duplicate"] += 1
+                return
+            self.task.cancel()
+            self.counts["superseded"] += 1
+        self.running_state = state_value
+        self.task = self.loop.create_task(self._execute(rule_name, state_value, submitted_at))
+
+    async def _execute(self, rule_name, state_value, submitted_at):
+        for attempt in range(self.retries + 1):
+            if attempt:
+                self.counts["retried"] += 1
+                await asyncio.sleep(self.backoff * 2 ** (attempt - 1))
+            try:
+                await asyncio.wait_for(self._call(rule_name, state_value), self.timeout)
+            except asyncio.TimeoutError:
+                self.counts["timed_out"] += 1
+                self.last_error = f"{rule_name} timed out after {self.timeout} s"
+            except Exception as error:
+                self.counts["errors"] += 1
+                self.last_error = f"{rule_name}: {error!r}"
+            else:
+                self.counts["completed"] += 1
+                histogram = self.latency.get(rule_name)
+                if histogram is None:
+                    histogram = self.latency[rule_name] = Histogram(ACTION_BUCKETS)
+                histogram.observe(time.perf_counter() - submitted_at)
+                return
+        self.counts["failed"] += 1
+
+    def _call(self, rule_name, state_value):
+        if self.threaded:
+            return self.loop.run_in_executor(self.thread_pool, self.handler, rule_name, state_value)
+        return self.handler(rule_name, state_value)
+
+    async def drain(self):
+        """Waits until the latest action has been carried out or has failed."""
+        # Let the dispatch callbacks of the actions submitted so far run first
+        await asyncio.sleep(0)
+        if self.task is not None:
+            await asyncio.gather(self.task, return_exceptions=True)
+
+    def stats(self):
+        """Returns the action counts and the latency histogram of every action, from submission to completion."""
+        return {
+            **{name: self.counts[name] for name in
+               ("submitted", "completed", "superseded", "duplicate", "retried", "timed_out", "errors", "failed")},
+            "latency": {rule_name: histogram.snapshot() for rule_name, histogram in self.latency.items()},
+            "last_error": self.last_error,
+        }
+
+    async def stop(self):
+        """Carries out the latest action, then shuts the thread pool down."""
+        await self.drain()
+        if self.thread_pool is not None:
+            self.thread_pool.shutdown(wait=False)
@@ -0,0 +1,170 @@
+"""
+Windowed aggregation and hysteresis of provider readings, before they reach a decision engine.
+
+Noisy readings close to a band boundary make the state rules flap, and every flap costs a full
+update and run of the engine. ``AggregationStage`` smooths the readings of every drone and use
+case with an O(1) statistic (EWMA, windowed mean or windowed max over a ring buffer) and
+classifies the smoothed value with hysteresis: the band only changes once the value is beyond
+the boundary by the configured margin. A payload is forwarded, with the smoothed value, only
+when the band changes, so the engine is evaluated once per decision instead of once per reading.
+
+The statistic and margin of each use case come from the ``aggregation`` settings of its spec in
+``use_cases/<use_case>.json``, e.g. ``{"statistic": "ewma", "alpha": 0.3, "hysteresis": 0.05}``,
+and can be overridden per stage.
+
+Usage:
+    stage = AggregationStage(engine)
+    provider.add_listener(stage)
+"""
+import collections
+
+from decision_table import SPECS
+from events import Reading, drone_of
+
+
+class Ewma:
+    """Exponentially weighted moving average; ``alpha`` is the weight of the newest value."""
+    def __init__(self, alpha=0.3):
+        if not 0 < alpha <= 1:
+            raise ValueError("alpha must be in (0, 1]")
+        self.alpha = alpha
+        self.value = None
+
+    def update(self, value):
+        self.value = value if self.value is None else self.value + self.alpha * (value - self.value)
+        return self.value
+
+
+class WindowMean:
+    """Mean of the last ``window`` values, kept with a ring buffer and a running sum."""
+    def __init__(self, window=5):
+        self.values = collections.deque(maxlen=window)
+        self.total = 0.0
+
+    def update(self, value):
+        if len(self.values) == self.values.maxlen:
+            self.total -= self.values[0]
+        self.values.append(value)
+        self.total += value
+        return self.total / len(self.values)
+
+
+class WindowMax:
+    """Maximum of the last ``window`` values, kept with a monotonic queue (amortized O(1))."""
+    def __init__(self, window=5):
+        self.window = window
+        self.candidates = collections.deque()  # (index, value) with decreasing values
+        self.index = 0
+
+    def update(self, value):
+        while self.candidates and self.candidates[-1][1] <= value:
+            self.candidates.pop()
+        self.candidates.append((self.index, value))
+        if self.candidates[0][0] <= self.index - self.window:
+            self.candidates.popleft()
+        self.index += 1
+        return self.candidates[0][1]
+
+
+class Raw:
+    """No smoothing, for readings that are already steady, such as the battery level."""
+    def update(self, value):
+        return value
+
+
+STATISTICS = {
+    "ewma": lambda settings: Ewma(settings.get("alpha", 0.3)),
+    "mean": lambda settings: WindowMean(settings.get("window", 5)),
+    "max": lambda settings: WindowMax(settings.get("window", 5)),
+    "raw": lambda settings: Raw(),
+}
+
+
+class HysteresisClassifier:
+    """
+    Classifies values into the bands of a use case spec, keeping the current band until the value
+    is more than ``margin`` beyond one of its bounds.
+    """
+    def __init__(self, spec, margin=0.0):
+        self.spec = spec
+        self.margin = margin
+        self.band = None
+
+    def update(self, value):
+        """Returns the state of the band the value is classified into."""
+        bounds = self.spec.bounds
+        if self.band is None:
+            self.band = self.spec.band_index(value)
+        else:
+            # Move one band at a time while the value is clearly beyond the current band's bounds
+            while self.band < len(bounds) and value > bounds[self.band] + self.margin:
+                self.band += 1
+            while self.band > 0 and value <= bounds[self.band - 1] - self.margin:
+                self.band -= 1
+        return self.spec.states[self.band]
+
+
+class AggregationStage:
+    """
+    Listener smoothing the readings of every drone and use case and forwarding a payload to the
+    next listener only when the smoothed value moves to another band.
+
+    Payloads of use cases without a spec are forwarded unchanged.
+
+    Parameters:
+        listener: The next listener, e.g. a DecisionEngine.
+        settings (dict): Per use case overrides of the spec ``aggregation`` settings.
+        specs (dict): Use case specs, keyed by use case.
+    """
+    def __init__(self, listener, settings=None, specs=None):
+        self.listener = listener
+        self.specs = SPECS if specs is None else specs
+        self.settings = {
+            use_case: {**spec.aggregation, **(settings or {}).get(use_case, {})}
+            for use_case, spec in self.specs.items()
+        }
+        self.channels = {}
+        self.received = 0
+        self.forwarded = 0
+
+    def _channel(self, key, use_case):
+        channel = self.channels.get(key)
+        if channel is None:
+            settings = self.settings[use_case]
+            statistic = settings.get("statistic", "raw")
+            if statistic not in STATISTICS:
+                raise ValueError(f"Unknown statistic '{statistic}', expected one of {sorted(STATISTICS)}")
+            channel = self.channels[key] = (
+                STATISTICS[statistic](settings),
+                HysteresisClassifier(self.specs[use_case], settings.get("hysteresis", 0.0)),
+            )
+        return channel
+
+    async def notify(self, data):
+        self.received += 1
+        typed = isinstance(data, Reading)
+        use_case = data.use_case if typed else data["use_case"]
+        spec = self.specs.get(use_case)
+        if spec is None:
+            self.forwarded += 1
+            await self.listener.notify(data)
+            return
+        statistic, classifier = self._channel((drone_of(data), use_case), use_case)
+        previous_band = classifier.band
+        smoothed = statistic.update(data.value if typed else data[spec.field])
+        classifier.update(smoothed)
+        if classifier.band == previous_band:
+            return
+        self.forwarded += 1
+        if typed:
+            await self.listener.notify(Reading(data.code, smoothed, data.drone_id, data.ts))
+        else:
+            await self.listener.notify({**data, spec.field: smoothed})
+
+    def stats(self):
+        """Returns how many payloads were received, forwarded and held back."""
+        return {
+            "received": self.received,
+            "forwarded": self.forwarded,
+            "suppressed": self.received - self.forwarded,
+        }
@@ -0,0 +1,25 @@
+"""
+Decision engine backends, selectable by name in the runners, tools and benchmarks.
+
+The backend modules are only imported on demand, and this module imports nothing of the
+repository, so tools can list and validate backends without loading an engine.
+"""
+import importlib
+
+# Module of each decision engine backend, by name
+BACKENDS = {
+    "experta": "experta_decision_engine",
+    "clipspy": "clipspy_decision_engine",
+}
+
+
+def check_backend(backend):
+    """Raises a ValueError if ``backend`` is not the name of a backend."""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend '{backend}', expected one of {sorted(BACKENDS)}")
+
+
+def backend_module(backend):
+    """Imports and returns the module of a backend."""
+    check_backend(backend)
+    return importlib.import_module(BACKENDS[backend])
@@ -0,0 +1,70 @@
+import numpy as np
+
+from decision_table import SPECS, STATE_MAP
+
+# Upper bounds (inclusive) of the value bands used by the battery_state_* and
+# sensor_anomaly_state_* rules, in ascending order, and the state value of each band
+BATTERY_PERCENT_THRESHOLDS = np.array(SPECS["battery_status"].bounds, dtype=float)
+BATTERY_STATES = np.array(SPECS["battery_status"].states, dtype=np.int8)
+SENSOR_ANOMALY_CONFIDENCE_THRESHOLDS = np.array(SPECS["sensor_anomaly"].bounds, dtype=float)
+SENSOR_ANOMALY_STATES = np.array(SPECS["sensor_anomaly"].states, dtype=np.int8)
+
+# State descriptions indexed by state value, matching STATE_MAP of the decision engines
+STATE_DESCRIPTIONS = np.array([STATE_MAP[state] for state in sorted(STATE_MAP)])
+
+
+def classify_battery(percent):
+    """
+    Classifies battery percentages into battery state values.
+
+    Parameters:
+        percent (array_like): Remaining battery percentages.
+
+    Returns:
+        numpy.ndarray: State values (0 Normal to 3 Critical), as in the battery_state_* rules:
+                       above 75 is Normal, (50, 75] Mild, (25, 50] Severe and 25 or less Critical.
+    """
+    band = np.digitize(np.asarray(percent, dtype=float), BATTERY_PERCENT_THRESHOLDS, right=True)
+    return BATTERY_STATES[band]
+
+
+def classify_sensor_anomaly(confidence):
+    """
+    Classifies anomaly detection confidence levels into sensor anomaly state values.
+
+    Parameters:
+        confidence (array_like): Anomaly detection confidence levels.
+
+    Returns:
+        numpy.ndarray: State values (0 Normal to 3 Critical), as in the sensor_anomaly_state_* rules:
+                       0.25 or less is Normal, (0.25, 0.5] Mild, (0.5, 0.75] Severe and above 0.75 Critical.
+    """
+    band = np.digitize(np.asarray(confidence, dtype=float), SENSOR_ANOMALY_CONFIDENCE_THRESHOLDS, right=True)
+    return SENSOR_ANOMALY_STATES[band]
+
+
+def classify(percent, confidence):
+    """
+    Evaluates battery, sensor anomaly and overall states for arrays of readings at once.
+
+    This is the vectorized equivalent of declaring a BatteryStatus and a SensorAnomalyStatus
+    fact for every pair of readings and running the decision engine, meant for offline scoring
+    of recorded telemetry.
+
+    Parameters:
+        percent (array_like): Remaining battery percentages.
+        confidence (array_like): Anomaly detection confidence levels, broadcastable against ``percent``.
+
+    Returns:
+        tuple: Arrays of battery state, sensor anomaly state and overall state values,
+               where the overall state is the highest severity of the two.
+    """
+    battery_state = classify_battery(percent)
+    sensor_anomaly_state = classify_sensor_anomaly(confidence)
+    overall_state = np.maximum(battery_state, sensor_anomaly_state)
+    return battery_state, sensor_anomaly_state, overall_state
+
+
+def describe(state):
+    """Maps an array of state values to their descriptions."""
+    return STATE_DESCRIPTIONS[np.asarray(state)]
@@ -0,0 +1,225 @@
+"""
+Benchmark comparing the experta and CLIPS decision engines.
+
+Both engines are driven through ``notify`` with the same seeded synthetic event stream. Each
+backend runs in a fresh subprocess, so startup time and peak RSS are measured from a cold start
+and do not leak between backends. Results are written as JSON so runs of different versions can
+be compared.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_engines --events 20000
+    python -m benchmarks.bench_engines --compare benchmarks/results/<previous>.json
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from backends import BACKENDS, backend_module
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(REPO_DIR, "benchmarks", "results")
+
+
+def synthetic_stream(count, seed=0):
+    """
+    Returns a reproducible list of provider payloads alternating battery readings, following a
+    random walk between 0 and 100 percent, and sensor anomaly confidence levels.
+    """
+    rng = random.Random(seed)
+    percent = 100.0
+    events = []
+    for index in range(count):
+        if index % 2 == 0:
+            percent = min(100.0, max(0.0, percent + rng.uniform(-5.0, 5.0)))
+            events.append({"use_case": "battery_status", "percent": percent})
+        else:
+            events.append({"use_case": "sensor_anomaly", "confidence": rng.random()})
+    return events
+
+
+def percentile(sorted_values, fraction):
+    """Returns the nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))]
+
+
+def peak_rss_kb():
+    """Returns the peak resident set size of the current process in KiB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in KiB on Linux
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+@contextlib.contextmanager
+def quiet_output():
+    """Sends stdout, including output written by the CLIPS library, to /dev/null."""
+    sys.stdout.flush()
+    saved_fd = os.dup(1)
+    with open(os.devnull, "w") as devnull:
+        os.dup2(devnull.fileno(), 1)
+        saved_stdout, sys.stdout = sys.stdout, devnull
+        try:
+            yield
+        finally:
+            sys.stdout = saved_stdout
+            os.dup2(saved_fd, 1)
+            os.close(saved_fd)
+
+
+def run_backend(backend, events):
+    """
+    Measures one backend in the current process. Must run in a fresh process, so that the
+    import and construction are cold and the peak RSS belongs to this backend only.
+    """
+    # The engines log into ./logs, keep the benchmark out of the real log files
+    os.chdir(tempfile.mkdtemp(prefix="bench_engines_"))
+    sys.path.insert(0, REPO_DIR)
+    with quiet_output():
+        start = time.perf_counter()
+        module = backend_module(backend)
+        imported = time.perf_counter()
+        engine = module.DecisionEngine()
+        constructed = time.perf_counter()
+
+        async def drive():
+            latencies = []
+            begin = time.perf_counter()
+            for data in events:
+                sent = time.perf_counter_ns()
+                await engine.notify(data)
+                latencies.append(time.perf_counter_ns() - sent)
+            return latencies, time.perf_counter() - begin
+
+        latencies, elapsed = asyncio.run(drive())
+
+    latencies.sort()
+    return {
+        "backend": backend,
+        "events": len(events),
+        "import_time_s": imported - start,
+        "startup_time_s": constructed - start,
+        "events_per_second": len(events) / elapsed if elapsed else 0.0,
+        "notify_latency_us": {
+            "p50": percentile(latencies, 0.50) / 1000,
+            "p99": percentile(latencies, 0.99) / 1000,
+            "max": latencies[-1] / 1000 if latencies else 0.0,
+        },
+        "peak_rss_kb": peak_rss_kb(),
+    }
+
+
+def _run_backend_worker(backend, events, results):
+    results.put(run_backend(backend, events))
+
+
+def run_isolated(backend, events):
+    """Runs ``run_backend`` in a freshly spawned interpreter and returns its results."""
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    worker = context.Process(target=_run_backend_worker, args=(backend, events, results))
+    worker.start()
+    result = results.get()
+    worker.join()
+    return result
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def write_report(name, args, payload, file_prefix=None):
+    """
+    Writes the JSON report of a benchmark run: its name, the revision, time, Python version and
+    platform it ran on, followed by the ``payload`` entries. Returns the report.
+
+    Parameters:
+        name (str): Name of the benchmark, e.g. "rule_scaling".
+        args (argparse.Namespace): The parsed arguments; the report goes to ``args.output`` if set.
+        payload (dict): The parameters and results of the run.
+        file_prefix (str): Start of the default file name, ``benchmarks/results/<file_prefix>-<time>-<revision>.json``;
+                           defaults to the name, with dashes.
+    """
+    report = {
+        "benchmark": name,
+        "revision": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        **payload,
+    }
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{file_prefix or name.replace('_', '-')}-{time.strftime('%Y%m%d-%H%M%S')}-{report['revision']}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as result_file:
+        json.dump(report, result_file, indent=2)
+    print(f"Results written to {output}")
+    return report
+
+
+def compare(current, previous):
+    """Prints the relative change of the main metrics against a previous result file."""
+    previous_by_backend = {result["backend"]: result for result in previous["results"]}
+    for result in current["results"]:
+        before = previous_by_backend.get(result["backend"])
+        if before is None:
+            continue
+        for label, now, then in (
+            ("events/s", result["events_per_second"], before["events_per_second"]),
+            ("p99 us", result["notify_latency_us"]["p99"], before["notify_latency_us"]["p99"]),
+            ("startup s", result["startup_time_s"], before["startup_time_s"]),
+            ("peak RSS KiB", result["peak_rss_kb"], before["peak_rss_kb"]),
+        ):
+            change = (now - then) / then * 100 if then else 0.0
+            print(f"{result['backend']:>8} {label:>13}: {then:14.4f} -> {now:14.4f} ({change:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=10000, help="number of notify calls per backend")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the synthetic event stream")
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=list(BACKENDS))
+    parser.add_argument("--typed", action="store_true", help="send events.Reading objects instead of dicts")
+    parser.add_argument("--output", help="result file, defaults to benchmarks/results/engines-<time>-<revision>.json")
+    parser.add_argument("--compare", help="previous result file to compare against")
+    args = parser.parse_args()
+
+    events = synthetic_stream(args.events, args.seed)
+    if args.typed:
+        sys.path.insert(0, REPO_DIR)
+        from events import as_reading
+        events = [as_reading(data) for data in events]
+    results = [run_isolated(backend, events) for backend in args.backends]
+    for result in results:
+        latency = result["notify_latency_us"]
+        print(
+            f"{result['backend']:>8}: {result['events_per_second']:10.0f} events/s, "
+            f"notify p50 {latency['p50']:.1f} us, p99 {latency['p99']:.1f} us, max {latency['max']:.1f} us, "
+            f"startup {result['startup_time_s'] * 1000:.1f} ms, peak RSS {result['peak_rss_kb']} KiB"
+        )
+
+    report = write_report("engines", args, {"seed": args.seed, "typed": args.typed, "results": results})
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as previous_file:
+            compare(report, json.load(previous_file))
+
+
+if __name__ == "__main__":
+    main()
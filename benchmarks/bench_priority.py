@@ -0,0 +1,64 @@
+"""
+Latency SLO report of the priority-aware ingest under load.
+
+A simulated fleet is driven by the load generator at a constant rate, by default above what one
+engine process sustains, so a backlog builds up. The same load is evaluated once in arrival order
+and once by severity with ``PriorityIngest``, and the time from the arrival of a reading to the
+"Emergency landing is advised" decision it causes is reported against the SLO target.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_priority --backend clipspy --rate 20000 --drones 200 --duration 10
+"""
+import argparse
+import asyncio
+
+from backends import BACKENDS, backend_module
+from benchmarks.bench_engines import write_report
+from load_generator import ConstantRate, LoadGenerator, build_fleet
+from priority_ingest import PriorityIngest, latency_report
+
+
+async def measure(args, prioritized):
+    ingest = PriorityIngest(backend_module(args.backend).DecisionEngine, prioritized)
+    providers = build_fleet(args.drones, args.seed, [ingest])
+    for provider in providers:
+        provider.use_typed_events(args.typed)
+    task = asyncio.create_task(ingest.run())
+    load = await LoadGenerator(providers, ConstantRate(args.rate), args.duration).run()
+    task.cancel()
+    return {
+        "mode": "priority" if prioritized else "arrival-order",
+        "achieved_rate": load["achieved_rate"],
+        **ingest.stats(),
+        "emergency_latency": latency_report(ingest.critical_latencies, args.target),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", default="clipspy", choices=list(BACKENDS))
+    parser.add_argument("--rate", type=float, default=20000, help="events/s")
+    parser.add_argument("--drones", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per mode")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--target", type=float, default=0.05, help="SLO target of the emergency decision latency in seconds")
+    parser.add_argument("--typed", action="store_true", help="publish compact Reading objects instead of dicts")
+    parser.add_argument("--output", help="result file, defaults to benchmarks/results/priority-<time>-<revision>.json")
+    args = parser.parse_args()
+
+    results = [asyncio.run(measure(args, prioritized)) for prioritized in (False, True)]
+    for result in results:
+        latency = result["emergency_latency"]
+        line = f"{result['mode']:>13}: {result['achieved_rate']:8.0f} events/s, {latency['count']} emergency decisions"
+        if latency["count"]:
+            line += (
+                f", p50 {latency['p50_s'] * 1000:7.2f} ms, p99 {latency['p99_s'] * 1000:7.2f} ms, "
+                f"max {latency['max_s'] * 1000:7.2f} ms, {latency['within_target']:.1%} within {args.target * 1000:.0f} ms"
+            )
+        print(line)
+
+    write_report("priority", args, {"backend": args.backend, "rate": args.rate, "drones": args.drones, "results": results})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Benchmark of the decision engines as the rule base grows.
+
+For every rule count, a synthetic rule set (see ``benchmarks/synthetic_rules.py``) is loaded into
+each backend in a fresh subprocess, and the load time, the memory added by the rule set and the
+per-event cost of updating a reading and running the engine are measured. Results are written as
+JSON next to the ``bench_engines`` results.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_rule_scaling --rules 100 1000 10000 --events 500
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+from backends import BACKENDS
+from benchmarks.bench_engines import REPO_DIR, peak_rss_kb, percentile, quiet_output, write_report
+
+DEFAULT_RULE_COUNTS = (100, 300, 1000, 3000, 10000)
+
+
+def measure_rule_set(backend, rules, events, seed):
+    """Measures one backend with one rule set in the current process, which must be a fresh one."""
+    os.chdir(tempfile.mkdtemp(prefix="bench_rule_scaling_"))
+    sys.path.insert(0, REPO_DIR)
+    from benchmarks.synthetic_rules import RULE_SET_ENGINES, rule_count, synthetic_events, synthetic_specs
+
+    specs = synthetic_specs(rules, seed=seed)
+    stream = synthetic_events(specs, events, seed)
+    with quiet_output():
+        # Import the backend before measuring, so the load time and memory are the rule set's only
+        RULE_SET_ENGINES[backend](synthetic_specs(1, seed=seed))
+        baseline_rss = peak_rss_kb()
+        start = time.perf_counter()
+        engine = RULE_SET_ENGINES[backend](specs)
+        loaded = time.perf_counter()
+        latencies = []
+        for spec, value in stream:
+            sent = time.perf_counter_ns()
+            engine.apply(spec, value)
+            engine.run()
+            latencies.append(time.perf_counter_ns() - sent)
+
+    latencies.sort()
+    return {
+        "backend": backend,
+        "rules": rule_count(specs),
+        "fact_types": 2 * len(specs),
+        "events": events,
+        "load_time_s": loaded - start,
+        "rule_set_rss_kb": peak_rss_kb() - baseline_rss,
+        "peak_rss_kb": peak_rss_kb(),
+        "event_us": {
+            "mean": sum(latencies) / len(latencies) / 1000 if latencies else 0.0,
+            "p50": percentile(latencies, 0.50) / 1000,
+            "p99": percentile(latencies, 0.99) / 1000,
+        },
+    }
+
+
+def _measure_worker(backend, rules, events, seed, results):
+    results.put(measure_rule_set(backend, rules, events, seed))
+
+
+def run_isolated(backend, rules, events, seed):
+    """Runs ``measure_rule_set`` in a freshly spawned interpreter and returns its results."""
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    worker = context.Process(target=_measure_worker, args=(backend, rules, events, seed, results))
+    worker.start()
+    result = results.get()
+    worker.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rules", type=int, nargs="+", default=list(DEFAULT_RULE_COUNTS), help="rule counts to measure")
+    parser.add_argument("--events", type=int, default=500, help="events per rule set")
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=list(BACKENDS))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="result file, defaults to benchmarks/results/rule-scaling-<time>-<revision>.json")
+    args = parser.parse_args()
+
+    results = []
+    for rules in args.rules:
+        for backend in args.backends:
+            result = run_isolated(backend, rules, args.events, args.seed)
+            results.append(result)
+            print(
+                f"{backend:>8} {result['rules']:6d} rules: load {result['load_time_s'] * 1000:9.1f} ms, "
+                f"+{result['rule_set_rss_kb']:7d} KiB, event mean {result['event_us']['mean']:9.1f} us, "
+                f"p99 {result['event_us']['p99']:9.1f} us",
+                flush=True,
+            )
+
+    write_report("rule_scaling", args, {"results": results})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Benchmark of the cold start of the decision engines.
+
+Every sample is a fresh interpreter that imports an engine module, constructs the engine and
+evaluates a first reading, as a restarted companion computer process does. The CLIPS backend is
+measured with a cold compiled-image cache (the constructs are parsed and the image written), a
+warm cache (the image is loaded) and with the cache disabled. Results are written as JSON next
+to the ``bench_engines`` results.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_startup --samples 20
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from backends import BACKENDS
+from benchmarks.bench_engines import REPO_DIR, write_report
+
+# Backend, module, and how the CLIPS image cache is prepared before each sample
+SCENARIOS = {
+    "experta": (BACKENDS["experta"], None),
+    "clipspy-no-cache": (BACKENDS["clipspy"], "disabled"),
+    "clipspy-cold-cache": (BACKENDS["clipspy"], "cold"),
+    "clipspy-warm-cache": (BACKENDS["clipspy"], "warm"),
+}
+
+# Runs in the fresh interpreter; prints the phase durations as JSON on a marked line, as the
+# CLIPS library writes its output through its own buffers, past the redirection
+SAMPLE_SCRIPT = """
+import asyncio, contextlib, json, os, sys, time
+start = time.perf_counter()
+sys.path.insert(0, {repo_dir!r})
+with contextlib.redirect_stdout(open(os.devnull, "w")):
+    import {module} as module
+    imported = time.perf_counter()
+    kwargs = {kwargs}
+    engine = module.DecisionEngine(**kwargs)
+    constructed = time.perf_counter()
+    asyncio.run(engine.notify({{"use_case": "battery_status", "percent": 40.0}}))
+    decided = time.perf_counter()
+print("STARTUP " + json.dumps({{"import_s": imported - start, "construct_s": constructed - imported, "first_decision_s": decided - constructed}}), flush=True)
+"""
+
+
+def run_sample(module, cache_mode, cache_dir, work_dir):
+    """Runs one cold start in a fresh interpreter and returns its phase durations and total wall time."""
+    kwargs = {}
+    if cache_mode == "disabled":
+        kwargs["image_cache_dir"] = None
+    elif cache_mode is not None:
+        if cache_mode == "cold":
+            shutil.rmtree(cache_dir, ignore_errors=True)
+        kwargs["image_cache_dir"] = cache_dir
+    script = SAMPLE_SCRIPT.format(repo_dir=REPO_DIR, module=module, kwargs=repr(kwargs))
+    started = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, "-c", script], cwd=work_dir, check=True, capture_output=True, text=True
+    ).stdout
+    sample = json.loads(next(line for line in output.splitlines() if line.startswith("STARTUP "))[len("STARTUP "):])
+    sample["process_s"] = time.perf_counter() - started
+    return sample
+
+
+def measure(name, samples):
+    module, cache_mode = SCENARIOS[name]
+    # The engines log into ./logs, keep the benchmark out of the real log files
+    work_dir = tempfile.mkdtemp(prefix="bench_startup_")
+    cache_dir = os.path.join(work_dir, "image_cache")
+    if cache_mode == "warm":
+        run_sample(module, "cold", cache_dir, work_dir)
+    results = [run_sample(module, cache_mode, cache_dir, work_dir) for _ in range(samples)]
+    shutil.rmtree(work_dir, ignore_errors=True)
+    return {
+        "scenario": name,
+        "samples": samples,
+        **{f"{phase}_median": statistics.median(result[phase] for result in results)
+           for phase in ("import_s", "construct_s", "first_decision_s", "process_s")},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", type=int, default=10, help="fresh interpreters per scenario")
+    parser.add_argument("--scenarios", nargs="+", default=list(SCENARIOS), choices=list(SCENARIOS))
+    parser.add_argument("--output", help="result file, defaults to benchmarks/results/startup-<time>-<revision>.json")
+    args = parser.parse_args()
+
+    results = [measure(name, args.samples) for name in args.scenarios]
+    for result in results:
+        print(
+            f"{result['scenario']:>18}: import {result['import_s_median'] * 1000:7.1f} ms, "
+            f"construct {result['construct_s_median'] * 1000:6.2f} ms, "
+            f"first decision {result['first_decision_s_median'] * 1000:6.2f} ms, "
+            f"process {result['process_s_median'] * 1000:7.1f} ms"
+        )
+
+    write_report("startup", args, {"results": results})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Soak test of a decision engine: millions of ``notify`` calls, tracking memory over time.
+
+The engine is driven with a seeded random walk of battery and sensor anomaly readings, as in
+``bench_engines``, and every ``--interval`` events a sample records the resident set size, the
+size of the log directory and, with ``--tracemalloc``, the Python memory allocated per component
+(the engine library, the CLIPS bindings, logging, this repository's modules). Growth is reported
+against the first sample, taken after a warm-up interval, so a leak shows up as a steady rise of
+one component while the others stay flat.
+
+tracemalloc makes every allocation several times slower; leave it off to measure the RSS of a
+realistic run.
+
+Usage (from the repository root):
+    python -m benchmarks.soak --backend clipspy --events 5000000 --interval 500000
+    python -m benchmarks.soak --backend experta --events 1000000 --tracemalloc
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from backends import BACKENDS, backend_module
+from benchmarks.bench_engines import REPO_DIR, peak_rss_kb, quiet_output, write_report
+
+# Components of the traced allocations, by a directory in the allocating file's path
+COMPONENTS = (
+    ("experta", f"{os.sep}experta{os.sep}"),
+    ("clips", f"{os.sep}clips{os.sep}"),
+    ("logging", f"{os.sep}logging{os.sep}"),
+    ("asyncio", f"{os.sep}asyncio{os.sep}"),
+    ("decision-engine", REPO_DIR + os.sep),
+)
+
+
+def component_of(filename):
+    for component, marker in COMPONENTS:
+        if marker in filename:
+            return component
+    return "other"
+
+
+def current_rss_kb():
+    """Returns the current resident set size in KiB, or the peak one where it is not available."""
+    try:
+        with open("/proc/self/status", encoding="ascii") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return peak_rss_kb()
+
+
+def directory_size(path):
+    return sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file()) if os.path.isdir(path) else 0
+
+
+def readings(seed=0):
+    """Yields an endless random walk of battery readings alternating with sensor anomaly confidence levels."""
+    rng = random.Random(seed)
+    percent = 100.0
+    while True:
+        percent = min(100.0, max(0.0, percent + rng.uniform(-5.0, 5.0)))
+        yield {"use_case": "battery_status", "percent": percent}
+        yield {"use_case": "sensor_anomaly", "confidence": rng.random()}
+
+
+def sample(events, started, trace):
+    result = {
+        "events": events,
+        "elapsed_s": time.perf_counter() - started,
+        "rss_kb": current_rss_kb(),
+        "log_bytes": directory_size("logs"),
+    }
+    if trace:
+        by_component = {}
+        for statistic in tracemalloc.take_snapshot().statistics("filename"):
+            component = component_of(statistic.traceback[0].filename)
+            by_component[component] = by_component.get(component, 0) + statistic.size
+        result["traced_bytes"] = by_component
+    return result
+
+
+async def soak(engine, events, interval, trace, seed):
+    stream = readings(seed)
+    started = time.perf_counter()
+    samples = []
+    for sent in range(1, events + 1):
+        await engine.notify(next(stream))
+        if sent % interval == 0:
+            samples.append(sample(sent, started, trace))
+    return samples
+
+
+def growth(samples):
+    """Returns the growth of every measure from the first sample, the end of the warm-up, to the last one."""
+    first, last = samples[0], samples[-1]
+    result = {
+        "rss_kb": last["rss_kb"] - first["rss_kb"],
+        "log_bytes": last["log_bytes"] - first["log_bytes"],
+    }
+    if "traced_bytes" in first:
+        components = set(first["traced_bytes"]) | set(last["traced_bytes"])
+        result["traced_bytes"] = {
+            component: last["traced_bytes"].get(component, 0) - first["traced_bytes"].get(component, 0)
+            for component in sorted(components)
+        }
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", default="clipspy", choices=list(BACKENDS))
+    parser.add_argument("--events", type=int, default=2000000, help="notify calls")
+    parser.add_argument("--interval", type=int, default=200000, help="events between two samples")
+    parser.add_argument("--tracemalloc", action="store_true", help="trace the Python allocations per component")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="result file, defaults to benchmarks/results/soak-<backend>-<time>-<revision>.json")
+    args = parser.parse_args()
+    if args.events < 2 * args.interval:
+        parser.error("--events must cover at least two intervals, the first one being the warm-up")
+
+    if args.output:
+        # The run changes directory, resolve the output path first
+        args.output = os.path.abspath(args.output)
+    # The engines log into ./logs, keep the soak test out of the real log files
+    work_dir = tempfile.mkdtemp(prefix="soak_")
+    os.chdir(work_dir)
+    sys.path.insert(0, REPO_DIR)
+    if args.tracemalloc:
+        tracemalloc.start()
+    with quiet_output():
+        engine = backend_module(args.backend).DecisionEngine()
+        samples = asyncio.run(soak(engine, args.events, args.interval, args.tracemalloc, args.seed))
+    os.chdir(REPO_DIR)
+    shutil.rmtree(work_dir, ignore_errors=True)
+
+    for result in samples:
+        line = f"{result['events']:>10} events  {result['elapsed_s']:8.1f} s  RSS {result['rss_kb']:8d} KiB  logs {result['log_bytes'] / 1024:10.0f} KiB"
+        if "traced_bytes" in result:
+            line += "  " + "  ".join(f"{component} {size / 1024:.0f} KiB" for component, size in sorted(result["traced_bytes"].items()))
+        print(line)
+    samples_growth = growth(samples)
+    print(f"Growth after warm-up: {json.dumps(samples_growth)}")
+
+    write_report("soak", args, {"backend": args.backend, "samples": samples, "growth": samples_growth},
+                 file_prefix=f"soak-{args.backend}")
+
+
+if __name__ == "__main__":
+    main()
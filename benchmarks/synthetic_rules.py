@@ -0,0 +1,171 @@
+"""
+Synthetic rule sets for measuring how the decision engines scale with the size of the rule base.
+
+A rule set is a number of generated use cases on top of the real rule base, each written like
+the battery and sensor anomaly use cases: a status fact with one reading, a state fact, one state
+rule per band (as ``battery_state_*``, generated from a ``UseCaseSpec`` by ``decision_table``) and
+a rule raising the overall state to the use case's state (as ``determine_overall_state``, which
+only combines two states; with hundreds of them, a rule per use case keeps the overall state at
+the maximum seen so far instead of joining every state fact in one rule).
+
+Every use case brings two fact types and ``bands + 1`` rules, so a rule set of 10,000 rules has
+2,000 use cases and 4,000 fact types with the default 4 bands.
+
+Usage:
+    specs = synthetic_specs(rule_count=1000)
+    engine = RULE_SET_ENGINES["clipspy"](specs)
+    engine.apply(specs["synthetic_00042"], 0.9)
+    engine.run()
+"""
+import logging
+import os
+import random
+import tempfile
+
+from decision_table import STATE_MAP, UseCaseSpec, clips_rules
+
+
+def synthetic_specs(rule_count, bands=4, seed=0):
+    """
+    Returns the specs of enough generated use cases for about ``rule_count`` rules, keyed by use
+    case, with random band bounds between 0 and 1 derived from ``seed``.
+    """
+    if not 2 <= bands <= len(STATE_MAP):
+        raise ValueError(f"bands must be between 2 and {len(STATE_MAP)}")
+    rng = random.Random(seed)
+    states = sorted(STATE_MAP)[-bands:]
+    specs = {}
+    for index in range(max(1, rule_count // (bands + 1))):
+        name = f"Synthetic{index:05d}"
+        bounds = sorted(round(rng.uniform(0.05, 0.95), 4) for _ in range(bands - 1))
+        if len(set(bounds)) != len(bounds):
+            bounds = [(band + 1) / bands for band in range(bands - 1)]
+        spec = UseCaseSpec(
+            use_case=f"synthetic_{index:05d}",
+            field="level",
+            status_fact=f"{name}Status",
+            state_fact=f"{name}State",
+            rule_prefix=f"synthetic_{index:05d}_state",
+            label=f"{name} State",
+            bands=[{"state": state, "upper": upper} for state, upper in zip(states, bounds + [None])],
+        )
+        specs[spec.use_case] = spec
+    return specs
+
+
+def rule_count(specs):
+    """Returns the number of generated rules of a rule set, excluding the real rule base."""
+    return sum(len(spec.bands) + 1 for spec in specs.values())
+
+
+def synthetic_events(specs, count, seed=0):
+    """Returns a reproducible list of (spec, reading) pairs over random use cases of a rule set."""
+    rng = random.Random(seed)
+    use_cases = list(specs.values())
+    return [(rng.choice(use_cases), rng.random()) for _ in range(count)]
+
+
+def clips_source(specs):
+    """Returns the CLIPS templates and rules of a rule set."""
+    sections = ["; Generated by benchmarks/synthetic_rules.py"]
+    for spec in specs.values():
+        sections.append(
+            f"(deftemplate {spec.status_fact}\n"
+            f"    (slot {spec.field} (type FLOAT)))\n"
+            f"(deftemplate {spec.state_fact}\n"
+            "    (slot state_value (type INTEGER))\n"
+            "    (slot state_description (type STRING)))\n"
+        )
+        sections.append(
+            f"(deffacts {spec.rule_prefix}_initial\n"
+            f'    ({spec.state_fact} (state_value 0) (state_description "{STATE_MAP[0]}")))\n'
+        )
+        sections.append(clips_rules(spec))
+        sections.append(
+            f"(defrule {spec.rule_prefix}_overall\n"
+            f"    ({spec.state_fact} (state_value ?v))\n"
+            "    ?o <- (OverallState (state_value ?w&:(< ?w ?v)))\n"
+            "    =>\n"
+            "    (modify ?o (state_value ?v) (state_description (getStateDescription ?v))))\n"
+        )
+    return "\n".join(sections)
+
+
+class ClipsRuleSetEngine:
+    """The CLIPS DecisionEngine with the constructs of a synthetic rule set loaded on top."""
+    def __init__(self, specs):
+        import clipspy_decision_engine
+
+        self.engine = clipspy_decision_engine.DecisionEngine(instrumented=False, image_cache_dir=None)
+        descriptor, path = tempfile.mkstemp(prefix="synthetic-", suffix=".clp")
+        try:
+            with os.fdopen(descriptor, "w", encoding="utf-8") as clp_file:
+                clp_file.write(clips_source(specs))
+            self.engine.env.load(path)
+        finally:
+            os.remove(path)
+        # The generated rules combine the states into the overall state; the real rule would reset it
+        # to the maximum of the battery and sensor anomaly states on every change, endlessly
+        self.engine.env.find_rule("determine-and-update-overall-state").undefine()
+        self.engine.reset()
+
+    def apply(self, spec, value):
+        self.engine.update_fact(spec.status_fact, **{spec.field: value})
+
+    def run(self):
+        self.engine.run()
+
+    def overall_state(self):
+        return self.engine.state_values()["OverallState"]
+
+
+class ExpertaRuleSetEngine:
+    """A subclass of the experta DecisionEngine with the facts and rules of a synthetic rule set."""
+    def __init__(self, specs):
+        from experta import Field, Fact, MATCH, Rule
+        import experta_decision_engine
+        from decision_table import experta_rules
+
+        fact_types = {}
+        for spec in specs.values():
+            fact_types[spec.status_fact] = type(spec.status_fact, (Fact,), {spec.field: Field(float, mandatory=True)})
+            fact_types[spec.state_fact] = type(spec.state_fact, (Fact,), {
+                "state_value": Field(int, mandatory=True),
+                "state_description": Field(str, mandatory=True),
+            })
+        self.fact_types = fact_types
+        overall_state = experta_decision_engine.OverallState
+
+        def overall_rule(spec):
+            def rule(self, value):
+                current = self.get_fact(overall_state)
+                if current is None or value > current["state_value"]:
+                    self.update_state(overall_state, value)
+            rule.__name__ = f"{spec.rule_prefix}_overall"
+            return Rule(fact_types[spec.state_fact](state_value=MATCH.value))(rule)
+
+        rules = {}
+        for spec in specs.values():
+            rules.update(experta_rules(spec, fact_types))
+            rules[f"{spec.rule_prefix}_overall"] = overall_rule(spec)
+        engine_class = type("SyntheticDecisionEngine", (experta_decision_engine.DecisionEngine,), rules)
+        # The rules log every state change; keep them out of the drone actions log
+        logger = logging.getLogger("synthetic_rules")
+        logger.disabled = True
+        self.engine = engine_class(logger=logger, instrumented=False)
+
+    def apply(self, spec, value):
+        self.engine.update_reading(self.fact_types[spec.status_fact], **{spec.field: value})
+
+    def run(self):
+        self.engine.run()
+
+    def overall_state(self):
+        return self.engine.state_values()["OverallState"]
+
+
+# Engine running a synthetic rule set, by backend name (see backends.py)
+RULE_SET_ENGINES = {
+    "experta": ExpertaRuleSetEngine,
+    "clipspy": ClipsRuleSetEngine,
+}
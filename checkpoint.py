@@ -0,0 +1,135 @@
+"""
+Working-memory checkpoints for a warm restart of the decision engines.
+
+An engine's ``checkpoint()`` returns its readings and state facts, and the last actioned state,
+as plain data; ``restore(checkpoint)`` puts them back into a freshly reset engine. Both engines
+use the same fact names, so a checkpoint is portable between backends.
+
+``Checkpointer`` writes the checkpoint of an engine periodically, only when it changed, and
+atomically: the file is written next to its target and renamed over it, so a crash while
+writing never leaves a truncated checkpoint behind. In ``run``, the checkpoint is taken on the
+event loop but written and synced to disk on a thread, so the providers are not stalled by the
+disk. At startup, ``Checkpointer.restore`` brings the engine back to its last known state
+instead of Normal, and runs it, so the decisions of that state are taken right away rather than
+on the next provider event.
+
+Usage:
+    checkpointer = Checkpointer(engine, "state/drone_actions.checkpoint.json")
+    checkpointer.restore()
+    asyncio.create_task(checkpointer.run())
+"""
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+
+CHECKPOINT_VERSION = 1
+
+
+def write_atomic(path, data, fsync=True):
+    """Writes ``data`` as JSON to ``path`` through a temporary file renamed over it."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    descriptor, temporary_path = tempfile.mkstemp(prefix=".checkpoint-", dir=directory)
+    try:
+        with os.fdopen(descriptor, "w", encoding="utf-8") as checkpoint_file:
+            json.dump(data, checkpoint_file, separators=(",", ":"))
+            if fsync:
+                checkpoint_file.flush()
+                os.fsync(checkpoint_file.fileno())
+        os.replace(temporary_path, path)
+    except BaseException:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+        raise
+
+
+def read_checkpoint(path, max_age=None):
+    """
+    Returns the checkpoint stored at ``path``, or None if there is none, it cannot be read, it
+    has another format version or it is older than ``max_age`` seconds.
+    """
+    try:
+        with open(path, encoding="utf-8") as checkpoint_file:
+            checkpoint = json.load(checkpoint_file)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(checkpoint, dict) or checkpoint.get("version") != CHECKPOINT_VERSION:
+        return None
+    if max_age is not None and time.time() - checkpoint.get("saved_at", 0) > max_age:
+        return None
+    return checkpoint
+
+
+class Checkpointer:
+    """
+    Periodically and atomically saves the working memory of an engine providing ``checkpoint()``,
+    ``restore(checkpoint)`` and ``run()``, and restores it at startup.
+
+    Parameters:
+        engine: The decision engine.
+        path (str): Checkpoint file.
+        interval (float): Seconds between two saves in ``run``.
+        max_age (float): Checkpoints older than this many seconds are not restored; None to
+                         always restore.
+        fsync (bool): Flush every save to disk before renaming it into place.
+    """
+    def __init__(self, engine, path, interval=1.0, max_age=None, fsync=True):
+        self.engine = engine
+        self.path = path
+        self.interval = interval
+        self.max_age = max_age
+        self.fsync = fsync
+        self.last_saved = None
+        self.saves = 0
+        # Orders the writes of the thread and of the final save in run(), so the newest one lands last
+        self.write_lock = threading.Lock()
+
+    def _write(self, checkpoint):
+        with self.write_lock:
+            write_atomic(self.path, {"version": CHECKPOINT_VERSION, "saved_at": time.time(), **checkpoint}, self.fsync)
+            self.last_saved = checkpoint
+            self.saves += 1
+
+    def save(self):
+        """Writes the engine's checkpoint unless it did not change since the last save. Returns whether it was written."""
+        checkpoint = self.engine.checkpoint()
+        if checkpoint == self.last_saved:
+            return False
+        self._write(checkpoint)
+        return True
+
+    async def save_in_thread(self):
+        """Like ``save``, but writes and syncs the file on a thread, keeping the event loop running."""
+        checkpoint = self.engine.checkpoint()
+        if checkpoint == self.last_saved:
+            return False
+        await asyncio.to_thread(self._write, checkpoint)
+        return True
+
+    def restore(self):
+        """
+        Restores the engine from the checkpoint file, if a usable one exists, and runs it so the
+        rules of the restored state fire. Returns whether it did.
+        """
+        checkpoint = read_checkpoint(self.path, self.max_age)
+        if checkpoint is None:
+            return False
+        self.engine.restore(checkpoint)
+        self.engine.run()
+        self.last_saved = self.engine.checkpoint()
+        return True
+
+    async def run(self):
+        """
+        Saves the checkpoint every ``interval`` seconds, on a thread, and once more when cancelled;
+        that last save is synchronous, as the task may not be awaited again.
+        """
+        try:
+            while True:
+                await asyncio.sleep(self.interval)
+                await self.save_in_thread()
+        finally:
+            self.save()
@@ -1,10 +1,37 @@
-from clips import Environment, Symbol
+import clips
+from clips import CLIPSError, Environment, Router, Symbol
+import functools
+import glob
+import hashlib
 import os
+import platform
+import re
+import tempfile
+import time
+
+import batch_evaluation
+from decision_table import SPECS
+from events import EventTable
+from instrumentation import EngineMetrics
 
 # Retrieve the path to the directory containing this script.
 # This is used for loading external CLIPS template and rule files.
 path_to_current_dir = os.path.dirname(__file__)
 DEBUG = False
+# CLIPS source files of the engine, in load order; the state rules are generated by decision_table.py
+CONSTRUCT_FILES = [
+    os.path.join(path_to_current_dir, "clipspy", "templates.clp"),
+    os.path.join(path_to_current_dir, "clipspy", "state_rules.clp"),
+    os.path.join(path_to_current_dir, "clipspy", "rules.clp"),
+]
+# Directory of the compiled (bsave) images of the constructs, None to always parse the source files
+IMAGE_CACHE_DIR = os.path.join(path_to_current_dir, "clipspy", "cache")
+# State templates reported by DecisionEngine.state_values
+STATE_TEMPLATES = [spec.state_fact for spec in SPECS.values()] + ["OverallState"]
+# Templates saved by DecisionEngine.checkpoint: the readings and the states
+CHECKPOINT_TEMPLATES = [spec.status_fact for spec in SPECS.values()] + STATE_TEMPLATES
+# Parses the defrule lines of (profile-info): name, entries, time, %, time+kids, %+kids
+PROFILE_LINE = re.compile(r"^(?P<name>\S+)\s+(?P<entries>\d+)\s+[\d.]+\s+[\d.]+%\s+(?P<seconds>[\d.]+)\s+[\d.]+%$")
 
 def action_for_normal_state():
     """
@@ -34,6 +61,46 @@ def action_for_critical_state():
     """
     print("\033[31mAction: Emergency landing is advised\033[0m")
 
+# Action rule name and overall state of each action function, for the action executor
+ACTION_FUNCTIONS = {
+    "action_for_normal_state": ("action_normal", 0),
+    "action_for_mild_state": ("action_mild", 1),
+    "action_for_severe_state": ("action_severe", 2),
+    "action_for_critical_state": ("action_critical", 3),
+}
+
+
+def construct_image_key(paths, function_names):
+    """
+    Returns the cache key of a compiled image of the given source files. It changes with their
+    content, the registered Python functions and the CLIPS build, which invalidates stale images.
+    """
+    digest = hashlib.sha256(f"{clips.__version__} {platform.machine()} {' '.join(function_names)}".encode("utf-8"))
+    for path in paths:
+        with open(path, "rb") as source:
+            digest.update(source.read())
+    return digest.hexdigest()[:16]
+
+
+class OutputCaptureRouter(Router):
+    """CLIPS router collecting what is written to the given logical names, e.g. the output of a command."""
+    def __init__(self, name, logical_names=("t", "stdout")):
+        super().__init__(name, 60)
+        self.logical_names = logical_names
+        self.output = ""
+
+    def query(self, name):
+        return name in self.logical_names
+
+    def write(self, name, message):
+        self.output += message
+
+
+class OutputDiscardRouter(OutputCaptureRouter):
+    """CLIPS router dropping what is written to the given logical names, e.g. the rules' printouts."""
+    def write(self, name, message):
+        pass
+
 
 class DecisionEngine():
     """
@@ -48,21 +115,166 @@ class DecisionEngine():
         register_python_functions: Registers a list of Python functions with the CLIPS environment.
         add_fact: Adds a new fact to the CLIPS environment.
         update_fact: Updates an existing fact or adds it if it doesn't exist.
+        update_facts: Updates several facts in one call, before the engine is run.
+        reset: Resets the CLIPS environment and drops the cached fact handles.
+        run: Runs the CLIPS inference engine.
+        apply_event: Updates the system facts from provider data without running the engine.
         notify: Handles notifications from data providers and updates the system facts accordingly.
+        metrics_snapshot: Returns the per-rule and per-notify metrics.
+        state_values: Returns the current value of every state fact.
+        checkpoint: Returns the readings and state facts and the last actioned state as plain data.
+        restore: Resets the environment to the facts of a checkpoint.
+        evaluate_batch: Evaluates input snapshots on a process pool, for what-if analysis.
+
+    Instrumentation is opt-in. When instrumented, rule firings and times come from CLIPS construct
+    profiling, which costs a few percent; CLIPS also never frees part of its profile data, so every
+    instrumented environment leaks a few hundred bytes (and reports ENVRNMNT8) when it is
+    destroyed, which adds up with short-lived or per-drone engines. Per-firing latency histograms and activation counts need the agenda to be
+    stepped one rule at a time from Python, which is much slower, so they are only recorded
+    with ``rule_timing=True``.
     """
-    def __init__(self) -> None:
-        """Initializes the decision engine, loading the necessary CLIPS templates and rules."""
+    def __init__(self, instrumented=False, rule_timing=False, image_cache_dir=IMAGE_CACHE_DIR, action_executor=None) -> None:
+        """
+        Initializes the decision engine, loading the necessary CLIPS templates and rules.
+
+        The constructs are loaded from a compiled image in ``image_cache_dir`` when one matches the
+        source files, which is several times faster than parsing them; otherwise they are parsed
+        and the image is written for the next start.
+
+        With an ``action_executor`` (see ``action_executor.py``), the action functions called by the
+        rules enqueue their action into it instead of carrying it out within ``run()``.
+        """
         self.env = Environment()
+        self.rule_timing = rule_timing
+        self.metrics = EngineMetrics(counts_activations=rule_timing) if instrumented else None
+        self.action_executor = action_executor
+        self.last_action_state = None
         # Register python functions in CLIPS environment so that they can be called as actions when rules are fired
-        self.register_python_functions([action_for_normal_state, action_for_mild_state, action_for_severe_state, action_for_critical_state])
-        # Load the CLIPS file containing the templates and rules
-        self.env.load(f'{path_to_current_dir}/clipspy/templates.clp')
-        self.env.load(f'{path_to_current_dir}/clipspy/rules.clp')
+        functions = [action_for_normal_state, action_for_mild_state, action_for_severe_state, action_for_critical_state]
+        if action_executor is not None:
+            functions = [self.enqueue_action(function.__name__) for function in functions]
+        self.register_python_functions([self.track_action(function) for function in functions])
+        # Load the CLIPS templates and rules
+        self.load_constructs(image_cache_dir, [function.__name__ for function in functions])
+        if instrumented and not rule_timing:
+            self.env.eval('(profile constructs)')
         if DEBUG:
             # Turn on watching for facts and rules using the eval method
             self.env.eval('(watch facts)')
             self.env.eval('(watch rules)')
+        # Cached template and fact handles, so updates don't have to search the fact list
+        self.templates = {}
+        self.fact_handles = {}
+        # Fact-update handler of each use case, indexed by use case code
+        self.event_table = EventTable()
+        for spec in SPECS.values():
+            self.event_table.register(spec.use_case, self.reading_handler(spec.status_fact, spec.field))
+        self.reset()
+
+    def reset(self):
+        """Resets the CLIPS environment. Retracts every fact, so the cached fact handles are dropped."""
         self.env.reset()
+        self.fact_handles = {}
+        self.seen_activations = set()
+
+    def load_constructs(self, image_cache_dir, function_names):
+        """Loads the constructs of CONSTRUCT_FILES, through the compiled image cache unless ``image_cache_dir`` is None."""
+        if image_cache_dir is None:
+            for path in CONSTRUCT_FILES:
+                self.env.load(path)
+            return
+        image_path = os.path.join(image_cache_dir, f"constructs-{construct_image_key(CONSTRUCT_FILES, function_names)}.bin")
+        if os.path.exists(image_path):
+            try:
+                self.env.load(image_path, binary=True)
+                return
+            except CLIPSError:
+                pass  # Unreadable image, parse the sources and write it again
+        for path in CONSTRUCT_FILES:
+            self.env.load(path)
+        try:
+            self.save_image(image_path)
+        except (OSError, CLIPSError):
+            pass  # The cache is an optimization only, e.g. the directory may be read-only
+
+    def save_image(self, image_path):
+        """Writes the compiled image of the loaded constructs atomically and removes the stale images next to it."""
+        image_cache_dir = os.path.dirname(image_path)
+        os.makedirs(image_cache_dir, exist_ok=True)
+        descriptor, temporary_path = tempfile.mkstemp(prefix=".constructs-", dir=image_cache_dir)
+        os.close(descriptor)
+        # bsave warns that constraints are not saved; they are only checked dynamically, which is off
+        router = OutputCaptureRouter("image-warning-router", ("stdwrn",))
+        self.env.add_router(router)
+        try:
+            self.env.save(temporary_path, binary=True)
+            os.replace(temporary_path, image_path)
+        finally:
+            router.delete()
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+        for stale_path in glob.glob(os.path.join(image_cache_dir, "constructs-*.bin")):
+            if stale_path != image_path:
+                os.remove(stale_path)
+
+    def get_template(self, template_name):
+        """Returns the template with the given name, looking it up in the CLIPS environment only once."""
+        template = self.templates.get(template_name)
+        if template is None:
+            template = self.templates[template_name] = self.env.find_template(template_name)
+        return template
+
+    def state_values(self):
+        """Returns the current value of every state fact, keyed by template name (None if not asserted)."""
+        values = {}
+        for template_name in STATE_TEMPLATES:
+            fact = next(iter(self.get_template(template_name).facts()), None)
+            values[template_name] = fact["state_value"] if fact is not None else None
+        return values
+
+    def checkpoint(self):
+        """Returns the readings and state facts and the last actioned state as plain data (see checkpoint.py)."""
+        facts = [
+            {"template": fact.template.name, "slots": dict(fact)}
+            for fact in self.env.facts() if fact.template.name in CHECKPOINT_TEMPLATES
+        ]
+        return {"facts": facts, "last_action_state": self.last_action_state}
+
+    def restore(self, checkpoint):
+        """
+        Resets the environment and puts back the facts of a checkpoint. The action rule of the
+        restored overall state fires on the next run.
+        """
+        self.reset()
+        for fact in checkpoint["facts"]:
+            if fact["template"] in CHECKPOINT_TEMPLATES:
+                self.update_fact(fact["template"], **fact["slots"])
+        self.last_action_state = checkpoint.get("last_action_state")
+
+    @classmethod
+    def batch_engine(cls, action_recorder):
+        """Returns an engine for batch_evaluation.py: not instrumented, silent, recording its actions."""
+        engine = cls(instrumented=False, action_executor=action_recorder)
+        engine.discard_router = OutputDiscardRouter("batch-output-router")
+        engine.env.add_router(engine.discard_router)
+        return engine
+
+    @classmethod
+    def evaluate_batch(cls, snapshots, processes=None, chunk_size=256):
+        """
+        Evaluates input snapshots on a process pool with one engine per worker.
+
+        Parameters:
+            snapshots (iterable): Dicts mapping use cases to a reading value, e.g.
+                                  ``{"battery_status": 40.0, "sensor_anomaly": 0.6}``.
+            processes (int): Worker processes, the CPU count by default; 1 evaluates in-process.
+            chunk_size (int): Snapshots sent to a worker at a time.
+
+        Returns:
+            generator: The state values and fired actions of each snapshot, in input order
+                       (see batch_evaluation.py).
+        """
+        return batch_evaluation.evaluate_batch(cls.batch_engine, snapshots, processes, chunk_size)
 
     def register_python_functions(self, functions):
         """
@@ -74,6 +286,25 @@ class DecisionEngine():
         for function in functions:
             self.env.define_function(function)
 
+    def track_action(self, function):
+        """Returns a replacement of an action function that records its state as the last actioned one."""
+        _, state_value = ACTION_FUNCTIONS[function.__name__]
+
+        @functools.wraps(function)
+        def action():
+            self.last_action_state = state_value
+            return function()
+        return action
+
+    def enqueue_action(self, function_name):
+        """Returns a replacement of an action function that enqueues its action into the action executor."""
+        rule_name, state_value = ACTION_FUNCTIONS[function_name]
+
+        def enqueue():
+            self.action_executor.submit(rule_name, state_value)
+        enqueue.__name__ = function_name
+        return enqueue
+
     def add_fact(self, template_name, **kwargs):
         """
         Adds a new fact to the CLIPS environment based on a template.
@@ -81,8 +312,13 @@ class DecisionEngine():
         Parameters:
             template_name (str): The name of the template to use for the fact.
             **kwargs: Keyword arguments representing the slots of the fact and their values.
+
+        Returns:
+            TemplateFact: The asserted fact.
         """
-        self.env.find_template(template_name).assert_fact(**kwargs)
+        fact = self.get_template(template_name).assert_fact(**kwargs)
+        self.fact_handles[template_name] = fact
+        return fact
 
     def update_fact(self, template_name, **kwargs):
         """
@@ -92,9 +328,12 @@ class DecisionEngine():
             template_name (str): The name of the template to use for the fact.
             **kwargs: Keyword arguments representing the slots to update or create with their new values.
         """
-        # Search for the existing fact of the given template
-        existing_fact = next((fact for fact in self.env.facts() if fact.template.name == template_name), None)
-        
+        # Use the cached fact unless it was retracted since, e.g. by a rule, then search the template's facts
+        existing_fact = self.fact_handles.get(template_name)
+        if existing_fact is None or not existing_fact.exists:
+            existing_fact = next(iter(self.get_template(template_name).facts()), None)
+            self.fact_handles[template_name] = existing_fact
+
         if existing_fact:
             # If the fact exists, modify its slots
             existing_fact.modify_slots(**kwargs)
@@ -102,6 +341,79 @@ class DecisionEngine():
             # If the fact does not exist, add a new fact
             self.add_fact(template_name, **kwargs)
 
+    def update_facts(self, updates):
+        """
+        Updates several facts in one call, so a batch of slot changes reaches the CLIPS environment
+        before the next ``run()``.
+
+        Parameters:
+            updates (dict): Maps template names to dictionaries of the slots to update or create.
+        """
+        for template_name, slots in updates.items():
+            self.update_fact(template_name, **slots)
+
+    def run(self):
+        """Runs the CLIPS inference engine until the agenda is empty."""
+        if self.metrics is None or not self.rule_timing:
+            self.env.run()
+            return
+        # Fire one rule at a time, counting the activations that appeared since the previous step
+        while True:
+            activations = list(self.env.activations())
+            if not activations:
+                break
+            for activation in activations:
+                if activation not in self.seen_activations:
+                    self.metrics.observe_activation(activation.name)
+            self.seen_activations = set(activations[1:])
+            start = time.perf_counter()
+            self.env.run(1)
+            self.metrics.observe_firing(activations[0].name, time.perf_counter() - start)
+
+    def metrics_snapshot(self):
+        """Returns the recorded metrics as plain data, or None if the engine is not instrumented."""
+        if self.metrics is None:
+            return None
+        if not self.rule_timing:
+            router = OutputCaptureRouter("profile-info-router")
+            self.env.add_router(router)
+            try:
+                self.env.eval('(profile-info)')
+            finally:
+                router.delete()
+            for name, firings, seconds in self.parse_profile_info(router.output):
+                self.metrics.set_rule_totals(name, firings, seconds)
+        self.metrics.working_memory_size = sum(1 for _ in self.env.facts())
+        return self.metrics.snapshot()
+
+    @staticmethod
+    def parse_profile_info(output):
+        """Yields the name, entries and time including called functions of each defrule in (profile-info) output."""
+        in_rules = False
+        for line in output.splitlines():
+            if line.startswith("***"):
+                in_rules = line.strip() == "*** Defrules ***"
+                continue
+            match = PROFILE_LINE.match(line.strip()) if in_rules else None
+            if match:
+                yield match.group("name"), int(match.group("entries")), float(match.group("seconds"))
+
+    def apply_event(self, data):
+        """
+        Updates system facts based on data from providers, without running the inference engine.
+
+        Parameters:
+            data (Reading or dict): The reading from the provider, or a dictionary containing a use case
+                                    identifier and relevant values.
+        """
+        self.event_table.dispatch(data)
+
+    def reading_handler(self, template_name, field):
+        """Returns the handler updating the slot of a reading fact, registered in the event table."""
+        def handle(value):
+            self.update_fact(template_name, **{field: value})
+        return handle
+
     async def notify(self, data):
         """
         Notification handler that updates system facts based on data from providers.
@@ -110,18 +422,12 @@ class DecisionEngine():
             data (dict): A dictionary containing the data from the provider, including
                          a use case identifier and relevant values.
         """
-        if data["use_case"] == "battery_status":
-            try:
-                self.update_fact('BatteryStatus', percent=data["percent"])
-            except AttributeError:
-                self.add_fact('BatteryStatus', percent=data["percent"])
-        if data["use_case"]  == "sensor_anomaly":
-            try:
-                self.update_fact('SensorAnomalyStatus', confidence=data["confidence"])
-            except AttributeError:
-                self.add_fact('SensorAnomalyStatus', confidence=data["confidence"])
+        start = time.perf_counter()
+        self.apply_event(data)
         #print("======================================================================")
-        self.env.run()
+        self.run()
+        if self.metrics is not None:
+            self.metrics.observe_notify(time.perf_counter() - start)
         """
         # Extract and print facts (for demonstration)
         for fact in self.env.facts():
@@ -129,9 +435,36 @@ class DecisionEngine():
         """
 
 
+def use_case_engine(use_case, **kwargs):
+    """
+    Returns a DecisionEngine with only the state rules of one use case, used as a subsystem engine
+    by partitioned_engine.py. The overall state and action rules are left to the partitioned
+    engine's aggregator.
+    """
+    spec = SPECS[use_case]
+    kept = {spec.rule_name(state) for state, _, _ in spec.band_limits()}
+    # Constructs loaded from a compiled image cannot be undefined
+    engine = DecisionEngine(**{**kwargs, "image_cache_dir": None})
+    for rule in list(engine.env.rules()):
+        if rule.name not in kept:
+            rule.undefine()
+    engine.reset()
+    return engine
+
+
 import asyncio
 from use_cases.battery_status import BatteryStatusProvider
 from use_cases.sensor_anomaly import SensorAnomalyProvider
+from event_recorder import EventRecorder
+from checkpoint import Checkpointer
+from aggregation import AggregationStage
+
+# Set to a file path to record the raw provider inputs, so the run can be replayed with replay.py
+RECORDING_PATH = None
+# Set to a file path to checkpoint the working memory periodically and restore it at startup
+CHECKPOINT_PATH = None
+# Set to True to smooth the readings and only evaluate the engine when a smoothed reading changes band
+AGGREGATE_READINGS = False
 
 async def main():
     """
@@ -139,15 +472,26 @@ async def main():
     """
     engine = DecisionEngine()
     battery_provider = BatteryStatusProvider(start_percent=100.0, step=-10.0, interval=1)
-    battery_provider.add_listener(engine)
+    listener = AggregationStage(engine) if AGGREGATE_READINGS else engine
+    battery_provider.add_listener(listener)
     sensor_anomaly_provider = SensorAnomalyProvider()
-    sensor_anomaly_provider.add_listener(engine)
+    sensor_anomaly_provider.add_listener(listener)
+    if RECORDING_PATH:
+        recorder = EventRecorder(RECORDING_PATH)
+        battery_provider.add_listener(recorder)
+        sensor_anomaly_provider.add_listener(recorder)
+    tasks = []
+    if CHECKPOINT_PATH:
+        checkpointer = Checkpointer(engine, CHECKPOINT_PATH)
+        checkpointer.restore()
+        tasks.append(checkpointer.run())
 
     
     # Run both providers concurrently
     await asyncio.gather(
         sensor_anomaly_provider.start(),
-        battery_provider.start()
+        battery_provider.start(),
+        *tasks
     )
 
 if __name__ == "__main__":
@@ -0,0 +1,78 @@
+import asyncio
+
+from events import code_of, drone_of
+
+
+class CoalescingIngest:
+    """
+    Listener that buffers provider notifications in front of a decision engine.
+
+    Instead of running the engine once per message, incoming payloads are buffered and only
+    the latest payload per drone and ``use_case`` is kept. When the batch size is reached, or when the
+    window expires, the buffered payloads are applied to the engine together and the agenda
+    is run once. Works with both the experta and the clipspy ``DecisionEngine``.
+
+    Usage:
+        engine = DecisionEngine()
+        ingest = CoalescingIngest(engine, window=0.05, batch_size=32)
+        provider.add_listener(ingest)
+        ...
+        await ingest.close()  # at shutdown, applies what is still pending
+    """
+    def __init__(self, engine, window=0.05, batch_size=32):
+        """
+        Parameters:
+            engine: The decision engine, which must provide ``apply_event(data)`` and ``run()``.
+            window (float): Maximum time in seconds a payload waits in the buffer before a flush.
+            batch_size (int): Number of received payloads that triggers an immediate flush.
+        """
+        self.engine = engine
+        self.window = window
+        self.batch_size = batch_size
+        self.pending = {}
+        self.buffered = 0
+        self.received = 0
+        self.coalesced = 0
+        self.flushes = 0
+        self._flush_handle = None
+
+    async def notify(self, data):
+        """Buffers a provider payload, replacing any pending payload of the same drone and use case."""
+        self.received += 1
+        self.buffered += 1
+        key = (drone_of(data), code_of(data))
+        if key in self.pending:
+            self.coalesced += 1
+        self.pending[key] = data
+
+        if self.buffered >= self.batch_size:
+            self.flush()
+        elif self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(self.window, self.flush)
+
+    def flush(self):
+        """Applies all pending payloads to the engine and runs the agenda once."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if not self.pending:
+            return
+        pending, self.pending = self.pending, {}
+        self.buffered = 0
+        for data in pending.values():
+            self.engine.apply_event(data)
+        self.engine.run()
+        self.flushes += 1
+
+    async def close(self):
+        """Cancels the pending window and applies the buffered payloads, so none is lost at shutdown."""
+        self.flush()
+
+    def stats(self):
+        """Returns how many payloads were received, coalesced away and how many engine runs were made."""
+        return {
+            "received": self.received,
+            "coalesced": self.coalesced,
+            "flushes": self.flushes,
+            "pending": len(self.pending),
+        }
@@ -1,13 +1,119 @@
+import atexit
+import gzip
+import json
 import logging
+import logging.handlers
+import queue
+import re
+import shutil
 import sys
 import os
+import time
+
+# Matches ANSI escape sequences such as the color codes used for actions
+ANSI_ESCAPE = re.compile(r"\x1b\[[0-9;]*m")
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """Formats records as compact JSON objects, one per line, with ANSI escape codes removed."""
+    def __init__(self, role):
+        super().__init__()
+        self.role = role
+
+    def format(self, record):
+        return json.dumps(
+            {
+                "ts": round(record.created, 3),
+                "role": self.role,
+                "level": record.levelname,
+                "msg": ANSI_ESCAPE.sub("", record.getMessage()),
+            },
+            separators=(",", ":"),
+        )
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Token bucket filter that lets at most ``rate`` records per second through (with bursts of
+    up to ``burst`` records) and counts the records it drops.
+    """
+    def __init__(self, rate, burst=None):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst or rate
+        self.tokens = self.burst
+        self.last = time.monotonic()
+        self.suppressed = 0
+
+    def filter(self, record):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.last) * self.rate)
+        self.last = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        self.suppressed += 1
+        return False
+
+
+class DroneLoggerAdapter(logging.LoggerAdapter):
+    """
+    Prefixes the messages of a logger with the id of the drone they are about, so the lines of
+    the per-drone engines sharing a log file can be told apart.
+
+    Usage:
+        logger = DroneLoggerAdapter(CustomLogger("drone_actions").get_logger(), {"drone_id": "drone-7"})
+    """
+    def process(self, msg, kwargs):
+        return f"[{self.extra['drone_id']}] {msg}", kwargs
+
+
+def gzip_namer(name):
+    """Names the rotated log files ``<role>.log.<n>.gz``."""
+    return f"{name}.gz"
+
+
+def gzip_rotator(source, dest):
+    """Compresses the log file being rotated out into its backup file."""
+    with open(source, "rb") as source_file, gzip.open(dest, "wb") as dest_file:
+        shutil.copyfileobj(source_file, dest_file)
+    os.remove(source)
 
 
 class CustomLogger:
-    def __init__(self, role="drone_actions"):
+    """
+    Sets up the logger of a role, writing to ``logs/<role>.log`` and to stdout.
+
+    The log directory, handlers and listener thread are only created by the first call to
+    ``get_logger``, so creating a CustomLogger at import time has no side effects. A role is only
+    set up once per process: the CustomLoggers of a role created later, e.g. by another module,
+    share the logger set up by the first one and ignore their own options.
+
+    Parameters:
+        role (str): Name of the logger and of its log file.
+        queued (bool): If True, records are only enqueued by the caller and written to the file and
+                       console by a background listener thread, keeping I/O off the caller's path.
+        json_lines (bool): If True, the file output is compact JSON lines in ``logs/<role>.jsonl``
+                           instead of the text format.
+        console_rate_limit (float): Maximum number of records per second written to the console;
+                                    records above the limit are dropped. None for no limit.
+        max_bytes (int): Size at which the log file is rotated; the rotated files are compressed
+                         with gzip. 0 to never rotate.
+        backup_count (int): Number of rotated files kept, the oldest ones are deleted.
+    """
+    # Loggers already set up in this process, by role
+    loggers = {}
+
+    def __init__(self, role="drone_actions", queued=False, json_lines=False, console_rate_limit=None,
+                 max_bytes=10 * 1024 * 1024, backup_count=5):
         self.role = role
-        self._ensure_log_directory_exists()
-        self.logger = self._setup_logger()
+        self.queued = queued
+        self.json_lines = json_lines
+        self.console_rate_limit = console_rate_limit
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.listener = None
+        self.logger = None
 
     @staticmethod
     def _ensure_log_directory_exists():
@@ -20,33 +126,64 @@ class CustomLogger:
         logger.setLevel(logging.INFO)
         logger.propagate = False  # Prevent logs from being propagated to the root logger
 
-        # Create file handler
-        file_path = os.path.join("logs", f'{self.role}.log')
-        file_handler = logging.FileHandler(file_path, encoding='utf-8')
+        # Create file handler, rotating the file into compressed backups so it does not grow without limit
+        extension = "jsonl" if self.json_lines else "log"
+        file_path = os.path.join("logs", f'{self.role}.{extension}')
+        file_handler = logging.handlers.RotatingFileHandler(
+            file_path, maxBytes=self.max_bytes, backupCount=self.backup_count, encoding='utf-8'
+        )
+        file_handler.namer = gzip_namer
+        file_handler.rotator = gzip_rotator
         file_handler.setLevel(logging.INFO)
 
         # Create console handler
         console_handler = logging.StreamHandler(sys.stdout)
         console_handler.setLevel(logging.INFO)
+        if self.console_rate_limit:
+            console_handler.addFilter(RateLimitFilter(self.console_rate_limit))
 
         # Create a formatter
         formatter = logging.Formatter(
             f'[%(asctime)s] [{self.role}] %(levelname)s %(message)s'
         )
-        file_handler.setFormatter(formatter)
+        file_handler.setFormatter(JsonLinesFormatter(self.role) if self.json_lines else formatter)
         console_handler.setFormatter(formatter)
 
-        # Add the handlers to the logger
-        logger.addHandler(file_handler)
-        logger.addHandler(console_handler)
+        if self.queued:
+            # The logger only enqueues records; the listener thread does the file and console I/O
+            log_queue = queue.SimpleQueue()
+            logger.addHandler(logging.handlers.QueueHandler(log_queue))
+            self.listener = logging.handlers.QueueListener(
+                log_queue, file_handler, console_handler, respect_handler_level=True
+            )
+            self.listener.start()
+            atexit.register(self.stop)
+        else:
+            # Add the handlers to the logger
+            logger.addHandler(file_handler)
+            logger.addHandler(console_handler)
 
         return logger
 
     def get_logger(self):
+        if self.logger is None:
+            self.logger = CustomLogger.loggers.get(self.role)
+        if self.logger is None:
+            self._ensure_log_directory_exists()
+            self.logger = CustomLogger.loggers[self.role] = self._setup_logger()
         return self.logger
 
+    def stop(self):
+        """Writes out the queued records and stops the background listener, if any."""
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+
 
 # Usage example:
 # logger_instance = CustomLogger("drone_actions")
 # logger = logger_instance.get_logger()
-# logger.info("This is an info message!")
\ No newline at end of file
+# logger.info("This is an info message!")
+#
+# Queued logging with JSON lines output and at most 20 console lines per second:
+# logger_instance = CustomLogger("drone_actions", queued=True, json_lines=True, console_rate_limit=20)
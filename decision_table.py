@@ -0,0 +1,206 @@
+"""
+Declarative state thresholds shared by all decision engine backends.
+
+Each use case describes its state bands in a JSON spec next to its provider (``use_cases/<use_case>.json``):
+the reading field, the status and state facts, and the ordered bands of the reading with their
+inclusive upper bounds. A spec compiles into:
+
+- a decision table, classifying a reading with a binary search over the band bounds (pure Python fast path),
+- the ``<rule_prefix>_<state>`` rules of the experta ``DecisionEngine``,
+- the state rules of the CLIPS ``DecisionEngine`` in ``clipspy/state_rules.clp``.
+
+After changing a spec, regenerate the CLIPS rules with:
+    python decision_table.py
+"""
+import argparse
+import bisect
+import glob
+import json
+import os
+import sys
+
+path_to_current_dir = os.path.dirname(__file__)
+SPEC_DIR = os.path.join(path_to_current_dir, "use_cases")
+CLIPS_STATE_RULES_PATH = os.path.join(path_to_current_dir, "clipspy", "state_rules.clp")
+
+# Defining a mapping between state values and descriptions
+STATE_MAP = {
+    0: "Normal",
+    1: "Mild",
+    2: "Severe",
+    3: "Critical"
+}
+
+
+class UseCaseSpec:
+    """
+    State bands of one use case, compiled into a decision table.
+
+    A reading belongs to the first band whose upper bound it does not exceed (``value <= upper``);
+    the last band has no upper bound and takes every larger reading. The optional ``aggregation``
+    settings configure the smoothing and hysteresis of the use case in ``aggregation.py``.
+    """
+    def __init__(self, use_case, field, status_fact, state_fact, rule_prefix, label, bands, aggregation=None):
+        if not bands or bands[-1]["upper"] is not None:
+            raise ValueError(f"{use_case}: the last band must have no upper bound")
+        self.use_case = use_case
+        self.field = field
+        self.status_fact = status_fact
+        self.state_fact = state_fact
+        self.rule_prefix = rule_prefix
+        self.label = label
+        self.bands = bands
+        self.aggregation = aggregation or {}
+        # Decision table: sorted upper bounds and the state of each band
+        self.bounds = [band["upper"] for band in bands[:-1]]
+        self.states = [band["state"] for band in bands]
+        if self.bounds != sorted(set(self.bounds)) or None in self.bounds:
+            raise ValueError(f"{use_case}: band upper bounds must be strictly increasing")
+        if any(state not in STATE_MAP for state in self.states):
+            raise ValueError(f"{use_case}: band states must be one of {sorted(STATE_MAP)}")
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, encoding="utf-8") as spec_file:
+            return cls(**json.load(spec_file))
+
+    def band_index(self, value):
+        """Returns the index of the band of a reading, using a binary search over the band bounds."""
+        return bisect.bisect_left(self.bounds, value)
+
+    def classify(self, value):
+        """Returns the state value of a reading."""
+        return self.states[self.band_index(value)]
+
+    def band_limits(self):
+        """Yields the state, exclusive lower bound and inclusive upper bound of each band (None if unbounded)."""
+        lower = None
+        for band in self.bands:
+            yield band["state"], lower, band["upper"]
+            lower = band["upper"]
+
+    def rule_name(self, state):
+        return f"{self.rule_prefix}_{STATE_MAP[state].lower()}"
+
+    def message(self, state):
+        return f"{self.label} {state}: {STATE_MAP[state]}"
+
+
+def load_specs(directory=SPEC_DIR):
+    """Loads the specs of every use case in a directory, keyed by use case."""
+    specs = {}
+    for path in sorted(glob.glob(os.path.join(directory, "*.json"))):
+        spec = UseCaseSpec.from_file(path)
+        specs[spec.use_case] = spec
+    return specs
+
+
+SPECS = load_specs()
+
+
+def classify(use_case, value):
+    """Returns the state value of a reading of the given use case."""
+    return SPECS[use_case].classify(value)
+
+
+def experta_rules(spec, fact_types):
+    """
+    Generates the state rules of a use case for the experta DecisionEngine.
+
+    Parameters:
+        spec (UseCaseSpec): The use case spec.
+        fact_types (dict): Maps fact class names to the experta Fact classes.
+
+    Returns:
+        dict: Rules keyed by rule name, to be set as attributes of the DecisionEngine class.
+    """
+    from experta import Rule, P
+
+    status_fact = fact_types[spec.status_fact]
+    state_fact = fact_types[spec.state_fact]
+
+    def state_rule(state, lower, upper):
+        name = spec.rule_name(state)
+        message = spec.message(state)
+
+        def in_band(value):
+            return (lower is None or value > lower) and (upper is None or value <= upper)
+
+        def rule(self):
+            if self.fire_on_change(name, self.update_state(state_fact, state)):
+                self.logger.info(message)
+
+        rule.__name__ = name
+        return Rule(status_fact(**{spec.field: P(in_band)}))(rule)
+
+    return {spec.rule_name(state): state_rule(state, lower, upper) for state, lower, upper in spec.band_limits()}
+
+
+def clips_state_description_function():
+    """Generates the getStateDescription deffunction, a constant time lookup into STATE_MAP."""
+    if sorted(STATE_MAP) != list(range(len(STATE_MAP))):
+        raise ValueError("STATE_MAP must map consecutive state values starting at 0")
+    descriptions = " ".join(f'"{STATE_MAP[state]}"' for state in sorted(STATE_MAP))
+    return (
+        "; Function to map state value to state description\n"
+        "(deffunction getStateDescription (?state-value)\n"
+        f"    (if (and (integerp ?state-value) (>= ?state-value 0) (< ?state-value {len(STATE_MAP)})) then\n"
+        f"        (nth$ (+ ?state-value 1) (create$ {descriptions}))\n"
+        "    else\n"
+        '        "Unknown"))\n'
+    )
+
+
+def clips_rules(spec):
+    """Generates the CLIPS state rules of a use case."""
+    variable = f"?{spec.field[0]}"
+    rules = [f"; Rules for setting {spec.state_fact} based on {spec.status_fact} {spec.field}"]
+    for state, lower, upper in spec.band_limits():
+        constraints = []
+        if lower is not None:
+            constraints.append(f":(> {variable} {lower})")
+        if upper is not None:
+            constraints.append(f":(<= {variable} {upper})")
+        description = STATE_MAP[state]
+        rules.append(
+            f"(defrule {spec.rule_name(state)}\n"
+            f"    ({spec.status_fact} ({spec.field} {variable}&{'&'.join(constraints)}))\n"
+            f"    ?f <- ({spec.state_fact} (state_value ?v&:(neq ?v {state})))\n"
+            "    =>\n"
+            f'    (modify ?f (state_value {state}) (state_description "{description}"))\n'
+            f'    (printout t "{spec.message(state)}" crlf))\n'
+        )
+    return "\n".join(rules)
+
+
+def clips_source(specs=None):
+    """Returns the content of the generated CLIPS state rules file."""
+    specs = SPECS if specs is None else specs
+    sections = [
+        "; Generated by decision_table.py from use_cases/*.json, do not edit by hand.",
+        clips_state_description_function(),
+    ]
+    sections.extend(clips_rules(spec) for spec in specs.values())
+    return "\n\n".join(section.rstrip("\n") for section in sections) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate the CLIPS state rules from the use case specs.")
+    parser.add_argument("--check", action="store_true", help="only check that the generated file is up to date")
+    args = parser.parse_args()
+
+    source = clips_source()
+    if args.check:
+        with open(CLIPS_STATE_RULES_PATH, encoding="utf-8") as clp_file:
+            if clp_file.read() != source:
+                print(f"{CLIPS_STATE_RULES_PATH} is out of date, run: python decision_table.py")
+                return 1
+        return 0
+    with open(CLIPS_STATE_RULES_PATH, "w", encoding="utf-8") as clp_file:
+        clp_file.write(source)
+    print(f"Wrote {CLIPS_STATE_RULES_PATH}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
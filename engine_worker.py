@@ -0,0 +1,225 @@
+"""
+Decision engine running off the asyncio event loop.
+
+The engines' ``notify`` coroutines run the inference synchronously, so the event loop, and with
+it every provider timer, stalls for the duration of each ``run()``. ``EngineWorker`` owns an
+engine in a dedicated thread or subprocess behind a mailbox: ``notify`` enqueues the payload and
+returns immediately, and the resulting state values come back through the future returned by
+``submit`` and through an optional ``on_decision`` callback, both on the event loop.
+
+The thread mode suits the CLIPS backend, whose inference runs in C. The experta backend is pure
+Python and still competes with the event loop for the GIL in a thread; use the process mode to
+keep provider timing unaffected by its rule load. Subprocesses are spawned, not forked, so the
+engine factory is imported afresh in the child, which sets up its own loggers.
+
+Usage:
+    worker = EngineWorker(BackendEngineFactory("experta"), use_process=True, on_decision=print)
+    worker.start()
+    provider.add_listener(worker)
+"""
+import asyncio
+import itertools
+import multiprocessing
+import queue
+import threading
+
+
+def _evaluate(engine, data):
+    """Applies one payload, runs the engine and returns the resulting state values."""
+    engine.apply_event(data)
+    engine.run()
+    return engine.state_values()
+
+
+# Seconds the collector waits for a result before checking that the subprocess is still alive
+LIVENESS_INTERVAL = 0.5
+
+
+def _engine_process(engine_factory, requests, results):
+    """
+    Subprocess loop: evaluates the requests in order and sends back the decisions or errors. A
+    failure to build the engine is sent back with no sequence number, as it fails the worker.
+    """
+    try:
+        engine = engine_factory()
+    except Exception as error:
+        results.put((None, None, f"engine factory failed: {error!r}"))
+        return
+    while True:
+        request = requests.get()
+        if request is None:
+            break
+        seq, data = request
+        try:
+            results.put((seq, _evaluate(engine, data), None))
+        except Exception as error:
+            results.put((seq, None, repr(error)))
+    results.put(None)
+
+
+class EngineWorkerError(RuntimeError):
+    """Raised by a decision future when the engine failed to evaluate its payload, or the worker failed."""
+
+
+class EngineWorker:
+    """
+    Listener evaluating payloads with an engine owned by a dedicated thread or subprocess.
+
+    Payloads are evaluated one at a time in submission order. Decisions are the engine's
+    ``state_values()`` after each payload. If the worker fails, because the engine factory raised
+    or the subprocess died, the pending futures and those of later payloads fail with an
+    EngineWorkerError instead of never resolving.
+
+    Methods:
+        start: Starts the worker; must be called from the event loop receiving the decisions.
+        submit: Enqueues a payload and returns a future resolved with its decision.
+        notify: Listener entry point, enqueues a payload without waiting for its decision.
+        drain: Waits until every submitted payload has been evaluated.
+        stats: Returns the submitted, completed, failed and pending counts.
+        stop: Stops the worker after the queued payloads have been evaluated.
+    """
+    def __init__(self, engine_factory, use_process=False, on_decision=None):
+        """
+        Parameters:
+            engine_factory (callable): Called without arguments in the worker to build the engine,
+                                       which must provide ``apply_event``, ``run`` and
+                                       ``state_values``. Must be picklable in process mode.
+            use_process (bool): Run the engine in a subprocess instead of a thread.
+            on_decision (callable): Called on the event loop with each payload and its decision.
+        """
+        self.engine_factory = engine_factory
+        self.use_process = use_process
+        self.on_decision = on_decision
+        self.pending = {}
+        self.sequence = itertools.count()
+        self.submitted = 0
+        self.completed = 0
+        self.errors = 0
+        self.loop = None
+        self.threads = []
+        self.process = None
+        self.failure = None
+
+    def start(self):
+        self.loop = asyncio.get_running_loop()
+        if self.use_process:
+            # A forked child would inherit the parent's started logging queue handlers without the
+            # listener threads draining them; a spawned one sets up its own logging
+            context = multiprocessing.get_context("spawn")
+            self.requests = context.Queue()
+            self.results = context.Queue()
+            self.process = context.Process(
+                target=_engine_process, args=(self.engine_factory, self.requests, self.results),
+                name="engine-worker", daemon=True,
+            )
+            self.process.start()
+            target = self._collect_results
+        else:
+            self.requests = queue.SimpleQueue()
+            target = self._run_engine
+        thread = threading.Thread(target=target, name="engine-worker", daemon=True)
+        thread.start()
+        self.threads.append(thread)
+
+    def _run_engine(self):
+        """Thread mode loop, the engine never leaves this thread."""
+        try:
+            engine = self.engine_factory()
+        except Exception as error:
+            self.loop.call_soon_threadsafe(self._fail, f"engine factory failed: {error!r}")
+            return
+        while True:
+            request = self.requests.get()
+            if request is None:
+                break
+            seq, data = request
+            try:
+                decision, error = _evaluate(engine, data), None
+            except Exception as exception:
+                decision, error = None, repr(exception)
+            self.loop.call_soon_threadsafe(self._resolve, seq, decision, error)
+
+    def _collect_results(self):
+        """
+        Process mode: hands the decisions sent back by the subprocess over to the event loop, and
+        fails the worker if the subprocess reports a failure or exits without stopping.
+        """
+        while True:
+            try:
+                result = self.results.get(timeout=LIVENESS_INTERVAL)
+            except queue.Empty:
+                if self.process.is_alive():
+                    continue
+                self.loop.call_soon_threadsafe(
+                    self._fail, f"engine worker process exited with code {self.process.exitcode}")
+                break
+            if result is None:
+                break
+            seq, decision, error = result
+            if seq is None:
+                self.loop.call_soon_threadsafe(self._fail, error)
+                break
+            self.loop.call_soon_threadsafe(self._resolve, seq, decision, error)
+
+    def _fail(self, error):
+        """Fails the worker: the pending payloads and those submitted later fail with the error."""
+        self.failure = error
+        for seq in list(self.pending):
+            self._resolve(seq, None, error)
+
+    def _resolve(self, seq, decision, error):
+        data, future = self.pending.pop(seq)
+        if error is not None:
+            self.errors += 1
+            if not future.cancelled():
+                future.set_exception(EngineWorkerError(error))
+            return
+        self.completed += 1
+        if not future.cancelled():
+            future.set_result(decision)
+        if self.on_decision is not None:
+            self.on_decision(data, decision)
+
+    def submit(self, data):
+        """Enqueues a payload and returns a future resolved with its decision."""
+        if self.loop is None:
+            raise RuntimeError("EngineWorker.start() must be called before payloads are submitted")
+        seq = next(self.sequence)
+        future = self.loop.create_future()
+        # Nobody may await the futures of notify(), don't report their errors as never retrieved
+        future.add_done_callback(lambda done: done.cancelled() or done.exception())
+        self.pending[seq] = (data, future)
+        self.submitted += 1
+        if self.failure is not None:
+            self._resolve(seq, None, self.failure)
+        else:
+            self.requests.put((seq, data))
+        return future
+
+    async def notify(self, data):
+        self.submit(data)
+
+    async def drain(self):
+        """Waits until every submitted payload has been evaluated, whatever its outcome."""
+        futures = [future for _, future in self.pending.values()]
+        if futures:
+            await asyncio.wait(futures)
+
+    def stats(self):
+        return {
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "errors": self.errors,
+            "pending": len(self.pending),
+        }
+
+    async def stop(self):
+        """Evaluates the queued payloads, then stops the worker."""
+        await self.drain()
+        self.requests.put(None)
+        if self.process is not None:
+            await asyncio.to_thread(self.process.join)
+            self.process = None
+        for thread in self.threads:
+            await asyncio.to_thread(thread.join)
+        self.threads = []
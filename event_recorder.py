@@ -0,0 +1,20 @@
+import json
+import time
+
+from events import as_payload
+
+
+class EventRecorder:
+    """
+    Listener writing every provider payload, with its arrival time as ``ts``, as a JSON line.
+    Attach it to the providers next to the engine to record a mission for ``replay.py``.
+    """
+    def __init__(self, path):
+        # Line buffered, so a crash loses at most the event being written
+        self.file = open(path, "a", encoding="utf-8", buffering=1)
+
+    async def notify(self, data):
+        self.file.write(json.dumps({"ts": time.time(), **as_payload(data)}, separators=(",", ":")) + "\n")
+
+    def close(self):
+        self.file.close()
@@ -0,0 +1,99 @@
+"""
+Compact typed events and table-driven dispatch of provider readings.
+
+Providers historically publish dicts such as ``{"use_case": "battery_status", "percent": 40.0}``.
+A ``Reading`` carries the same information in a slotted object with an integer use case code,
+and an ``EventTable`` maps codes straight to the fact-update handlers of an engine, so
+dispatching costs a list index instead of chained string comparisons. The dict payloads stay
+supported: the table resolves their code from the ``use_case`` key.
+
+Use case codes follow the order of the specs in ``use_cases/*.json``.
+"""
+from decision_table import SPECS
+
+# Code of each use case, the use case of each code and the payload field holding its value
+USE_CASE_CODES = {use_case: code for code, use_case in enumerate(SPECS)}
+USE_CASES = list(SPECS)
+FIELDS = [SPECS[use_case].field for use_case in USE_CASES]
+
+
+class Reading:
+    """A provider reading: use case code, value, and optionally the drone id and timestamp."""
+    __slots__ = ("code", "value", "drone_id", "ts")
+
+    def __init__(self, code, value, drone_id=None, ts=None):
+        self.code = code
+        self.value = value
+        self.drone_id = drone_id
+        self.ts = ts
+
+    def __eq__(self, other):
+        return isinstance(other, Reading) and (self.code, self.value, self.drone_id, self.ts) == (
+            other.code, other.value, other.drone_id, other.ts)
+
+    def __repr__(self):
+        return f"Reading({USE_CASES[self.code]}={self.value!r}, drone_id={self.drone_id!r})"
+
+    @property
+    def use_case(self):
+        return USE_CASES[self.code]
+
+
+def code_of(event):
+    """Returns the use case code of a Reading or a dict payload, None for an unknown use case."""
+    if isinstance(event, Reading):
+        return event.code
+    return USE_CASE_CODES.get(event["use_case"])
+
+
+def drone_of(event):
+    """Returns the drone id of a Reading or a dict payload, None if it has none."""
+    if isinstance(event, Reading):
+        return event.drone_id
+    return event.get("drone_id")
+
+
+def as_reading(event):
+    """Adapts a dict payload to a Reading; Readings are returned as they are."""
+    if isinstance(event, Reading):
+        return event
+    code = USE_CASE_CODES[event["use_case"]]
+    return Reading(code, event[FIELDS[code]], event.get("drone_id"), event.get("ts"))
+
+
+def as_payload(event):
+    """Adapts a Reading to a dict payload; dicts are returned as they are."""
+    if not isinstance(event, Reading):
+        return event
+    data = {"use_case": USE_CASES[event.code], FIELDS[event.code]: event.value}
+    if event.drone_id is not None:
+        data["drone_id"] = event.drone_id
+    return data
+
+
+class EventTable:
+    """
+    Maps use case codes to handlers called with the reading value.
+
+    Usage:
+        table = EventTable()
+        table.register("battery_status", lambda percent: ...)
+        table.dispatch(Reading(USE_CASE_CODES["battery_status"], 40.0))
+        table.dispatch({"use_case": "battery_status", "percent": 40.0})
+    """
+    def __init__(self):
+        self.handlers = [None] * len(USE_CASES)
+
+    def register(self, use_case, handler):
+        self.handlers[USE_CASE_CODES[use_case]] = handler
+
+    def dispatch(self, event):
+        """Calls the handler of an event's use case. Events of use cases without a handler are ignored."""
+        if isinstance(event, Reading):
+            handler = self.handlers[event.code]
+            if handler is not None:
+                handler(event.value)
+            return
+        code = USE_CASE_CODES.get(event["use_case"])
+        if code is not None and self.handlers[code] is not None:
+            self.handlers[code](event[FIELDS[code]])
@@ -1,8 +1,18 @@
 import asyncio
+import functools
+import inspect
+import logging
+import time
+from collections import Counter, defaultdict
 from experta import *
+from experta.factlist import FactList
 
+import batch_evaluation
 from custom_logger import CustomLogger
-logger_instance = CustomLogger("drone_actions")
+from decision_table import SPECS, STATE_MAP, experta_rules
+from events import EventTable
+from instrumentation import EngineMetrics
+logger_instance = CustomLogger("drone_actions", queued=True)
 
 # Define facts
 class BatteryStatus(Fact):
@@ -43,39 +53,199 @@ class OverallState(Fact):
     state_description = Field(str, mandatory=True)
 
 
-# Defining a mapping between state values and descriptions
-STATE_MAP = {
-    0: "Normal",
-    1: "Mild",
-    2: "Severe",
-    3: "Critical"
-}
+# State facts reported by DecisionEngine.state_values
+STATE_FACTS = [globals()[spec.state_fact] for spec in SPECS.values()] + [OverallState]
+# Facts saved by DecisionEngine.checkpoint: the readings and the states
+CHECKPOINT_FACTS = {fact_type.__name__: fact_type for fact_type in [globals()[spec.status_fact] for spec in SPECS.values()] + STATE_FACTS}
+
+
+class IndexedFactList(FactList):
+    """
+    Fact list that keeps an index of the declared facts by fact class, so lookups by type
+    do not need to scan the whole working memory.
+
+    Every class in the fact's MRO (up to ``Fact``) is indexed, which keeps ``isinstance``
+    semantics for subclassed facts. Fact classes may also set ``__index_key__`` to the name
+    of one of their fields (e.g. ``drone_id``) to be indexed by that field's value as well.
+    """
+    def __init__(self):
+        super().__init__()
+        self._by_type = defaultdict(dict)
+        self._by_key = defaultdict(dict)
+
+    @staticmethod
+    def _indexed_types(fact):
+        for fact_type in type(fact).__mro__:
+            if fact_type is Fact:
+                break
+            yield fact_type
+
+    @staticmethod
+    def _key_of(fact_type, fact):
+        key_field = getattr(fact_type, "__index_key__", None)
+        if key_field is None:
+            return None
+        return fact.get(key_field)
+
+    def declare(self, fact):
+        declared = super().declare(fact)
+        if declared is not None:
+            idx = declared.__factid__
+            for fact_type in self._indexed_types(declared):
+                self._by_type[fact_type][idx] = declared
+                key = self._key_of(fact_type, declared)
+                if key is not None:
+                    self._by_key[(fact_type, key)][idx] = declared
+        return declared
+
+    def retract(self, idx_or_fact):
+        idx = idx_or_fact if isinstance(idx_or_fact, int) else idx_or_fact.__factid__
+        fact = self.get(idx)
+        idx = super().retract(idx_or_fact)
+        for fact_type in self._indexed_types(fact):
+            self._by_type[fact_type].pop(idx, None)
+            key = self._key_of(fact_type, fact)
+            if key is not None:
+                bucket = self._by_key[(fact_type, key)]
+                bucket.pop(idx, None)
+                if not bucket:
+                    del self._by_key[(fact_type, key)]
+        return idx
+
+    def of_type(self, fact_type, key=None):
+        """Returns the declared facts of the given type (and key, if given) in declaration order."""
+        if key is None:
+            return list(self._by_type.get(fact_type, {}).values())
+        return list(self._by_key.get((fact_type, key), {}).values())
+
+    def first(self, fact_type, key=None):
+        """Returns the first declared fact of the given type (and key, if given), or None."""
+        bucket = self._by_type.get(fact_type) if key is None else self._by_key.get((fact_type, key))
+        if not bucket:
+            return None
+        return next(iter(bucket.values()))
+
 
 # Define the KnowledgeEngine
 class DecisionEngine(KnowledgeEngine):
     """
     Knowledge engine for managing the drone's operational state based on battery status and sensor anomalies.
+
+    In edge-triggered mode, readings equal to the current ones are not re-declared, and the state
+    and action rules only take effect (update and log) when their state actually changes. The
+    activations that were suppressed are counted per rule in ``suppressed``.
+
+    When instrumented (opt-in, as in the CLIPS engine), rule activations, firings and handler
+    times as well as the notify latency and working-memory size are recorded in ``metrics`` (see ``instrumentation.EngineMetrics``).
+    An instrumented engine is built as an instance of ``instrumented_engine_class(cls)``, whose rules
+    time their handler; the rules of an engine that is not instrumented are left unwrapped.
+
+    With an ``action_executor`` (see ``action_executor.py``), the action rules log their action
+    and enqueue it into the executor instead of carrying it out while the engine runs.
     """
-    def __init__(self):
+    # Set on the classes built by instrumented_engine_class
+    timed_rules = False
+
+    def __new__(cls, *args, instrumented=False, **kwargs):
+        if instrumented and not cls.timed_rules:
+            cls = instrumented_engine_class(cls)
+        return super().__new__(cls)
+
+    def __init__(self, logger=None, edge_triggered=False, instrumented=False, action_executor=None):
         super().__init__()
-        self.logger = logger_instance.get_logger()
+        self.logger = logger or logger_instance.get_logger()
+        self.edge_triggered = edge_triggered
+        self.action_executor = action_executor
+        self.metrics = EngineMetrics() if instrumented else None
+        self.suppressed = Counter()
+        self.last_action_state = None
+        # Fact-update handler of each use case, indexed by use case code
+        self.event_table = EventTable()
+        for spec in SPECS.values():
+            self.event_table.register(spec.use_case, self.reading_handler(globals()[spec.status_fact], spec.field))
         self.reset()
 
-    def get_fact(self, fact_type):
-        """Retrieves the first fact of the specified type from the fact list."""
-        for fact in self.facts.values():
-            if isinstance(fact, fact_type):
-                return fact
-        return None
+    @property
+    def facts(self):
+        return self._facts
+
+    @facts.setter
+    def facts(self, fact_list):
+        # KnowledgeEngine assigns a fresh, empty FactList on __init__ and reset(); swap in the indexed one
+        if not isinstance(fact_list, IndexedFactList):
+            fact_list = IndexedFactList()
+        self._facts = fact_list
+
+    def get_activations(self):
+        """Returns the activations added and removed since the last call, counting the added ones per rule."""
+        added, removed = super().get_activations()
+        if self.metrics is not None:
+            for activation in added:
+                self.metrics.observe_activation(activation.rule.__name__)
+        return added, removed
+
+    def metrics_snapshot(self):
+        """Returns the recorded metrics as plain data, or None if the engine is not instrumented."""
+        return self.metrics.snapshot() if self.metrics is not None else None
+
+    def state_values(self):
+        """Returns the current value of every state fact, keyed by fact name (None if not declared yet)."""
+        values = {}
+        for fact_type in STATE_FACTS:
+            fact = self.get_fact(fact_type)
+            values[fact_type.__name__] = fact["state_value"] if fact is not None else None
+        return values
+
+    def checkpoint(self):
+        """Returns the readings and state facts and the last actioned state as plain data (see checkpoint.py)."""
+        facts = [
+            {"template": type(fact).__name__, "slots": fact.as_dict()}
+            for fact in self.facts.values() if type(fact).__name__ in CHECKPOINT_FACTS
+        ]
+        return {"facts": facts, "last_action_state": self.last_action_state}
+
+    def restore(self, checkpoint):
+        """
+        Resets the engine and declares the facts of a checkpoint. The rules matching them fire on the
+        next run; in edge-triggered mode, the restored states and action are not logged again.
+        """
+        self.reset()
+        for fact in checkpoint["facts"]:
+            fact_type = CHECKPOINT_FACTS.get(fact["template"])
+            if fact_type is not None:
+                self.update_fact(fact_type, **fact["slots"])
+        self.last_action_state = checkpoint.get("last_action_state")
+
+    @classmethod
+    def batch_engine(cls, action_recorder):
+        """
+        Returns an engine for batch_evaluation.py: not instrumented, not logging, recording its
+        actions, and starting with every use case state Normal, see batch_engine_class.
+        """
+        logger = logging.Logger("batch_evaluation")
+        logger.disabled = True
+        return batch_engine_class(cls)(logger=logger, instrumented=False, action_executor=action_recorder)
+
+    @classmethod
+    def evaluate_batch(cls, snapshots, processes=None, chunk_size=256):
+        """
+        Evaluates input snapshots, e.g. ``{"battery_status": 40.0, "sensor_anomaly": 0.6}``, on a
+        process pool with one engine per worker. Returns a generator of the state values and fired
+        actions of each snapshot, in input order (see batch_evaluation.py).
+        """
+        return batch_evaluation.evaluate_batch(cls.batch_engine, snapshots, processes, chunk_size)
+
+    def get_fact(self, fact_type, key=None):
+        """Retrieves the first fact of the specified type (and index key, if given) from the fact list."""
+        return self.facts.first(fact_type, key)
     
     def add_fact(self, fact):
         """Adds a new fact to the system."""
         self.declare(fact)
 
-    def remove_fact(self, fact_type):
-        """Remove all facts of a specific type from the system."""
-        to_remove = [fact for fact in self.facts.values() if isinstance(fact, fact_type)]
-        for fact in to_remove:
+    def remove_fact(self, fact_type, key=None):
+        """Remove all facts of a specific type (and index key, if given) from the system."""
+        for fact in self.facts.of_type(fact_type, key):
             self.retract(fact)
 
     def update_fact(self, fact_type, **kwargs):
@@ -83,82 +253,92 @@ class DecisionEngine(KnowledgeEngine):
         Updates facts of a specific type. If the fact exists, it's updated with provided keyword arguments;
         otherwise, a new fact is created and added to the system.
         """
-        self.remove_fact(fact_type)  # First, remove all existing facts of this type
+        key_field = getattr(fact_type, "__index_key__", None)
+        self.remove_fact(fact_type, kwargs.get(key_field))  # First, remove all existing facts of this type (and key)
         new_fact = fact_type(**kwargs)  # Create a new fact instance with the updated information
         self.add_fact(new_fact)  # Add the new fact to the system
 
+    def apply_event(self, data):
+        """
+        Updates the system facts based on the data received from a provider (a Reading or a dict),
+        without running the engine.
+        """
+        self.event_table.dispatch(data)
+
+    def reading_handler(self, fact_type, field):
+        """Returns the handler updating a reading fact, registered in the event table."""
+        def handle(value):
+            self.update_reading(fact_type, **{field: value})
+        return handle
+
+    def update_reading(self, fact_type, **kwargs):
+        """
+        Updates a reading fact. In edge-triggered mode, a reading equal to the declared one is
+        skipped, as re-declaring it would only re-fire the rules with the same outcome.
+        """
+        if self.edge_triggered:
+            current = self.get_fact(fact_type)
+            if current is not None and all(current.get(field) == value for field, value in kwargs.items()):
+                self.suppressed[fact_type.__name__] += 1
+                return
+        self.update_fact(fact_type, **kwargs)
+
     async def notify(self, data):
         """
         Notification handler for updates from providers (battery status or sensor anomalies).
         Updates the system facts based on the received data.
         """
-        if data["use_case"] == "battery_status":
-            self.update_fact(BatteryStatus, percent=data["percent"])
-        if data["use_case"]  == "sensor_anomaly":
-            self.update_fact(SensorAnomalyStatus, confidence=data["confidence"])
-        #print("======================================================================")
+        start = time.perf_counter()
+        self.apply_event(data)
         self.run()
-        #print(f"\nFacts:\n{self.facts}")
+        if self.metrics is not None:
+            self.metrics.observe_notify(time.perf_counter() - start, len(self.facts))
 
     def update_state(self, fact_type, new_state_value):
         """
         Updates the state of a given type only if it has changed.
         If the current state is not present or differs from the new state, the fact is updated.
+        Returns True if the state was declared or changed.
         """
         current_state = self.get_fact(fact_type)
         if current_state is None:
             self.declare(fact_type(state_value=new_state_value, state_description=STATE_MAP.get(new_state_value, "Unknown")))
         elif new_state_value != current_state["state_value"]:
             self.update_fact(fact_type, state_value=new_state_value, state_description=STATE_MAP.get(new_state_value, "Unknown"))
+        else:
+            return False
+        return True
+
+    def fire_on_change(self, rule_name, changed):
+        """
+        Returns whether a rule activation should take effect. Always True unless in edge-triggered
+        mode, where activations without a state change are suppressed and counted.
+        """
+        if changed or not self.edge_triggered:
+            return True
+        self.suppressed[rule_name] += 1
+        return False
+
+    def fire_action(self, rule_name, state_value, message):
+        """
+        Logs the action of an overall state and enqueues it into the action executor, if any, only
+        on a change of the actioned state in edge-triggered mode.
+        """
+        changed = state_value != self.last_action_state
+        self.last_action_state = state_value
+        if not self.fire_on_change(rule_name, changed):
+            return
+        self.logger.info(message)
+        if self.action_executor is not None:
+            self.action_executor.submit(rule_name, state_value)
     
     @DefFacts()
     def _initial_action(self):
         yield OverallState(state_value=0, state_description=STATE_MAP.get(0, "Unknown"))
         self.logger.info("Overall state 0: Normal")
 
-    # Rules to setup battery states with respect to the percent battery remaining
-    @Rule(BatteryStatus(percent=P(lambda P: P > 75)))
-    def battery_state_normal(self):
-        self.update_state(BatteryState, 0)
-        self.logger.info("Battery State 0: Normal")
-    
-    @Rule(BatteryStatus(percent=P(lambda P: 50 < P <= 75)))
-    def battery_state_mild(self):
-        self.update_state(BatteryState, 1)
-        self.logger.info("Battery State 1: Mild")
-    
-    @Rule(BatteryStatus(percent=P(lambda P: 25 < P <= 50)))
-    def battery_state_severe(self):
-        self.update_state(BatteryState, 2)
-        self.logger.info("Battery State 2: Severe")
-    
-    @Rule(BatteryStatus(percent=P(lambda P: P <= 25)))
-    def battery_state_critical(self):
-        self.update_state(BatteryState, 3)
-        self.logger.info("Battery State 3: Critical")
-
-
-    # Rules to setup sensor anomaly states with respect to the anomaly detection confidence level
-    @Rule(SensorAnomalyStatus(confidence=P(lambda c: c <= 0.25)))
-    def sensor_anomaly_state_normal(self):
-        self.update_state(SensorAnomalyState, 0)
-        self.logger.info("Sensor Anomaly State 0: Normal")
-    
-    @Rule(SensorAnomalyStatus(confidence=P(lambda c: 0.25 < c <= 0.5)))
-    def sensor_anomaly_state_mild(self):
-        self.update_state(SensorAnomalyState, 1)
-        self.logger.info("Sensor Anomaly State 1: Mild")
-    
-    @Rule(SensorAnomalyStatus(confidence=P(lambda c: 0.5 < c <= 0.75)))
-    def sensor_anomaly_state_severe(self):
-        self.update_state(SensorAnomalyState, 2)
-        self.logger.info("Sensor Anomaly State 2: Severe")
-    
-    @Rule(SensorAnomalyStatus(confidence=P(lambda c: 0.75 < c <= 1)))
-    def sensor_anomaly_state_critical(self):
-        self.update_state(SensorAnomalyState, 3)
-        self.logger.info("Sensor Anomaly State 3: Critical")
-
+    # Rules to setup the battery and sensor anomaly states (battery_state_*, sensor_anomaly_state_*)
+    # are generated from the use case specs, see the end of the class definition
 
     # Rule to determine overall state
     @Rule(BatteryState(state_value=P(lambda state_value: state_value >= 0)) | SensorAnomalyState(state_value=P(lambda state_value: state_value >= 0)))
@@ -178,43 +358,139 @@ class DecisionEngine(KnowledgeEngine):
         overall_state_value = max(battery_state_value, sensor_anomaly_state_value)
         
         # Update OverallState
-        self.update_state(OverallState, overall_state_value)
-        self.logger.info(f"Overall State {overall_state_value}: {STATE_MAP.get(overall_state_value, 'Unknown')}")
+        changed = self.update_state(OverallState, overall_state_value)
+        if self.fire_on_change("determine_overall_state", changed):
+            self.logger.info(f"Overall State {overall_state_value}: {STATE_MAP.get(overall_state_value, 'Unknown')}")
 
-    # Rules to fire actions according to overall state
+    # Rules to fire actions according to overall state; the more severe the state, the higher the
+    # salience, so an emergency action fires ahead of any other pending activation
     @Rule(OverallState(state_value=0))
     def action_normal(self):
-        self.logger.info("\033[92mAction: Continue mission\033[0m")
+        self.fire_action("action_normal", 0, "\033[92mAction: Continue mission\033[0m")
     
-    @Rule(OverallState(state_value=1))
+    @Rule(OverallState(state_value=1), salience=10)
     def action_mild(self):
-        self.logger.info("\033[93mAction: Consider returning to home soon\033[0m")
+        self.fire_action("action_mild", 1, "\033[93mAction: Consider returning to home soon\033[0m")
 
-    @Rule(OverallState(state_value=2))
+    @Rule(OverallState(state_value=2), salience=20)
     def action_severe(self):
-        self.logger.info("\033[91mAction: Plan to return to home immediately\033[0m")
+        self.fire_action("action_severe", 2, "\033[91mAction: Plan to return to home immediately\033[0m")
 
-    @Rule(OverallState(state_value=3))
+    @Rule(OverallState(state_value=3), salience=30)
     def action_critical(self):
-        self.logger.info("\033[31mAction: Emergency landing is advised\033[0m")
+        self.fire_action("action_critical", 3, "\033[31mAction: Emergency landing is advised\033[0m")
+
+# Rules to setup the states of each use case with respect to its readings, generated from use_cases/*.json
+for _spec in SPECS.values():
+    for _name, _rule in experta_rules(_spec, globals()).items():
+        setattr(DecisionEngine, _name, _rule)
+
+
+def timed_rule_handler(rule_name, handler):
+    """Wraps a rule handler to record its execution time in the engine's metrics."""
+    @functools.wraps(handler)
+    def timed_handler(engine, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return handler(engine, *args, **kwargs)
+        finally:
+            engine.metrics.observe_firing(rule_name, time.perf_counter() - start)
+    return timed_handler
+
+
+@functools.lru_cache(maxsize=None)
+def instrumented_engine_class(engine_class):
+    """
+    Returns a subclass of an engine class whose rules time their handler, built by DecisionEngine
+    for ``instrumented=True``. The rules are redefined with the same conditions and salience, so
+    the rules of an engine that is not instrumented run their handler unwrapped.
+    """
+    members = {"timed_rules": True}
+    for name, rule in inspect.getmembers(engine_class, lambda member: isinstance(member, Rule)):
+        members[name] = Rule(*rule, salience=rule.salience)(timed_rule_handler(rule.__name__, rule.__wrapped__))
+    return type(f"Instrumented{engine_class.__name__}", (engine_class,), members)
+
+
+@functools.lru_cache(maxsize=None)
+def batch_engine_class(engine_class):
+    """
+    Returns a subclass of an engine class declaring every use case state as Normal at reset, as
+    the deffacts of the CLIPS engine do, so the batch results of a snapshot without a reading of
+    some use case do not depend on the backend.
+    """
+    def initial_states(self):
+        for spec in SPECS.values():
+            yield globals()[spec.state_fact](state_value=0, state_description=STATE_MAP.get(0, "Unknown"))
+
+    return type(f"Batch{engine_class.__name__}", (engine_class,), {"_initial_states": DefFacts()(initial_states)})
+
+
+@functools.lru_cache(maxsize=None)
+def use_case_engine_class(use_case):
+    """
+    Returns a DecisionEngine subclass with only the state rules of one use case, used as a
+    subsystem engine by partitioned_engine.py. The overall state and action rules are left to
+    the partitioned engine's aggregator; the use case's state starts as Normal instead.
+    """
+    spec = SPECS[use_case]
+    state_fact = globals()[spec.state_fact]
+    kept = {spec.rule_name(state) for state, _, _ in spec.band_limits()}
+    # experta collects the rules and deffacts of the class by attribute, so shadowing one hides it
+    members = {
+        name: None
+        for name, _ in inspect.getmembers(DecisionEngine, lambda member: isinstance(member, (Rule, DefFacts)))
+        if name not in kept
+    }
+
+    def initial_state(self):
+        yield state_fact(state_value=0, state_description=STATE_MAP.get(0, "Unknown"))
+
+    members["_initial_action"] = DefFacts()(initial_state)
+    return type(f"{spec.state_fact}Engine", (DecisionEngine,), members)
+
+
+def use_case_engine(use_case, **kwargs):
+    """Returns a subsystem engine evaluating only the readings of one use case, see use_case_engine_class."""
+    return use_case_engine_class(use_case)(**kwargs)
 
 import asyncio
 from use_cases.battery_status import BatteryStatusProvider
 from use_cases.sensor_anomaly import SensorAnomalyProvider
+from event_recorder import EventRecorder
+from checkpoint import Checkpointer
+from aggregation import AggregationStage
+
+# Set to a file path to record the raw provider inputs, so the run can be replayed with replay.py
+RECORDING_PATH = None
+# Set to a file path to checkpoint the working memory periodically and restore it at startup
+CHECKPOINT_PATH = None
+# Set to True to smooth the readings and only evaluate the engine when a smoothed reading changes band
+AGGREGATE_READINGS = False
 
 async def main():
     engine = DecisionEngine()
     battery_provider = BatteryStatusProvider(start_percent=100.0, step=-10.0, interval=1)
-    battery_provider.add_listener(engine)
+    listener = AggregationStage(engine) if AGGREGATE_READINGS else engine
+    battery_provider.add_listener(listener)
     sensor_anomaly_provider = SensorAnomalyProvider()
-    sensor_anomaly_provider.add_listener(engine)
+    sensor_anomaly_provider.add_listener(listener)
+    if RECORDING_PATH:
+        recorder = EventRecorder(RECORDING_PATH)
+        battery_provider.add_listener(recorder)
+        sensor_anomaly_provider.add_listener(recorder)
+    tasks = []
+    if CHECKPOINT_PATH:
+        checkpointer = Checkpointer(engine, CHECKPOINT_PATH)
+        checkpointer.restore()
+        tasks.append(checkpointer.run())
 
     
     # Run both providers concurrently
     await asyncio.gather(
         sensor_anomaly_provider.start(),
-        battery_provider.start()
+        battery_provider.start(),
+        *tasks
     )
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
@@ -0,0 +1,230 @@
+import asyncio
+import multiprocessing
+import os
+import queue
+import time
+import zlib
+
+from backends import BACKENDS, backend_module, check_backend
+from custom_logger import CustomLogger, DroneLoggerAdapter
+from events import drone_of
+
+
+class BackendEngineFactory:
+    """
+    Picklable factory that builds a DecisionEngine of the given backend inside a worker process.
+    The backend module is imported lazily, so the parent process never loads the engine itself.
+    The experta engines log their lines prefixed with their drone id; the CLIPS engine prints its
+    actions instead of logging them.
+    """
+    def __init__(self, backend="experta"):
+        check_backend(backend)
+        self.backend = backend
+
+    def __call__(self, drone_id=None):
+        module = backend_module(self.backend)
+        if self.backend == "experta" and drone_id is not None:
+            logger = DroneLoggerAdapter(module.logger_instance.get_logger(), {"drone_id": drone_id})
+            return module.DecisionEngine(logger=logger)
+        return module.DecisionEngine()
+
+
+def shard_for(drone_id, num_shards):
+    """Returns the shard index of a drone. Stable across processes and runs, unlike hash()."""
+    return zlib.crc32(str(drone_id).encode("utf-8")) % num_shards
+
+
+def _shard_worker(shard_id, engine_factory, inbox, processed):
+    """
+    Worker process loop. Owns one engine per drone routed to this shard and applies the
+    received batches in order, so each drone's events are evaluated in arrival order.
+    """
+    engines = {}
+    while True:
+        batch = inbox.get()
+        if batch is None:
+            break
+        for data in batch:
+            drone_id = drone_of(data)
+            engine = engines.get(drone_id)
+            if engine is None:
+                engine = engines[drone_id] = engine_factory(drone_id)
+            engine.apply_event(data)
+            engine.run()
+        # Single writer per slot, so no lock is needed
+        processed[shard_id] += len(batch)
+
+
+class FleetRunner:
+    """
+    Evaluates many drones in one process group by routing events by ``drone_id`` to
+    per-drone engines, sharded across a pool of worker processes.
+
+    A drone is always routed to the same shard and each shard consumes a FIFO queue, so the
+    order of each drone's events is preserved. The runner is a listener, so it can be attached
+    to providers like a DecisionEngine; every payload must carry a ``drone_id``.
+
+    The workers are spawned rather than forked, so they do not inherit the parent's logging
+    threads and handlers, and set up their own. Sending a batch never blocks the event loop: a batch that does not fit in a full shard
+    queue is dropped and counted. A shard whose worker exited is reported as dead by
+    ``report``, and the batches routed to it from then on are dropped as well.
+
+    Methods:
+        start: Starts the worker processes.
+        submit: Routes a payload to its shard, batching up to ``batch_size`` payloads per shard.
+        flush: Sends all partially filled batches to their shards.
+        notify: Listener entry point, equivalent to ``submit``.
+        report: Returns per-shard throughput, queue depth, drops and worker liveness.
+        stop: Flushes, stops the workers, waits for them to exit and returns their exit codes.
+    """
+    def __init__(self, engine_factory=None, num_shards=None, batch_size=1, queue_size=0):
+        """
+        Parameters:
+            engine_factory (callable): Picklable callable taking a drone id and returning an engine
+                                       that provides ``apply_event(data)`` and ``run()``.
+                                       Defaults to the experta backend.
+            num_shards (int): Number of worker processes, defaults to the number of CPUs.
+            batch_size (int): Number of payloads sent to a shard per inter-process message.
+            queue_size (int): Maximum number of pending batches per shard, 0 for unbounded.
+        """
+        self.engine_factory = engine_factory or BackendEngineFactory("experta")
+        self.num_shards = num_shards or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.submitted = [0] * self.num_shards
+        self.dropped = [0] * self.num_shards
+        self.dead = set()
+        self.context = multiprocessing.get_context("spawn")
+        self.processed = self.context.Array("Q", self.num_shards, lock=False)
+        self.inboxes = [self.context.Queue(queue_size) for _ in range(self.num_shards)]
+        self.buffers = [[] for _ in range(self.num_shards)]
+        self.workers = []
+        self._last_report = None
+
+    def start(self):
+        for shard_id, inbox in enumerate(self.inboxes):
+            worker = self.context.Process(
+                target=_shard_worker,
+                args=(shard_id, self.engine_factory, inbox, self.processed),
+                name=f"fleet-shard-{shard_id}",
+                daemon=True,
+            )
+            worker.start()
+            self.workers.append(worker)
+        self._last_report = (time.monotonic(), list(self.processed))
+
+    def submit(self, data):
+        shard_id = shard_for(drone_of(data), self.num_shards)
+        buffer = self.buffers[shard_id]
+        buffer.append(data)
+        self.submitted[shard_id] += 1
+        if len(buffer) >= self.batch_size:
+            self._send(shard_id)
+
+    def _send(self, shard_id):
+        batch, self.buffers[shard_id] = self.buffers[shard_id], []
+        if shard_id in self.dead:
+            self.dropped[shard_id] += len(batch)
+            return
+        try:
+            self.inboxes[shard_id].put_nowait(batch)
+        except queue.Full:
+            # The shard lags behind; blocking here would stall every provider on the event loop
+            self.dropped[shard_id] += len(batch)
+
+    def flush(self):
+        for shard_id, buffer in enumerate(self.buffers):
+            if buffer:
+                self._send(shard_id)
+
+    async def notify(self, data):
+        self.submit(data)
+
+    def report(self):
+        """
+        Returns a list with one entry per shard containing the number of processed events, the
+        throughput in events/second since the previous report, the queue depth in events
+        (submitted but neither processed nor dropped), the number of dropped events, and whether
+        the worker is alive with its exit code (None while it runs).
+
+        A shard whose worker exited before ``stop`` is marked dead: its later batches are dropped.
+        """
+        for shard_id, worker in enumerate(self.workers):
+            if not worker.is_alive():
+                self.dead.add(shard_id)
+        now = time.monotonic()
+        processed = list(self.processed)
+        last_time, last_processed = self._last_report
+        elapsed = max(now - last_time, 1e-9)
+        self._last_report = (now, processed)
+        return [
+            {
+                "shard": shard_id,
+                "processed": processed[shard_id],
+                "events_per_second": (processed[shard_id] - last_processed[shard_id]) / elapsed,
+                "queue_depth": self.submitted[shard_id] - processed[shard_id] - self.dropped[shard_id],
+                "dropped": self.dropped[shard_id],
+                "alive": shard_id < len(self.workers) and self.workers[shard_id].is_alive(),
+                "exitcode": self.workers[shard_id].exitcode if shard_id < len(self.workers) else None,
+            }
+            for shard_id in range(self.num_shards)
+        ]
+
+    def stop(self, timeout=None):
+        """
+        Flushes, stops the workers and waits up to ``timeout`` seconds for each to exit. Returns
+        the exit code of every shard's worker, None for a worker that did not exit in time.
+        """
+        self.flush()
+        for inbox, worker in zip(self.inboxes, self.workers):
+            # A dead worker would never take its end marker out of a full queue
+            if worker.is_alive():
+                try:
+                    inbox.put(None, timeout=timeout)
+                except queue.Full:
+                    pass  # Still busy when the timeout expired, reported by its None exit code
+        for worker in self.workers:
+            worker.join(timeout)
+        return [worker.exitcode for worker in self.workers]
+
+
+from use_cases.battery_status import BatteryStatusProvider
+from use_cases.sensor_anomaly import SensorAnomalyProvider
+
+NUM_DRONES = 20
+REPORT_INTERVAL = 5
+
+async def report_periodically(fleet, logger):
+    while True:
+        await asyncio.sleep(REPORT_INTERVAL)
+        for shard in fleet.report():
+            if not shard["alive"]:
+                logger.error(f"Shard {shard['shard']}: worker exited with code {shard['exitcode']}")
+            logger.info(
+                f"Shard {shard['shard']}: {shard['events_per_second']:.1f} events/s, "
+                f"queue depth {shard['queue_depth']}, processed {shard['processed']}, dropped {shard['dropped']}"
+            )
+
+async def main():
+    """
+    Main coroutine that starts a fleet of simulated drones, each with its own battery and
+    sensor anomaly providers, evaluated by sharded per-drone engines.
+    """
+    logger = CustomLogger("fleet").get_logger()
+    fleet = FleetRunner(BackendEngineFactory("experta"))
+    fleet.start()
+    providers = []
+    for index in range(NUM_DRONES):
+        drone_id = f"drone-{index}"
+        battery_provider = BatteryStatusProvider(start_percent=100.0, step=-10.0, interval=1, drone_id=drone_id)
+        battery_provider.add_listener(fleet)
+        sensor_anomaly_provider = SensorAnomalyProvider(drone_id=drone_id)
+        sensor_anomaly_provider.add_listener(fleet)
+        providers.extend([battery_provider, sensor_anomaly_provider])
+
+    try:
+        await asyncio.gather(report_periodically(fleet, logger), *(provider.start() for provider in providers))
+    finally:
+        fleet.stop()
+
+if __name__ == "__main__":
+    asyncio.run(main())
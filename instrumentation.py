@@ -0,0 +1,229 @@
+"""
+Rule and notify instrumentation shared by the decision engines.
+
+Each engine keeps an ``EngineMetrics`` with, per rule name, activation and firing counts and a
+histogram of the handler execution time, plus a histogram of the end-to-end ``notify`` latency
+and the working-memory size. Recording is a few counter increments and a binary search per
+observation, so it can stay enabled in production. It is opt-in: the engines only record
+metrics when built with ``instrumented=True``.
+
+``MetricsExporter`` serves the metrics of one or more engines in the Prometheus text format from
+the engines' own asyncio event loop, so scrapes never run concurrently with inference.
+"""
+import asyncio
+import bisect
+from collections import Counter
+
+# Histogram bucket upper bounds in seconds, from 10 microseconds to 100 milliseconds
+DEFAULT_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1)
+
+
+class Histogram:
+    """Fixed-bucket histogram, with a final +Inf bucket."""
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds=DEFAULT_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def snapshot(self):
+        """Returns the cumulative bucket counts keyed by upper bound, the sum and the count."""
+        buckets = {}
+        cumulative = 0
+        for bound, count in zip(self.bounds + (float("inf"),), self.counts):
+            cumulative += count
+            buckets[bound] = cumulative
+        return {"buckets": buckets, "sum": self.sum, "count": self.count}
+
+
+class EngineMetrics:
+    """
+    Per-rule and per-notify metrics of one decision engine.
+
+    Parameters:
+        buckets (tuple): Histogram bucket upper bounds in seconds.
+        counts_activations (bool): Whether the engine reports activations; if not, they are
+                                   reported as None rather than 0.
+    """
+    def __init__(self, buckets=DEFAULT_BUCKETS, counts_activations=True):
+        self.buckets = buckets
+        self.counts_activations = counts_activations
+        self.rule_activations = Counter()
+        self.rule_firings = Counter()
+        self.rule_seconds = Counter()
+        self.rule_latency = {}
+        self.notify_latency = Histogram(buckets)
+        self.working_memory_size = 0
+
+    def observe_activation(self, rule_name):
+        self.rule_activations[rule_name] += 1
+
+    def observe_firing(self, rule_name, seconds):
+        self.rule_firings[rule_name] += 1
+        self.rule_seconds[rule_name] += seconds
+        histogram = self.rule_latency.get(rule_name)
+        if histogram is None:
+            histogram = self.rule_latency[rule_name] = Histogram(self.buckets)
+        histogram.observe(seconds)
+
+    def set_rule_totals(self, rule_name, firings, seconds):
+        """Sets the firing count and time of a rule measured by the engine itself, e.g. by CLIPS profiling."""
+        self.rule_firings[rule_name] = firings
+        self.rule_seconds[rule_name] = seconds
+
+    def observe_notify(self, seconds, working_memory_size=None):
+        """Records a notify latency, and the working-memory size unless the engine measures it on snapshot."""
+        self.notify_latency.observe(seconds)
+        if working_memory_size is not None:
+            self.working_memory_size = working_memory_size
+
+    def snapshot(self):
+        """Returns all metrics as plain data."""
+        rules = sorted(set(self.rule_activations) | set(self.rule_firings))
+        return {
+            "rules": {
+                rule: {
+                    "activations": self.rule_activations[rule] if self.counts_activations else None,
+                    "firings": self.rule_firings[rule],
+                    "seconds": self.rule_seconds[rule],
+                    "latency": self.rule_latency[rule].snapshot() if rule in self.rule_latency else None,
+                }
+                for rule in rules
+            },
+            "notify_latency": self.notify_latency.snapshot(),
+            "working_memory_size": self.working_memory_size,
+        }
+
+
+def _label_value(value):
+    """Escapes a label value as the exposition format requires: backslash, double quote and line feed."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_label_value(value)}"' for key, value in labels.items()) + "}"
+
+
+def _histogram_lines(name, histogram, labels):
+    lines = []
+    for bound, count in histogram["buckets"].items():
+        le = "+Inf" if bound == float("inf") else repr(bound)
+        lines.append(f"{name}_bucket{_labels({**labels, 'le': le})} {count}")
+    lines.append(f"{name}_sum{_labels(labels)} {histogram['sum']}")
+    lines.append(f"{name}_count{_labels(labels)} {histogram['count']}")
+    return lines
+
+
+def prometheus_text(snapshots):
+    """
+    Renders metrics snapshots in the Prometheus text exposition format.
+
+    Parameters:
+        snapshots (list): Pairs of a snapshot (as returned by ``EngineMetrics.snapshot``) and a
+                          dictionary of labels identifying its engine.
+    """
+    lines = [
+        "# HELP decision_engine_rule_activations_total Rule activations added to the agenda.",
+        "# TYPE decision_engine_rule_activations_total counter",
+    ]
+    for snapshot, labels in snapshots:
+        for rule, stats in snapshot["rules"].items():
+            if stats["activations"] is not None:
+                lines.append(f"decision_engine_rule_activations_total{_labels({**labels, 'rule': rule})} {stats['activations']}")
+    lines += [
+        "# HELP decision_engine_rule_firings_total Rule firings.",
+        "# TYPE decision_engine_rule_firings_total counter",
+    ]
+    for snapshot, labels in snapshots:
+        for rule, stats in snapshot["rules"].items():
+            lines.append(f"decision_engine_rule_firings_total{_labels({**labels, 'rule': rule})} {stats['firings']}")
+    lines += [
+        "# HELP decision_engine_rule_seconds_total Time spent in rule handlers.",
+        "# TYPE decision_engine_rule_seconds_total counter",
+    ]
+    for snapshot, labels in snapshots:
+        for rule, stats in snapshot["rules"].items():
+            lines.append(f"decision_engine_rule_seconds_total{_labels({**labels, 'rule': rule})} {stats['seconds']}")
+    lines += [
+        "# HELP decision_engine_rule_latency_seconds Execution time of rule handlers.",
+        "# TYPE decision_engine_rule_latency_seconds histogram",
+    ]
+    for snapshot, labels in snapshots:
+        for rule, stats in snapshot["rules"].items():
+            if stats["latency"] is not None:
+                lines += _histogram_lines("decision_engine_rule_latency_seconds", stats["latency"], {**labels, "rule": rule})
+    lines += [
+        "# HELP decision_engine_notify_latency_seconds End-to-end latency of notify.",
+        "# TYPE decision_engine_notify_latency_seconds histogram",
+    ]
+    for snapshot, labels in snapshots:
+        lines += _histogram_lines("decision_engine_notify_latency_seconds", snapshot["notify_latency"], labels)
+    lines += [
+        "# HELP decision_engine_working_memory_facts Facts in working memory.",
+        "# TYPE decision_engine_working_memory_facts gauge",
+    ]
+    for snapshot, labels in snapshots:
+        lines.append(f"decision_engine_working_memory_facts{_labels(labels)} {snapshot['working_memory_size']}")
+    return "\n".join(lines) + "\n"
+
+
+class MetricsExporter:
+    """
+    Minimal HTTP endpoint serving the metrics of registered engines in the Prometheus text format.
+
+    Usage:
+        engine = DecisionEngine(instrumented=True)
+        exporter = MetricsExporter(port=9464)
+        exporter.add(engine, backend="experta")
+        await exporter.start()
+    """
+    def __init__(self, host="127.0.0.1", port=9464):
+        self.host = host
+        self.port = port
+        self.engines = []
+        self.server = None
+
+    def add(self, engine, **labels):
+        """Registers an engine providing ``metrics_snapshot()``, with the labels identifying it."""
+        self.engines.append((engine, labels))
+
+    def render(self):
+        return prometheus_text([(engine.metrics_snapshot(), labels) for engine, labels in self.engines])
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._handle, self.host, self.port)
+        return self.server
+
+    async def stop(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+
+    async def _handle(self, reader, writer):
+        try:
+            request_line = await reader.readline()
+            # Skip the request headers
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+            path = request_line.split()[1] if len(request_line.split()) > 1 else b"/"
+            if path == b"/metrics":
+                status, body = "200 OK", self.render().encode("utf-8")
+            else:
+                status, body = "404 Not Found", b"Not found\n"
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("ascii") + body
+            )
+            await writer.drain()
+        finally:
+            writer.close()
@@ -0,0 +1,254 @@
+"""
+High-rate synthetic load for the decision engines.
+
+The providers normally publish one reading per ``interval`` seconds. The load generator instead
+drives ``next_reading()`` of many simulated drones' providers at a target rate that follows a
+profile (constant, ramp or bursts), up to tens of thousands of events per second. Events are
+emitted in batches on a short tick rather than with one ``asyncio.sleep`` each, and the rate is
+tracked as a running event budget, so the generator catches up after a slow tick instead of
+drifting. When the listeners cannot keep up, the achieved rate falls below the requested one:
+a ramp profile shows where an engine saturates.
+
+Readings are reproducible for a given seed; only their timing depends on the machine.
+
+Usage:
+    python load_generator.py --backend clipspy --profile ramp --rate 1000 --peak-rate 50000 --drones 50 --duration 20
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from backends import BACKENDS, backend_module
+from events import drone_of
+from use_cases.battery_status import BatteryStatusProvider
+from use_cases.sensor_anomaly import SensorAnomalyProvider
+
+
+class ConstantRate:
+    """Requests ``rate`` events per second."""
+    def __init__(self, rate):
+        self.rate = rate
+
+    def rate_at(self, elapsed):
+        return self.rate
+
+
+class RampRate:
+    """Requests a rate growing linearly from ``start_rate`` to ``end_rate`` over ``duration`` seconds."""
+    def __init__(self, start_rate, end_rate, duration):
+        self.start_rate = start_rate
+        self.end_rate = end_rate
+        self.duration = duration
+
+    def rate_at(self, elapsed):
+        progress = min(1.0, elapsed / self.duration) if self.duration else 1.0
+        return self.start_rate + (self.end_rate - self.start_rate) * progress
+
+
+class BurstRate:
+    """Requests ``base_rate`` events per second, with ``burst_length`` seconds at ``peak_rate`` every ``period`` seconds."""
+    def __init__(self, base_rate, peak_rate, period, burst_length):
+        self.base_rate = base_rate
+        self.peak_rate = peak_rate
+        self.period = period
+        self.burst_length = burst_length
+
+    def rate_at(self, elapsed):
+        return self.peak_rate if elapsed % self.period < self.burst_length else self.base_rate
+
+
+def build_fleet(num_drones, seed=0, listeners=()):
+    """
+    Returns a battery and a sensor anomaly provider for each of ``num_drones`` simulated drones,
+    with per-drone seeds and starting battery levels derived from ``seed``.
+    """
+    rng = random.Random(seed)
+    providers = []
+    for index in range(num_drones):
+        drone_id = f"drone-{index}"
+        battery_provider = BatteryStatusProvider(
+            start_percent=rng.uniform(50.0, 100.0), step=-rng.uniform(0.5, 5.0), drone_id=drone_id, clamp=True
+        )
+        sensor_anomaly_provider = SensorAnomalyProvider(drone_id=drone_id, seed=rng.getrandbits(32))
+        for provider in (battery_provider, sensor_anomaly_provider):
+            for listener in listeners:
+                provider.add_listener(listener)
+            providers.append(provider)
+    return providers
+
+
+class DroneEngines:
+    """Listener routing every payload to a per-drone engine in the current process."""
+    def __init__(self, engine_factory):
+        self.engine_factory = engine_factory
+        self.engines = {}
+
+    async def notify(self, data):
+        drone_id = drone_of(data)
+        engine = self.engines.get(drone_id)
+        if engine is None:
+            engine = self.engines[drone_id] = self.engine_factory()
+        engine.apply_event(data)
+        engine.run()
+
+
+class LoadGenerator:
+    """
+    Publishes the readings of a set of providers at the rate requested by a profile.
+
+    Parameters:
+        providers (list): Providers offering ``next_reading()``, ``next_event()`` and
+                          ``notify_listeners(data)``; they are used in turn, one event each.
+        profile: Object whose ``rate_at(elapsed)`` returns the requested events per second.
+        duration (float): Length of the run in seconds.
+        tick (float): Interval between batches in seconds.
+        max_batch (int): Maximum number of events emitted per tick, so a long stall does not
+                         turn into one huge burst.
+        window (float): Length in seconds of the report's rate samples.
+    """
+    def __init__(self, providers, profile, duration=10.0, tick=0.001, max_batch=1000, window=1.0):
+        if not providers:
+            raise ValueError("At least one provider is required")
+        self.providers = providers
+        self.profile = profile
+        self.duration = duration
+        self.tick = tick
+        self.max_batch = max_batch
+        self.window = window
+
+    async def run(self):
+        """
+        Runs the load and returns a report with the requested and emitted event counts, the
+        requested and achieved rates, the largest backlog of due events and per-window samples.
+        """
+        start = time.perf_counter()
+        last = 0.0
+        requested = 0.0
+        emitted = 0
+        max_backlog = 0
+        samples = []
+        window_start, window_requested, window_emitted = 0.0, 0.0, 0
+        next_provider = 0
+
+        while True:
+            elapsed = time.perf_counter() - start
+            if elapsed >= self.duration:
+                break
+            due = self.profile.rate_at(elapsed) * (elapsed - last)
+            requested += due
+            window_requested += due
+            last = elapsed
+            backlog = int(requested) - emitted
+            max_backlog = max(max_backlog, backlog)
+
+            deadline = start + self.duration
+            for _ in range(min(backlog, self.max_batch)):
+                # A slow listener must not stretch the run past its duration
+                if time.perf_counter() >= deadline:
+                    break
+                provider = self.providers[next_provider]
+                next_provider = (next_provider + 1) % len(self.providers)
+                await provider.notify_listeners(provider.next_event() if provider.typed_events else provider.next_reading())
+                emitted += 1
+                window_emitted += 1
+
+            if elapsed - window_start >= self.window:
+                samples.append(self._sample(window_start, elapsed, window_requested, window_emitted))
+                window_start, window_requested, window_emitted = elapsed, 0.0, 0
+            await asyncio.sleep(self.tick)
+
+        elapsed = time.perf_counter() - start
+        due = self.profile.rate_at(elapsed) * (elapsed - last)
+        requested += due
+        window_requested += due
+        if window_emitted or window_requested:
+            samples.append(self._sample(window_start, elapsed, window_requested, window_emitted))
+        return {
+            "duration_s": elapsed,
+            "requested": int(requested),
+            "emitted": emitted,
+            "requested_rate": requested / elapsed if elapsed else 0.0,
+            "achieved_rate": emitted / elapsed if elapsed else 0.0,
+            "max_backlog": max_backlog,
+            "samples": samples,
+        }
+
+    @staticmethod
+    def _sample(window_start, window_end, requested, emitted):
+        length = max(window_end - window_start, 1e-9)
+        return {
+            "t": window_start,
+            "requested_rate": requested / length,
+            "achieved_rate": emitted / length,
+        }
+
+
+def saturation_point(report, tolerance=0.95):
+    """Returns the requested rate of the first window whose achieved rate fell below ``tolerance`` of it, or None."""
+    for sample in report["samples"]:
+        if sample["requested_rate"] and sample["achieved_rate"] < tolerance * sample["requested_rate"]:
+            return sample["requested_rate"]
+    return None
+
+
+def build_profile(args):
+    if args.profile == "ramp":
+        return RampRate(args.rate, args.peak_rate, args.duration)
+    if args.profile == "burst":
+        return BurstRate(args.rate, args.peak_rate, args.burst_period, args.burst_length)
+    return ConstantRate(args.rate)
+
+
+async def run_load(args):
+    if args.shards:
+        from fleet_runner import BackendEngineFactory, FleetRunner
+        listener = FleetRunner(BackendEngineFactory(args.backend), args.shards, batch_size=args.batch_size)
+        listener.start()
+    else:
+        listener = DroneEngines(backend_module(args.backend).DecisionEngine)
+    providers = build_fleet(args.drones, args.seed, [listener])
+    for provider in providers:
+        provider.use_typed_events(args.typed)
+    try:
+        return await LoadGenerator(providers, build_profile(args), args.duration).run()
+    finally:
+        if args.shards:
+            listener.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", default="experta", choices=list(BACKENDS))
+    parser.add_argument("--profile", default="constant", choices=["constant", "ramp", "burst"])
+    parser.add_argument("--rate", type=float, default=1000, help="events/s, or the starting and base rate of ramp and burst")
+    parser.add_argument("--peak-rate", type=float, default=20000, help="final rate of ramp, burst rate of burst")
+    parser.add_argument("--burst-period", type=float, default=5.0, help="seconds between the starts of two bursts")
+    parser.add_argument("--burst-length", type=float, default=1.0, help="length of a burst in seconds")
+    parser.add_argument("--drones", type=int, default=10)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--shards", type=int, default=0, help="evaluate with a FleetRunner of this many worker processes")
+    parser.add_argument("--batch-size", type=int, default=64, help="FleetRunner batch size")
+    parser.add_argument("--typed", action="store_true", help="publish compact Reading objects instead of dicts")
+    parser.add_argument("--json", action="store_true", help="print the full report as JSON")
+    args = parser.parse_args()
+
+    report = asyncio.run(run_load(args))
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    for sample in report["samples"]:
+        print(f"t={sample['t']:6.1f} s  requested {sample['requested_rate']:10.0f} events/s  achieved {sample['achieved_rate']:10.0f} events/s")
+    print(
+        f"Requested {report['requested']} events ({report['requested_rate']:.0f} events/s), "
+        f"emitted {report['emitted']} ({report['achieved_rate']:.0f} events/s), max backlog {report['max_backlog']} events"
+    )
+    saturation = saturation_point(report)
+    if saturation is not None:
+        print(f"Saturated at about {saturation:.0f} events/s requested")
+
+
+if __name__ == "__main__":
+    main()
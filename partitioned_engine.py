@@ -0,0 +1,168 @@
+"""
+Partitioned decision engine: one small engine per use case and a thin overall-state aggregator.
+
+In a single ``DecisionEngine`` the battery and sensor anomaly readings share one agenda, and the
+overall state rule only needs the maximum of the use case states. ``PartitionedEngine`` gives
+every use case a subsystem engine of its own, with only that use case's state rules (see
+``use_case_engine`` in both backend modules), and keeps ``OverallState`` in an
+``OverallStateAggregator`` that takes the maximum of the subsystem states and fires the action of
+the overall state whenever it changes, as the ``action_*`` rules do.
+
+In process mode every subsystem engine runs in an ``EngineWorker`` subprocess, so independent use
+cases are evaluated in parallel on separate cores, and the aggregator is updated on the event
+loop as the decisions come back.
+
+Usage:
+    engine = PartitionedEngine("clipspy")
+    provider.add_listener(engine)
+"""
+from backends import backend_module, check_backend
+from custom_logger import CustomLogger
+from decision_table import SPECS, STATE_MAP
+from engine_worker import EngineWorker
+from events import USE_CASES, code_of
+
+# Action rule name and message of each overall state, as in the action rules of the engines
+ACTIONS = {
+    0: ("action_normal", "\033[92mAction: Continue mission\033[0m"),
+    1: ("action_mild", "\033[93mAction: Consider returning to home soon\033[0m"),
+    2: ("action_severe", "\033[91mAction: Plan to return to home immediately\033[0m"),
+    3: ("action_critical", "\033[31mAction: Emergency landing is advised\033[0m"),
+}
+
+logger_instance = CustomLogger("drone_actions", queued=True)
+
+
+class UseCaseEngineFactory:
+    """Picklable factory building the subsystem engine of one use case, in a worker process if need be."""
+    def __init__(self, backend, use_case):
+        check_backend(backend)
+        self.backend = backend
+        self.use_case = use_case
+
+    def __call__(self):
+        return backend_module(self.backend).use_case_engine(self.use_case)
+
+
+class OverallStateAggregator:
+    """
+    Keeps the overall state as the maximum of the use case states and fires the action of the
+    overall state when it changes.
+
+    Parameters:
+        logger: Logger of the overall state changes and actions.
+        on_action (callable): Called with the action rule name and overall state of every action.
+    """
+    def __init__(self, logger=None, on_action=None):
+        self.logger = logger or logger_instance.get_logger()
+        self.on_action = on_action
+        self.states = {spec.state_fact: 0 for spec in SPECS.values()}
+        self.overall_state = 0
+        self.last_action_state = None
+        self.actions = 0
+
+    def update(self, state_fact, state_value):
+        """Records the state of a use case. Returns whether an action was fired."""
+        if state_value is not None:
+            self.states[state_fact] = state_value
+        overall_state = max(self.states.values())
+        if overall_state == self.last_action_state:
+            return False
+        if overall_state != self.overall_state:
+            self.overall_state = overall_state
+            self.logger.info(f"Overall State {overall_state}: {STATE_MAP.get(overall_state, 'Unknown')}")
+        self.fire_action()
+        return True
+
+    def fire_action(self):
+        """Fires the action of the current overall state."""
+        rule_name, message = ACTIONS[self.overall_state]
+        self.last_action_state = self.overall_state
+        self.actions += 1
+        self.logger.info(message)
+        if self.on_action is not None:
+            self.on_action(rule_name, self.overall_state)
+
+    def state_values(self):
+        return {**self.states, "OverallState": self.overall_state}
+
+
+class PartitionedEngine:
+    """
+    Decision engine made of one subsystem engine per use case and an overall-state aggregator.
+
+    In-process, it offers the engine interface (``apply_event``, ``run``, ``state_values``,
+    ``notify``), and ``run`` only runs the subsystems whose readings changed. In process mode,
+    ``start`` must be called from the event loop first; every payload is then evaluated by its
+    subsystem's worker as soon as it is applied, and the decisions reach the aggregator
+    asynchronously (``drain`` waits for them).
+
+    Parameters:
+        backend (str): Backend of the subsystem engines, "experta" or "clipspy".
+        use_processes (bool): Run every subsystem engine in a subprocess of its own.
+        logger: Logger of the aggregator.
+        on_action (callable): Called with the action rule name and overall state of every action.
+    """
+    def __init__(self, backend="experta", use_processes=False, logger=None, on_action=None):
+        self.use_processes = use_processes
+        self.aggregator = OverallStateAggregator(logger, on_action)
+        self.state_facts = [SPECS[use_case].state_fact for use_case in USE_CASES]
+        factories = [UseCaseEngineFactory(backend, use_case) for use_case in USE_CASES]
+        # Subsystem engines or workers, indexed by use case code
+        if use_processes:
+            self.workers = [
+                EngineWorker(factory, use_process=True, on_decision=self._decision_handler(code))
+                for code, factory in enumerate(factories)
+            ]
+        else:
+            self.engines = [factory() for factory in factories]
+        self.changed = set()
+
+    def _decision_handler(self, code):
+        state_fact = self.state_facts[code]
+
+        def on_decision(data, decision):
+            self.aggregator.update(state_fact, decision[state_fact])
+        return on_decision
+
+    def start(self):
+        """Process mode: starts the subsystem workers."""
+        for worker in self.workers:
+            worker.start()
+
+    def apply_event(self, data):
+        """Hands a payload to the subsystem engine of its use case. Payloads of unknown use cases are ignored."""
+        code = code_of(data)
+        if code is None:
+            return
+        if self.use_processes:
+            self.workers[code].submit(data)
+            return
+        self.engines[code].apply_event(data)
+        self.changed.add(code)
+
+    def run(self):
+        """Runs the subsystem engines whose readings changed and updates the overall state."""
+        changed, self.changed = self.changed, set()
+        for code in sorted(changed):
+            engine = self.engines[code]
+            engine.run()
+            state_fact = self.state_facts[code]
+            self.aggregator.update(state_fact, engine.state_values()[state_fact])
+
+    async def notify(self, data):
+        self.apply_event(data)
+        self.run()
+
+    def state_values(self):
+        return self.aggregator.state_values()
+
+    async def drain(self):
+        """Process mode: waits until the decisions of every applied payload reached the aggregator."""
+        for worker in self.workers:
+            await worker.drain()
+
+    async def stop(self):
+        """Process mode: stops the subsystem workers after the queued payloads have been evaluated."""
+        for worker in self.workers:
+            await worker.stop()
@@ -0,0 +1,166 @@
+"""
+Priority-aware ingest in front of the decision engines.
+
+Payloads are otherwise evaluated in arrival order, so under load a battery reading that calls for
+an emergency landing waits behind every routine reading received before it. ``PriorityIngest``
+classifies each payload on arrival with the decision table of its use case (a binary search over
+the band bounds, see ``decision_table.py``) and serves the payloads of the most severe band first.
+
+Only the latest pending payload of each drone and use case is kept, as the engine state only
+depends on the latest reading; this also keeps an older reading from being evaluated after a
+newer one when the two are served out of order. The pending set is bounded by the number of
+drones and use cases. Routine payloads are served whenever no more severe one is pending, and
+ahead of the severe ones once they have waited ``max_delay`` seconds, so they are delayed but
+never starved under overload.
+
+The report measures the latency the scheduler is for: from the arrival of a payload to the end of
+the engine run in which it moved the drone's overall state to Critical, i.e. to "Emergency landing
+is advised".
+
+Usage:
+    ingest = PriorityIngest(DecisionEngine)
+    provider.add_listener(ingest)
+    asyncio.create_task(ingest.run())
+"""
+import asyncio
+import collections
+import time
+
+from decision_table import SPECS, STATE_MAP
+from events import FIELDS, USE_CASES, Reading, code_of, drone_of
+
+CRITICAL = max(STATE_MAP)
+
+
+def classify(data):
+    """Returns the state the reading of a payload falls into, 0 for payloads of an unknown use case."""
+    code = code_of(data)
+    if code is None:
+        return 0
+    value = data.value if isinstance(data, Reading) else data[FIELDS[code]]
+    return SPECS[USE_CASES[code]].classify(value)
+
+
+def latency_report(latencies, target):
+    """Returns the count, median, 99th percentile and maximum of latencies in seconds, and the fraction within ``target``."""
+    values = sorted(latencies)
+    if not values:
+        return {"count": 0, "target_s": target}
+    return {
+        "count": len(values),
+        "target_s": target,
+        "p50_s": values[(len(values) - 1) // 2],
+        "p99_s": values[min(len(values) - 1, int(0.99 * len(values)))],
+        "max_s": values[-1],
+        "within_target": sum(value <= target for value in values) / len(values),
+    }
+
+
+class PriorityIngest:
+    """
+    Listener evaluating provider payloads with per-drone engines, most severe payloads first.
+
+    Parameters:
+        engine_factory (callable): Called without arguments to build the engine of a new drone.
+        prioritized (bool): Serve by severity; if False, payloads are served in arrival order,
+                            which gives the baseline of the latency report.
+        serve_budget (int): Number of payloads evaluated before yielding to the event loop, so
+                            that new arrivals are classified and can preempt the pending ones.
+        max_delay (float): Seconds after which a pending payload is served regardless of its
+                           priority.
+    """
+    def __init__(self, engine_factory, prioritized=True, serve_budget=1, max_delay=1.0):
+        self.engine_factory = engine_factory
+        self.prioritized = prioritized
+        self.serve_budget = serve_budget
+        self.max_delay = max_delay
+        self.engines = {}
+        # Latest pending payload per (drone, use case): [payload, priority, arrival time]
+        self.pending = {}
+        self.queues = [collections.deque() for _ in STATE_MAP]
+        self.overall_states = {}
+        self.ready = asyncio.Event()
+        self.received = 0
+        self.coalesced = 0
+        self.served = [0] * len(STATE_MAP)
+        self.critical_latencies = []
+
+    async def notify(self, data):
+        """Classifies and queues a payload, replacing any pending payload of the same drone and use case."""
+        self.received += 1
+        key = (drone_of(data), code_of(data))
+        priority = classify(data) if self.prioritized else 0
+        entry = self.pending.get(key)
+        if entry is None:
+            self.pending[key] = [data, priority, time.perf_counter()]
+            self.queues[priority].append(key)
+        else:
+            # A payload of the same priority keeps the place of the one it supersedes in the queue
+            self.coalesced += 1
+            entry[0] = data
+            if entry[1] != priority:
+                entry[1] = priority
+                entry[2] = time.perf_counter()
+                self.queues[priority].append(key)
+        self.ready.set()
+
+    def _head(self, priority):
+        """Returns the key of the oldest payload of a priority, dropping queue entries left behind by a priority change."""
+        queue = self.queues[priority]
+        while queue:
+            entry = self.pending.get(queue[0])
+            if entry is not None and entry[1] == priority:
+                return queue[0]
+            queue.popleft()
+        return None
+
+    def _next(self):
+        """Pops the payload that waited longer than ``max_delay``, if any, otherwise the most severe pending payload."""
+        heads = [(priority, self._head(priority)) for priority in range(len(self.queues) - 1, -1, -1)]
+        heads = [(priority, key) for priority, key in heads if key is not None]
+        if not heads:
+            return None
+        deadline = time.perf_counter() - self.max_delay
+        overdue = [head for head in heads if self.pending[head[1]][2] < deadline]
+        priority, key = min(overdue, key=lambda head: self.pending[head[1]][2]) if overdue else heads[0]
+        self.queues[priority].popleft()
+        return key, self.pending.pop(key)
+
+    def serve(self, limit=None):
+        """Evaluates up to ``limit`` pending payloads, all of them if None. Returns how many were evaluated."""
+        served = 0
+        while limit is None or served < limit:
+            item = self._next()
+            if item is None:
+                break
+            (drone_id, _), (data, priority, arrival) = item
+            engine = self.engines.get(drone_id)
+            if engine is None:
+                engine = self.engines[drone_id] = self.engine_factory()
+            engine.apply_event(data)
+            engine.run()
+            overall_state = engine.state_values()["OverallState"]
+            if overall_state == CRITICAL and self.overall_states.get(drone_id) != CRITICAL:
+                self.critical_latencies.append(time.perf_counter() - arrival)
+            self.overall_states[drone_id] = overall_state
+            self.served[priority] += 1
+            served += 1
+        return served
+
+    async def run(self):
+        """Serves the pending payloads until cancelled."""
+        while True:
+            await self.ready.wait()
+            if not self.serve(self.serve_budget):
+                self.ready.clear()
+                continue
+            await asyncio.sleep(0)
+
+    def stats(self):
+        """Returns the received, coalesced, served (per priority) and pending payload counts."""
+        return {
+            "received": self.received,
+            "coalesced": self.coalesced,
+            "served": {STATE_MAP[priority]: count for priority, count in enumerate(self.served)},
+            "pending": len(self.pending),
+        }
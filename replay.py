@@ -0,0 +1,232 @@
+"""
+Replay of recorded drone inputs through a decision engine.
+
+Missions record the raw provider payloads with ``event_recorder.EventRecorder`` (one JSON object per line, with
+a ``ts`` timestamp) next to the ``drone_actions`` log written by ``CustomLogger``. The replay
+streams the recording into a fresh engine, at maximum speed or at a scaled real-time rate, and
+compares the battery, sensor anomaly and overall state transitions the engine produces against
+the ones found in the recorded log. Files are read line by line, so their size does not matter.
+
+The compressed backups rotated out of the log (``drone_actions.log.1.gz`` and up, see
+``custom_logger.py``) are read first, oldest first, so a mission whose log was rotated is
+compared in full. The CLIPS bindings are only imported to replay through the clipspy backend.
+
+Usage:
+    python replay.py recording.jsonl --log logs/drone_actions.log --backend clipspy --speed 0
+"""
+import argparse
+import gzip
+import json
+import logging
+import os
+import re
+import time
+
+from backends import BACKENDS, backend_module
+
+# Parses the text lines written by CustomLogger
+LOG_LINE = re.compile(r"^\[(?P<ts>[^\]]+)\] \[(?P<role>[^\]]+)\] (?P<level>\w+) (?P<msg>.*)$")
+# Parses the state messages logged by the rules of both engines
+STATE_MESSAGE = re.compile(r"(?P<kind>Battery|Sensor Anomaly|Overall) State (?P<value>\d+)", re.IGNORECASE)
+# Logged by the experta engine when it is reset, i.e. when a new run starts
+RESET_MESSAGE = re.compile(r"^Overall state 0: Normal$")
+
+
+def read_recording(path):
+    """Yields the recorded payloads one by one."""
+    with open(path, encoding="utf-8") as recording:
+        for line in recording:
+            if line.strip():
+                yield json.loads(line)
+
+
+def log_files(path):
+    """Returns the rotated backups of a log file, oldest first, followed by the log file itself."""
+    backups = []
+    number = 1
+    while os.path.exists(f"{path}.{number}.gz"):
+        backups.append(f"{path}.{number}.gz")
+        number += 1
+    return backups[::-1] + [str(path)]
+
+
+def read_log_messages(path):
+    """
+    Yields the messages of a CustomLogger log file and of its rotated backups, in the text or the
+    JSON lines format.
+    """
+    for file_path in log_files(path):
+        opener = gzip.open if file_path.endswith(".gz") else open
+        with opener(file_path, "rt", encoding="utf-8") as log:
+            for line in log:
+                if line.startswith("{"):
+                    yield json.loads(line)["msg"]
+                    continue
+                match = LOG_LINE.match(line.rstrip("\n"))
+                if match:
+                    yield match.group("msg")
+
+
+class TransitionTracker:
+    """
+    Turns state messages into state transitions. Engines log or print a state again even when
+    it did not change, so only messages with a value different from the previous one of the
+    same kind are kept. Every kind starts out Normal, as after an engine reset.
+    """
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.values = {"battery": 0, "sensor anomaly": 0, "overall": 0}
+
+    def feed(self, message):
+        """Returns the (kind, value) transition caused by a message, or None."""
+        if RESET_MESSAGE.match(message):
+            self.reset()
+            return None
+        match = STATE_MESSAGE.search(message)
+        if not match:
+            return None
+        kind, value = match.group("kind").lower(), int(match.group("value"))
+        if self.values[kind] == value:
+            return None
+        self.values[kind] = value
+        return kind, value
+
+
+def recorded_transitions(log_path):
+    """Yields the state transitions found in a recorded log."""
+    tracker = TransitionTracker()
+    for message in read_log_messages(log_path):
+        transition = tracker.feed(message)
+        if transition:
+            yield transition
+
+
+class MessageCapture(logging.Handler):
+    """Logging handler collecting the messages logged by the experta rules."""
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+def clips_capture_router():
+    """Returns a CLIPS router collecting the lines printed by the rules instead of writing them to stdout."""
+    # Imported here so that replaying through the experta backend does not need the CLIPS bindings
+    from clips import Router
+
+    class ClipsCaptureRouter(Router):
+        def __init__(self):
+            super().__init__("replay-capture-router", 50)
+            self.messages = []
+            self._line = ""
+
+        def query(self, name):
+            return name in ("t", "stdout")
+
+        def write(self, name, message):
+            self._line += message
+            while "\n" in self._line:
+                line, self._line = self._line.split("\n", 1)
+                self.messages.append(line)
+
+    return ClipsCaptureRouter()
+
+
+def build_engine(backend):
+    """Returns a fresh engine of the given backend and the capture collecting its messages."""
+    module = backend_module(backend)
+    if backend == "experta":
+        capture = MessageCapture()
+        logger = logging.getLogger("drone_actions.replay")
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        logger.handlers = [capture]
+        return module.DecisionEngine(logger=logger), capture
+    engine = module.DecisionEngine()
+    capture = clips_capture_router()
+    engine.env.add_router(capture)
+    return engine, capture
+
+
+def replay(recording_path, log_path=None, backend="experta", speed=0, max_mismatches=20):
+    """
+    Feeds a recording through a fresh engine and compares its state transitions to the recorded log.
+
+    Parameters:
+        recording_path (str): JSON lines file written by EventRecorder.
+        log_path (str): Log recorded during the same run, or None to only replay.
+        backend (str): "experta" or "clipspy".
+        speed (float): Replay rate relative to real time (2 is twice as fast); 0 for maximum speed.
+        max_mismatches (int): Number of mismatching transitions kept in the report.
+
+    Returns:
+        dict: Number of events and transitions, mismatches and the replay throughput.
+    """
+    engine, capture = build_engine(backend)
+    tracker = TransitionTracker()
+    expected = recorded_transitions(log_path) if log_path else None
+    report = {"events": 0, "transitions": 0, "mismatches": 0, "first_mismatches": []}
+
+    def compare(produced):
+        report["transitions"] += 1
+        if expected is None:
+            return
+        recorded = next(expected, None)
+        if produced != recorded:
+            report["mismatches"] += 1
+            if len(report["first_mismatches"]) < max_mismatches:
+                report["first_mismatches"].append(
+                    {"transition": report["transitions"], "produced": produced, "recorded": recorded}
+                )
+
+    start = time.perf_counter()
+    first_ts = None
+    for data in read_recording(recording_path):
+        if speed and "ts" in data:
+            first_ts = data["ts"] if first_ts is None else first_ts
+            delay = (data["ts"] - first_ts) / speed - (time.perf_counter() - start)
+            if delay > 0:
+                time.sleep(delay)
+        engine.apply_event(data)
+        engine.run()
+        report["events"] += 1
+        for message in capture.messages:
+            transition = tracker.feed(message)
+            if transition:
+                compare(transition)
+        capture.messages.clear()
+    elapsed = time.perf_counter() - start
+
+    if expected is not None:
+        # Recorded transitions the replay never produced
+        for recorded in expected:
+            report["mismatches"] += 1
+            if len(report["first_mismatches"]) < max_mismatches:
+                report["first_mismatches"].append({"transition": None, "produced": None, "recorded": recorded})
+    report["elapsed_s"] = elapsed
+    report["events_per_second"] = report["events"] / elapsed if elapsed else 0.0
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("recording", help="JSON lines recording of the provider payloads")
+    parser.add_argument("--log", help="drone_actions log of the recorded run to diff against")
+    parser.add_argument("--backend", default="experta", choices=list(BACKENDS))
+    parser.add_argument("--speed", type=float, default=0, help="rate relative to real time, 0 for maximum speed")
+    args = parser.parse_args()
+
+    report = replay(args.recording, args.log, args.backend, args.speed)
+    print(f"Replayed {report['events']} events in {report['elapsed_s']:.2f} s ({report['events_per_second']:.0f} events/s)")
+    print(f"{report['transitions']} state transitions, {report['mismatches']} mismatches")
+    for mismatch in report["first_mismatches"]:
+        print(f"  transition {mismatch['transition']}: produced {mismatch['produced']}, recorded {mismatch['recorded']}")
+    return 1 if report["mismatches"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,340 @@
+"""
+Shared-memory ring buffer transport between provider processes and a decision engine.
+
+Providers running in other processes write fixed-layout records (timestamp, drone number,
+use case code, value) into a ``multiprocessing.shared_memory`` ring instead of passing dicts
+around. The engine side reads them in batches as NumPy structured arrays that are views of the
+shared memory, so no record is pickled, copied or allocated on the way.
+
+A ring has a single producer and a single consumer: the producer only advances the write
+counter, after the records are written, and the consumer only advances the read counter, after
+it is done with them. Use one ring per producer process; ``RingConsumer`` reads several.
+
+The counters and records are plain NumPy loads and stores, without any fence or atomic
+operation, so the ring relies on the hardware keeping stores, and loads, in program order, as
+x86 processors do. On weakly ordered CPUs (ARM, POWER) the consumer could see the write counter
+advance before the record it publishes; ``SharedRing`` refuses to run on them.
+
+Usage:
+    ring = SharedRing.create(capacity=65536)          # engine process
+    # in a provider process:
+    provider.add_listener(RingWriter(SharedRing.attach(ring.name)))
+    # in the engine process:
+    consumer = RingConsumer([ring], engine_factory)
+    await consumer.run()
+"""
+import argparse
+import asyncio
+import multiprocessing
+import platform
+import time
+import zlib
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from backends import BACKENDS, backend_module
+from events import FIELDS, USE_CASE_CODES, USE_CASES, Reading, code_of, drone_of
+
+# Layout of a record; aligned, so a record is 24 bytes
+RECORD_DTYPE = np.dtype([("ts", "f8"), ("drone", "u4"), ("use_case", "u2"), ("value", "f8")], align=True)
+# The write and the read counters are on separate cache lines, followed by the records
+HEADER_SIZE = 128
+WRITE_COUNTER = 0
+READ_COUNTER = 8
+# Machines with total store order, on which the counters publish the records written before them
+STRONGLY_ORDERED_MACHINES = {"x86_64", "amd64", "i386", "i686", "x86"}
+
+
+def check_machine():
+    """Raises a RuntimeError unless the machine keeps stores in order, as the ring relies on."""
+    if platform.machine().lower() not in STRONGLY_ORDERED_MACHINES:
+        raise RuntimeError(f"SharedRing needs an x86 machine, whose stores are not reordered; got '{platform.machine()}'")
+
+
+def drone_number(drone_id):
+    """Returns the number identifying a drone in the records: the id itself if it is an int, otherwise its CRC-32."""
+    if isinstance(drone_id, int):
+        return drone_id
+    return zlib.crc32(str(drone_id).encode("utf-8"))
+
+
+class SharedRing:
+    """
+    Single-producer, single-consumer ring of records in shared memory, for x86 machines only
+    (see the module docstring).
+
+    Parameters:
+        memory (SharedMemory): The shared memory block holding the ring.
+        capacity (int): Number of records, a power of two.
+        owner (bool): Whether this handle created the block and unlinks it on ``unlink``.
+    """
+    def __init__(self, memory, capacity, owner=False):
+        self.memory = memory
+        self.capacity = capacity
+        self.mask = capacity - 1
+        self.owner = owner
+        self.counters = np.ndarray((HEADER_SIZE // 8,), dtype="u8", buffer=memory.buf)
+        self.records = np.ndarray((capacity,), dtype=RECORD_DTYPE, buffer=memory.buf, offset=HEADER_SIZE)
+        self.dropped = 0
+
+    @classmethod
+    def create(cls, capacity=65536, name=None):
+        if capacity <= 0 or capacity & (capacity - 1):
+            raise ValueError("capacity must be a power of two")
+        check_machine()
+        memory = shared_memory.SharedMemory(name=name, create=True, size=HEADER_SIZE + capacity * RECORD_DTYPE.itemsize)
+        ring = cls(memory, capacity, owner=True)
+        ring.counters[:] = 0
+        return ring
+
+    @classmethod
+    def attach(cls, name):
+        """Opens a ring created by another process."""
+        check_machine()
+        memory = shared_memory.SharedMemory(name=name)
+        return cls(memory, (memory.size - HEADER_SIZE) // RECORD_DTYPE.itemsize)
+
+    @property
+    def name(self):
+        return self.memory.name
+
+    def __len__(self):
+        """Number of records written and not yet released by the consumer."""
+        return int(self.counters[WRITE_COUNTER] - self.counters[READ_COUNTER])
+
+    def write(self, ts, drone, use_case, value):
+        """Producer: appends a record. Returns False, and counts the record as dropped, if the ring is full."""
+        written = int(self.counters[WRITE_COUNTER])
+        if written - int(self.counters[READ_COUNTER]) >= self.capacity:
+            self.dropped += 1
+            return False
+        self.records[written & self.mask] = (ts, drone, use_case, value)
+        # Publish the record after it is written; on x86 the stores are seen in this order
+        self.counters[WRITE_COUNTER] = written + 1
+        return True
+
+    def write_batch(self, records):
+        """Producer: appends as many records of a RECORD_DTYPE array as fit. Returns how many were written."""
+        written = int(self.counters[WRITE_COUNTER])
+        count = min(len(records), self.capacity - (written - int(self.counters[READ_COUNTER])))
+        start = written & self.mask
+        first = min(count, self.capacity - start)
+        self.records[start:start + first] = records[:first]
+        self.records[:count - first] = records[first:count]
+        self.dropped += len(records) - count
+        self.counters[WRITE_COUNTER] = written + count
+        return count
+
+    def read(self, max_records=4096):
+        """
+        Consumer: returns a view of the oldest unread records, at most ``max_records`` and never
+        across the end of the ring. The records stay valid until they are released.
+        """
+        read = int(self.counters[READ_COUNTER])
+        start = read & self.mask
+        count = min(int(self.counters[WRITE_COUNTER]) - read, self.capacity - start, max_records)
+        return self.records[start:start + count]
+
+    def release(self, count):
+        """Consumer: hands the space of the ``count`` oldest records back to the producer."""
+        self.counters[READ_COUNTER] += count
+
+    def close(self):
+        # The NumPy views must go before the memory can be closed
+        self.counters = self.records = None
+        self.memory.close()
+
+    def unlink(self):
+        """Frees the shared memory block; only the creating process does it."""
+        if self.owner:
+            self.memory.unlink()
+
+
+class RingWriter:
+    """
+    Listener writing provider payloads into a ring, for providers running in another process than the engine.
+
+    Payloads of a use case the engines do not know have no record code; like the engines, the
+    writer ignores them, and counts them in ``skipped``.
+
+    Drones are numbered in the records with ``drone_number`` by default, where two string ids may
+    share a CRC-32; a drone whose number is already taken by another one is rejected with a
+    ValueError on its first payload. Writers feeding the same consumer from several processes
+    cannot see each other's drones, so give them all the same explicit ``drone_numbers`` table.
+
+    Parameters:
+        ring (SharedRing): The ring to write to.
+        drone_numbers (dict): Optional, maps every drone id to its number in the records.
+    """
+    def __init__(self, ring, drone_numbers=None):
+        self.ring = ring
+        self.skipped = 0
+        self.drone_numbers = drone_numbers
+        if drone_numbers is not None and len(set(drone_numbers.values())) != len(drone_numbers):
+            raise ValueError("drone_numbers must give every drone a number of its own")
+        # Drone id of each number written so far
+        self.registered = {}
+
+    def number_of(self, drone_id):
+        """Returns the number of a drone in the records, registering it on first use."""
+        if self.drone_numbers is not None:
+            if drone_id not in self.drone_numbers:
+                raise ValueError(f"Drone '{drone_id}' has no number in drone_numbers")
+            return self.drone_numbers[drone_id]
+        number = drone_number(drone_id)
+        registered = self.registered.setdefault(number, drone_id)
+        if registered != drone_id:
+            raise ValueError(f"Drones '{registered}' and '{drone_id}' share the number {number}, pass a drone_numbers table")
+        return number
+
+    async def notify(self, data):
+        if isinstance(data, Reading):
+            code, value = data.code, data.value
+        else:
+            code = code_of(data)
+            if code is None:
+                self.skipped += 1
+                return
+            value = data[FIELDS[code]]
+        self.ring.write(time.time(), self.number_of(drone_of(data) or 0), code, value)
+
+
+class RingConsumer:
+    """
+    Reads batches of records from one or more rings and evaluates them with per-drone engines.
+
+    Within a batch only the latest record of each drone and use case is applied, as the engine
+    state only depends on the latest reading, and each drone's engine is run once per batch.
+    Records with a use case code the engines do not know are skipped, and counted in ``invalid``.
+
+    Parameters:
+        rings (list): The rings to read.
+        engine_factory (callable): Called without arguments to build the engine of a new drone.
+        max_batch (int): Maximum number of records read from a ring at once.
+    """
+    def __init__(self, rings, engine_factory, max_batch=4096):
+        self.rings = rings
+        self.engine_factory = engine_factory
+        self.max_batch = max_batch
+        self.engines = {}
+        self.received = 0
+        self.applied = 0
+        self.invalid = 0
+        self.batches = 0
+
+    def poll(self):
+        """Evaluates the records available in every ring. Returns the number of records consumed."""
+        consumed = 0
+        for ring in self.rings:
+            batch = ring.read(self.max_batch)
+            if len(batch):
+                self._evaluate(batch)
+                ring.release(len(batch))
+                consumed += len(batch)
+        return consumed
+
+    def _evaluate(self, batch):
+        self.received += len(batch)
+        self.batches += 1
+        known = batch["use_case"] < len(USE_CASES)
+        if not known.all():
+            self.invalid += int(len(batch) - known.sum())
+            batch = batch[known]
+        # Index of the last record of each (drone, use case) pair, in arrival order
+        keys = batch["drone"].astype("u8") << 16 | batch["use_case"]
+        _, last_from_end = np.unique(keys[::-1], return_index=True)
+        latest = np.sort(len(batch) - 1 - last_from_end)
+        touched = {}
+        for drone, code, value in zip(batch["drone"][latest].tolist(), batch["use_case"][latest].tolist(),
+                                      batch["value"][latest].tolist()):
+            engine = self.engines.get(drone)
+            if engine is None:
+                engine = self.engines[drone] = self.engine_factory()
+            engine.apply_event(Reading(code, value))
+            touched[drone] = engine
+        self.applied += len(latest)
+        for engine in touched.values():
+            engine.run()
+
+    async def run(self, idle_interval=0.001):
+        """Polls the rings until cancelled, sleeping ``idle_interval`` seconds whenever they are all empty."""
+        while True:
+            if not self.poll():
+                await asyncio.sleep(idle_interval)
+
+    def stats(self):
+        return {
+            "received": self.received,
+            "applied": self.applied,
+            "invalid": self.invalid,
+            "batches": self.batches,
+            "backlog": sum(len(ring) for ring in self.rings),
+            "drones": len(self.engines),
+        }
+
+
+def _provider_process(ring_name, first_drone, num_drones, interval, duration):
+    """Runs the providers of some drones in a process of its own, writing into a ring."""
+    from use_cases.battery_status import BatteryStatusProvider
+    from use_cases.sensor_anomaly import SensorAnomalyProvider
+
+    async def produce():
+        writer = RingWriter(SharedRing.attach(ring_name))
+        providers = []
+        for drone in range(first_drone, first_drone + num_drones):
+            battery_provider = BatteryStatusProvider(interval=interval, drone_id=drone)
+            sensor_anomaly_provider = SensorAnomalyProvider(interval=interval, drone_id=drone, seed=drone)
+            for provider in (battery_provider, sensor_anomaly_provider):
+                provider.add_listener(writer)
+                providers.append(provider)
+        try:
+            await asyncio.wait_for(asyncio.gather(*(provider.start() for provider in providers)), duration)
+        except asyncio.TimeoutError:
+            pass
+        writer.ring.close()
+
+    asyncio.run(produce())
+
+
+async def run_demo(args):
+    module = backend_module(args.backend)
+    rings = [SharedRing.create(args.capacity) for _ in range(args.producers)]
+    producers = [
+        multiprocessing.Process(target=_provider_process, args=(ring.name, index * args.drones, args.drones, args.interval, args.duration))
+        for index, ring in enumerate(rings)
+    ]
+    for producer in producers:
+        producer.start()
+    consumer = RingConsumer(rings, module.DecisionEngine)
+    task = asyncio.create_task(consumer.run())
+    await asyncio.sleep(args.duration)
+    for producer in producers:
+        await asyncio.to_thread(producer.join)
+    consumer.poll()
+    task.cancel()
+    stats = consumer.stats()
+    for ring in rings:
+        ring.close()
+        ring.unlink()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", default="clipspy", choices=list(BACKENDS))
+    parser.add_argument("--producers", type=int, default=2, help="provider processes, one ring each")
+    parser.add_argument("--drones", type=int, default=5, help="drones per provider process")
+    parser.add_argument("--interval", type=float, default=0.01, help="provider interval in seconds")
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds")
+    parser.add_argument("--capacity", type=int, default=65536, help="records per ring, a power of two")
+    args = parser.parse_args()
+    stats = asyncio.run(run_demo(args))
+    print(
+        f"Received {stats['received']} records from {stats['drones']} drones in {stats['batches']} batches, "
+        f"applied {stats['applied']} to the engines"
+    )
+
+
+if __name__ == "__main__":
+    main()
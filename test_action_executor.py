@@ -0,0 +1,104 @@
+import asyncio
+import time
+import pytest
+import clipspy_decision_engine
+import experta_decision_engine
+from action_executor import ActionExecutor
+
+
+def run_with_executor(handler, scenario, **kwargs):
+    async def main():
+        executor = ActionExecutor(handler, **kwargs)
+        executor.start()
+        await scenario(executor)
+        await executor.stop()
+        return executor.stats()
+    return asyncio.run(main())
+
+# Test that a slow actuator does not slow down inference
+@pytest.mark.parametrize("module", [experta_decision_engine, clipspy_decision_engine])
+def test_slow_action_does_not_block_run(module, mocker):
+    mocker.patch('experta_decision_engine.CustomLogger.get_logger')
+    carried_out = []
+
+    def slow_handler(rule_name, state_value):
+        time.sleep(0.2)
+        carried_out.append(rule_name)
+
+    async def scenario(executor):
+        engine = module.DecisionEngine(action_executor=executor)
+        start = time.perf_counter()
+        engine.apply_event({"use_case": "battery_status", "percent": 10.0})
+        engine.run()
+        assert time.perf_counter() - start < 0.1
+        await executor.drain()
+
+    stats = run_with_executor(slow_handler, scenario)
+    assert carried_out == ["action_critical"]
+    if module is experta_decision_engine:
+        # The action is still written to the drone actions log
+        logger = experta_decision_engine.CustomLogger.get_logger.return_value
+        assert any("Emergency landing" in call.args[0] for call in logger.info.call_args_list)
+    assert stats["completed"] == 1
+    assert stats["latency"]["action_critical"]["count"] == 1
+
+# Test that queued actions are dropped and an action in progress is cancelled by a newer one
+def test_superseded_actions():
+    started = []
+
+    async def handler(rule_name, state_value):
+        started.append(rule_name)
+        await asyncio.sleep(0.05)
+
+    async def scenario(executor):
+        executor.submit("action_normal", 0)
+        executor.submit("action_mild", 1)
+        await asyncio.sleep(0.01)
+        executor.submit("action_mild", 1)
+        executor.submit("action_critical", 3)
+        await executor.drain()
+
+    stats = run_with_executor(handler, scenario)
+    assert started == ["action_mild", "action_critical"]
+    assert stats["superseded"] == 3
+    assert stats["completed"] == 1
+
+def test_retries_and_timeouts():
+    attempts = []
+
+    async def flaky_handler(rule_name, state_value):
+        attempts.append(rule_name)
+        if len(attempts) == 1:
+            raise ConnectionError("flight controller unreachable")
+        if rule_name == "action_critical":
+            await asyncio.sleep(1)
+
+    async def scenario(executor):
+        executor.submit("action_severe", 2)
+        await executor.drain()
+        executor.submit("action_critical", 3)
+        await executor.drain()
+
+    stats = run_with_executor(flaky_handler, scenario, timeout=0.02, retries=1, backoff=0.001)
+    assert attempts == ["action_severe", "action_severe", "action_critical", "action_critical"]
+    assert (stats["errors"], stats["timed_out"], stats["retried"]) == (1, 2, 2)
+    assert (stats["completed"], stats["failed"]) == (1, 1)
+    assert "timed out" in stats["last_error"]
+
+# Test that an executor never started binds to the loop it is used on, and fails clearly outside of one
+def test_submit_without_start():
+    completed = []
+
+    async def handler(rule_name, state_value):
+        completed.append(rule_name)
+
+    executor = ActionExecutor(handler)
+    with pytest.raises(RuntimeError, match="start"):
+        executor.submit("action_normal", 0)
+
+    async def main():
+        executor.submit("action_critical", 3)
+        await executor.stop()
+
+    asyncio.run(main())
+    assert completed == ["action_critical"]
@@ -0,0 +1,72 @@
+import asyncio
+import random
+import pytest
+from aggregation import AggregationStage, Ewma, HysteresisClassifier, WindowMax, WindowMean
+from decision_table import SPECS
+
+
+class RecordingListener:
+    def __init__(self):
+        self.received = []
+
+    async def notify(self, data):
+        self.received.append(data)
+
+
+def publish(stage, payloads):
+    async def scenario():
+        for data in payloads:
+            await stage.notify(data)
+    asyncio.run(scenario())
+
+# Test the ring buffer statistics against their plain definitions
+def test_window_statistics():
+    rng = random.Random(5)
+    values = [rng.random() for _ in range(200)]
+    mean, maximum = WindowMean(7), WindowMax(7)
+    for index, value in enumerate(values):
+        window = values[max(0, index - 6):index + 1]
+        assert mean.update(value) == pytest.approx(sum(window) / len(window))
+        assert maximum.update(value) == max(window)
+
+def test_ewma():
+    ewma = Ewma(0.5)
+    assert [ewma.update(value) for value in (1.0, 0.0, 0.0)] == [1.0, 0.5, 0.25]
+
+# Test that the band only changes once the value is beyond the boundary by the margin
+def test_hysteresis():
+    classifier = HysteresisClassifier(SPECS["sensor_anomaly"], margin=0.05)
+    assert [classifier.update(value) for value in (0.2, 0.27, 0.31, 0.22, 0.19, 0.9, 0.1)] == [0, 0, 1, 1, 0, 3, 0]
+
+# Test that noise around a boundary reaches the engine only on band changes
+def test_stage_suppresses_flapping():
+    listener = RecordingListener()
+    stage = AggregationStage(listener)
+    rng = random.Random(1)
+    publish(stage, [{"use_case": "sensor_anomaly", "confidence": 0.5 + rng.gauss(0, 0.03)} for _ in range(500)])
+    stats = stage.stats()
+    assert stats["received"] == 500
+    assert stats["forwarded"] == len(listener.received) <= 5
+    # Forwarded readings carry the smoothed value, which the engine classifies into the same band
+    assert all(abs(data["confidence"] - 0.5) < 0.1 for data in listener.received)
+
+# Test that every drone and use case is aggregated separately and unknown use cases pass through
+def test_stage_keys_and_passthrough():
+    listener = RecordingListener()
+    stage = AggregationStage(listener, settings={"sensor_anomaly": {"statistic": "raw", "hysteresis": 0.0}})
+    publish(stage, [
+        {"use_case": "sensor_anomaly", "confidence": 0.1, "drone_id": "a"},
+        {"use_case": "sensor_anomaly", "confidence": 0.1, "drone_id": "b"},
+        {"use_case": "sensor_anomaly", "confidence": 0.2, "drone_id": "a"},
+        {"use_case": "sensor_anomaly", "confidence": 0.8, "drone_id": "a"},
+        {"use_case": "battery_status", "percent": 80.0, "drone_id": "a"},
+        {"use_case": "weather", "wind": 3.0},
+    ])
+    assert [(data["use_case"], data.get("drone_id")) for data in listener.received] == [
+        ("sensor_anomaly", "a"), ("sensor_anomaly", "b"), ("sensor_anomaly", "a"), ("battery_status", "a"), ("weather", None),
+    ]
+
+def test_unknown_statistic():
+    stage = AggregationStage(RecordingListener(), settings={"battery_status": {"statistic": "median"}})
+    with pytest.raises(ValueError):
+        publish(stage, [{"use_case": "battery_status", "percent": 80.0}])
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+from experta_decision_engine import *
+from batch_classifier import classify, describe
+
+# Random readings plus the exact band boundaries, where the rule predicates switch
+rng = np.random.default_rng(1234)
+PERCENTS = np.concatenate([rng.uniform(0.0, 100.0, 200), [0.0, 25.0, 50.0, 75.0, 100.0]])
+CONFIDENCES = np.concatenate([rng.uniform(0.0, 1.0, 200), [0.0, 0.25, 0.5, 0.75, 1.0]])
+
+# A fixture to initialize DecisionEngine for each test
+@pytest.fixture
+def decision_engine(mocker):
+    # Mock the CustomLogger to prevent actual file logging during tests
+    mocker.patch('experta_decision_engine.CustomLogger.get_logger')
+    return DecisionEngine()
+
+# Test the vectorized classifier against the experta rule engine
+def test_classify_matches_experta_rules(decision_engine):
+    battery, sensor, overall = classify(PERCENTS, CONFIDENCES)
+    for i, (percent, confidence) in enumerate(zip(PERCENTS, CONFIDENCES)):
+        decision_engine.reset()
+        decision_engine.declare(BatteryStatus(percent=float(percent)))
+        decision_engine.declare(SensorAnomalyStatus(confidence=float(confidence)))
+        decision_engine.run()
+        assert decision_engine.get_fact(BatteryState)["state_value"] == battery[i]
+        assert decision_engine.get_fact(SensorAnomalyState)["state_value"] == sensor[i]
+        assert decision_engine.get_fact(OverallState)["state_value"] == overall[i]
+
+# Test the vectorized classifier against the CLIPS rules
+def test_classify_matches_clips_rules():
+    from clipspy_decision_engine import DecisionEngine as ClipsDecisionEngine
+    engine = ClipsDecisionEngine()
+    battery, sensor, overall = classify(PERCENTS, CONFIDENCES)
+    for i, (percent, confidence) in enumerate(zip(PERCENTS, CONFIDENCES)):
+        engine.reset()
+        engine.add_fact('BatteryStatus', percent=float(percent))
+        engine.add_fact('SensorAnomalyStatus', confidence=float(confidence))
+        engine.env.run()
+        states = {fact.template.name: fact["state_value"] for fact in engine.env.facts()
+                  if fact.template.name in ("BatteryState", "SensorAnomalyState", "OverallState")}
+        assert (states["BatteryState"], states["SensorAnomalyState"], states["OverallState"]) == (battery[i], sensor[i], overall[i])
+
+# Test state descriptions
+def test_describe():
+    assert list(describe(classify([100.0, 60.0], [0.9, 0.1])[2])) == ["Critical", "Mild"]
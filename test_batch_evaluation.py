@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+import clipspy_decision_engine
+import experta_decision_engine
+from batch_classifier import classify
+from partitioned_engine import ACTIONS
+
+# Random readings plus the exact band boundaries
+rng = np.random.default_rng(25)
+PERCENTS = np.concatenate([rng.uniform(0.0, 100.0, 30), [0.0, 25.0, 50.0, 75.0, 100.0]])
+CONFIDENCES = np.concatenate([rng.uniform(0.0, 1.0, 30), [0.0, 0.25, 0.5, 0.75, 1.0]])
+SNAPSHOTS = [{"battery_status": float(percent), "sensor_anomaly": float(confidence)}
+             for percent, confidence in zip(PERCENTS, CONFIDENCES)]
+
+
+# Test the batch results of both backends against the vectorized classifier, in-process and on a pool
+@pytest.mark.parametrize("module", [experta_decision_engine, clipspy_decision_engine])
+@pytest.mark.parametrize("processes", [1, 2])
+def test_evaluate_batch_matches_classifier(module, processes):
+    battery, sensor, overall = classify(PERCENTS, CONFIDENCES)
+    results = module.DecisionEngine.evaluate_batch(iter(SNAPSHOTS), processes=processes, chunk_size=4)
+    assert not isinstance(results, list)
+    results = list(results)
+    assert len(results) == len(SNAPSHOTS)
+    for i, result in enumerate(results):
+        assert (result["BatteryState"], result["SensorAnomalyState"], result["OverallState"]) == (battery[i], sensor[i], overall[i])
+        assert result["actions"][-1] == ACTIONS[overall[i]][0]
+
+# Test that every snapshot starts from a reset engine
+def test_snapshots_are_independent():
+    snapshots = [{"battery_status": 10.0}, {"sensor_anomaly": 0.6}]
+    results = list(clipspy_decision_engine.DecisionEngine.evaluate_batch(snapshots, processes=1))
+    assert results[1]["BatteryState"] == 0
+    assert results[1]["OverallState"] == 2
+
+# Test that both backends give the same results, also for snapshots without some use cases
+def test_backends_agree():
+    snapshots = [{}, {"battery_status": 10.0}, {"sensor_anomaly": 0.6}, {"battery_status": 60.0, "sensor_anomaly": 0.9}]
+    experta_results = list(experta_decision_engine.DecisionEngine.evaluate_batch(snapshots, processes=1))
+    clipspy_results = list(clipspy_decision_engine.DecisionEngine.evaluate_batch(snapshots, processes=1))
+    assert experta_results == clipspy_results
+    assert experta_results[1] == {"BatteryState": 3, "SensorAnomalyState": 0, "OverallState": 3,
+                                  "actions": ["action_critical"]}
+
+def test_unknown_use_case():
+    with pytest.raises(ValueError, match="Unknown use case"):
+        list(experta_decision_engine.DecisionEngine.evaluate_batch([{"battery_level": 50.0}], processes=1))
+
+# Test that stopping the consumer early does not evaluate the whole grid
+def test_stream_stops_early():
+    consumed = []
+
+    def grid():
+        for percent in range(1000):
+            consumed.append(percent)
+            yield {"battery_status": float(percent % 101)}
+
+    results = clipspy_decision_engine.DecisionEngine.evaluate_batch(grid(), processes=2, chunk_size=10)
+    assert next(results)["BatteryState"] == 3
+    results.close()
+    assert len(consumed) < 1000
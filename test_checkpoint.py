@@ -0,0 +1,147 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+import pytest
+import checkpoint
+import clipspy_decision_engine
+import experta_decision_engine
+from batch_evaluation import ActionRecorder
+from checkpoint import Checkpointer, read_checkpoint, write_atomic
+
+EVENTS = [
+    {"use_case": "battery_status", "percent": 40.0},
+    {"use_case": "sensor_anomaly", "confidence": 0.3},
+]
+
+
+def build_engine(backend, **kwargs):
+    if backend == "experta":
+        return experta_decision_engine.DecisionEngine(logger=logging.getLogger("test_checkpoint"), **kwargs)
+    return clipspy_decision_engine.DecisionEngine(**kwargs)
+
+
+def feed(engine, events):
+    for data in events:
+        engine.apply_event(data)
+        engine.run()
+
+# Test that a restarted engine resumes from the checkpointed states instead of Normal
+@pytest.mark.parametrize("backend", ["experta", "clipspy"])
+def test_warm_restart(tmp_path, backend):
+    path = tmp_path / "engine.checkpoint.json"
+    engine = build_engine(backend)
+    feed(engine, EVENTS)
+    assert Checkpointer(engine, path).save()
+
+    restarted = build_engine(backend)
+    assert Checkpointer(restarted, path).restore()
+    assert restarted.state_values() == engine.state_values()
+    assert restarted.state_values()["OverallState"] == 2
+    # The restored readings keep driving the rules
+    feed(restarted, [{"use_case": "battery_status", "percent": 90.0}])
+    assert restarted.state_values()["OverallState"] == 1
+
+# Test that restoring runs the engine, firing the action of the restored state, and that both
+# backends checkpoint the last actioned state
+@pytest.mark.parametrize("backend", ["experta", "clipspy"])
+def test_restore_runs_engine(tmp_path, backend):
+    path = tmp_path / "engine.checkpoint.json"
+    engine = build_engine(backend)
+    feed(engine, EVENTS)
+    assert engine.checkpoint()["last_action_state"] == 2
+    assert Checkpointer(engine, path).save()
+
+    recorder = ActionRecorder()
+    restarted = build_engine(backend, action_executor=recorder)
+    assert Checkpointer(restarted, path).restore()
+    assert recorder.actions == ["action_severe"]
+    assert restarted.checkpoint() == engine.checkpoint()
+
+# Test that a checkpoint written by one backend restores into the other
+def test_checkpoint_portable_between_backends():
+    engine = build_engine("clipspy")
+    feed(engine, EVENTS)
+    restarted = build_engine("experta")
+    restarted.restore(json.loads(json.dumps(engine.checkpoint())))
+    assert restarted.state_values() == engine.state_values()
+
+# Test that an edge-triggered experta engine does not repeat the restored action
+def test_restore_edge_triggered_suppresses_action(tmp_path):
+    engine = build_engine("experta")
+    feed(engine, EVENTS)
+    restarted = build_engine("experta", edge_triggered=True)
+    restarted.restore(engine.checkpoint())
+    restarted.run()
+    assert restarted.suppressed["action_severe"] == 1
+
+# Test that unchanged working memory is not written again
+def test_save_only_on_change(tmp_path):
+    engine = build_engine("clipspy")
+    checkpointer = Checkpointer(engine, tmp_path / "engine.checkpoint.json")
+    assert checkpointer.save()
+    assert not checkpointer.save()
+    feed(engine, EVENTS[:1])
+    assert checkpointer.save()
+    assert checkpointer.saves == 2
+
+# Test that missing, corrupt, foreign and stale checkpoints are ignored
+def test_unusable_checkpoints(tmp_path):
+    path = tmp_path / "engine.checkpoint.json"
+    assert read_checkpoint(path) is None
+    path.write_text('{"version": 1, "saved_at": 0, "facts": [')
+    assert read_checkpoint(path) is None
+    write_atomic(path, {"version": 99, "facts": []})
+    assert read_checkpoint(path) is None
+    write_atomic(path, {"version": 1, "saved_at": 0, "facts": []})
+    assert read_checkpoint(path) is not None
+    assert read_checkpoint(path, max_age=60) is None
+    assert not Checkpointer(build_engine("clipspy"), path, max_age=60).restore()
+
+# Test that a failed write leaves the previous checkpoint and no temporary file
+def test_atomic_write_keeps_previous(tmp_path):
+    path = tmp_path / "engine.checkpoint.json"
+    write_atomic(path, {"version": 1, "facts": []})
+    with pytest.raises(TypeError):
+        write_atomic(path, {"version": 1, "facts": [object()]})
+    assert json.loads(path.read_text()) == {"version": 1, "facts": []}
+    assert os.listdir(tmp_path) == ["engine.checkpoint.json"]
+
+# Test that the periodic task saves once more when cancelled
+def test_run_saves_on_cancel(tmp_path):
+    async def scenario():
+        engine = build_engine("clipspy")
+        checkpointer = Checkpointer(engine, tmp_path / "engine.checkpoint.json", interval=60)
+        task = asyncio.create_task(checkpointer.run())
+        await asyncio.sleep(0)
+        feed(engine, EVENTS)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return engine
+
+    engine = asyncio.run(scenario())
+    assert read_checkpoint(tmp_path / "engine.checkpoint.json")["facts"] == engine.checkpoint()["facts"]
+
+# Test that the periodic saves write and sync the file off the event loop's thread
+def test_run_writes_in_thread(tmp_path, monkeypatch):
+    writers = []
+
+    def recording_write_atomic(*args):
+        writers.append(threading.current_thread())
+        write_atomic(*args)
+
+    monkeypatch.setattr(checkpoint, "write_atomic", recording_write_atomic)
+
+    async def scenario():
+        engine = build_engine("clipspy")
+        checkpointer = Checkpointer(engine, tmp_path / "engine.checkpoint.json", interval=0.01)
+        task = asyncio.create_task(checkpointer.run())
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(scenario())
+    assert writers[0] is not threading.main_thread()
@@ -0,0 +1,83 @@
+import asyncio
+import os
+import pytest
+from clipspy_decision_engine import DecisionEngine
+
+
+def state_values(engine):
+    return {fact.template.name: fact["state_value"] for fact in engine.env.facts()
+            if fact.template.name in ("BatteryState", "SensorAnomalyState", "OverallState")}
+
+# A fixture to initialize DecisionEngine for each test
+@pytest.fixture
+def decision_engine():
+    return DecisionEngine()
+
+# Test that updates reuse the cached fact instead of asserting new ones
+def test_update_fact_reuses_cached_handle(decision_engine):
+    decision_engine.update_fact('BatteryStatus', percent=80.0)
+    handle = decision_engine.fact_handles['BatteryStatus']
+    decision_engine.update_fact('BatteryStatus', percent=40.0)
+    assert decision_engine.fact_handles['BatteryStatus'] is handle
+    facts = list(decision_engine.get_template('BatteryStatus').facts())
+    assert len(facts) == 1 and facts[0]["percent"] == 40.0
+
+# Test that retracted or reset facts are not used from the cache
+def test_cached_handle_invalidation(decision_engine):
+    decision_engine.update_fact('BatteryStatus', percent=80.0)
+    decision_engine.fact_handles['BatteryStatus'].retract()
+    decision_engine.update_fact('BatteryStatus', percent=30.0)
+    assert [fact["percent"] for fact in decision_engine.get_template('BatteryStatus').facts()] == [30.0]
+    decision_engine.reset()
+    assert decision_engine.fact_handles == {}
+    decision_engine.update_fact('BatteryStatus', percent=20.0)
+    assert [fact["percent"] for fact in decision_engine.get_template('BatteryStatus').facts()] == [20.0]
+
+# Test the bulk update followed by a single run
+def test_update_facts_then_run(decision_engine):
+    decision_engine.update_facts({'BatteryStatus': {'percent': 60.0}, 'SensorAnomalyStatus': {'confidence': 0.6}})
+    decision_engine.run()
+    assert state_values(decision_engine) == {"BatteryState": 1, "SensorAnomalyState": 2, "OverallState": 2}
+
+# Test notify with provider payloads
+def test_notify(decision_engine):
+    asyncio.run(decision_engine.notify({"use_case": "battery_status", "percent": 10.0}))
+    assert state_values(decision_engine)["OverallState"] == 3
+
+# Test that the compiled image is written on the first start and loaded on the next ones
+def test_image_cache(tmp_path, mocker):
+    DecisionEngine(image_cache_dir=str(tmp_path))
+    images = list(tmp_path.glob("constructs-*.bin"))
+    assert len(images) == 1
+    save_image = mocker.spy(DecisionEngine, "save_image")
+    engine = DecisionEngine(image_cache_dir=str(tmp_path))
+    save_image.assert_not_called()
+    parsed = DecisionEngine(image_cache_dir=None)
+    assert [rule.name for rule in engine.env.rules()] == [rule.name for rule in parsed.env.rules()]
+    asyncio.run(engine.notify({"use_case": "battery_status", "percent": 40.0}))
+    assert state_values(engine)["OverallState"] == 2
+
+# Test that changed sources get a new image, replacing the stale one, and that a corrupt image is rebuilt
+def test_image_cache_invalidation(tmp_path, mocker):
+    import clipspy_decision_engine
+    sources = []
+    for path in clipspy_decision_engine.CONSTRUCT_FILES:
+        copy = tmp_path / os.path.basename(path)
+        copy.write_text(open(path).read())
+        sources.append(str(copy))
+    mocker.patch.object(clipspy_decision_engine, "CONSTRUCT_FILES", sources)
+    cache_dir = tmp_path / "cache"
+    DecisionEngine(image_cache_dir=str(cache_dir))
+    [first_image] = cache_dir.glob("constructs-*.bin")
+
+    with open(sources[-1], "a") as rules:
+        rules.write("\n(defrule extra-rule (OverallState (state_value 3)) => (printout t \"extra\" crlf))\n")
+    engine = DecisionEngine(image_cache_dir=str(cache_dir))
+    [second_image] = cache_dir.glob("constructs-*.bin")
+    assert second_image != first_image
+    assert "extra-rule" in [rule.name for rule in engine.env.rules()]
+
+    second_image.write_bytes(b"not an image")
+    engine = DecisionEngine(image_cache_dir=str(cache_dir))
+    assert "extra-rule" in [rule.name for rule in engine.env.rules()]
+    assert second_image.read_bytes() != b"not an image"
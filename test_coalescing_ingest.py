@@ -0,0 +1,67 @@
+import asyncio
+import pytest
+from experta_decision_engine import *
+from coalescing_ingest import CoalescingIngest
+
+# A fixture to initialize DecisionEngine for each test
+@pytest.fixture
+def decision_engine(mocker):
+    # Mock the CustomLogger to prevent actual file logging during tests
+    mocker.patch('experta_decision_engine.CustomLogger.get_logger')
+    return DecisionEngine()
+
+# Test that a burst of events is coalesced into a single engine run
+def test_burst_is_coalesced_into_one_run(decision_engine, mocker):
+    run = mocker.spy(decision_engine, "run")
+    ingest = CoalescingIngest(decision_engine, window=0.01, batch_size=100)
+
+    async def burst():
+        for percent in (90.0, 60.0, 20.0):
+            await ingest.notify({"use_case": "battery_status", "percent": percent})
+        await ingest.notify({"use_case": "sensor_anomaly", "confidence": 0.1})
+        await asyncio.sleep(0.05)
+
+    asyncio.run(burst())
+    assert run.call_count == 1
+    assert ingest.stats() == {"received": 4, "coalesced": 2, "flushes": 1, "pending": 0}
+    assert decision_engine.get_fact(BatteryStatus)["percent"] == 20.0
+    assert decision_engine.get_fact(OverallState)["state_value"] == 3
+
+# Test that reaching the batch size flushes without waiting for the window
+def test_batch_size_triggers_flush(decision_engine):
+    ingest = CoalescingIngest(decision_engine, window=60, batch_size=2)
+
+    async def send():
+        await ingest.notify({"use_case": "battery_status", "percent": 40.0})
+        await ingest.notify({"use_case": "sensor_anomaly", "confidence": 0.3})
+
+    asyncio.run(send())
+    assert ingest.flushes == 1
+    assert decision_engine.get_fact(OverallState)["state_value"] == 2
+
+# Test that payloads of different drones are not coalesced with each other
+def test_drones_are_coalesced_apart(mocker):
+    engine = mocker.Mock()
+    ingest = CoalescingIngest(engine, window=60, batch_size=3)
+
+    async def send():
+        await ingest.notify({"use_case": "battery_status", "percent": 40.0, "drone_id": "drone-1"})
+        await ingest.notify({"use_case": "battery_status", "percent": 30.0, "drone_id": "drone-2"})
+        await ingest.notify({"use_case": "battery_status", "percent": 20.0, "drone_id": "drone-1"})
+
+    asyncio.run(send())
+    assert ingest.coalesced == 1
+    assert [call.args[0]["percent"] for call in engine.apply_event.call_args_list] == [20.0, 30.0]
+
+# Test that closing applies the payloads still waiting for the window
+def test_close_applies_pending(decision_engine):
+    ingest = CoalescingIngest(decision_engine, window=60, batch_size=100)
+
+    async def send_and_close():
+        await ingest.notify({"use_case": "battery_status", "percent": 10.0})
+        await ingest.close()
+        return ingest._flush_handle
+
+    assert asyncio.run(send_and_close()) is None
+    assert ingest.stats() == {"received": 1, "coalesced": 0, "flushes": 1, "pending": 0}
+    assert decision_engine.get_fact(OverallState)["state_value"] == 3
@@ -0,0 +1,67 @@
+import gzip
+import json
+import logging
+import pytest
+from custom_logger import CustomLogger
+
+# Each test logs into its own directory under a unique role, so no handlers are shared
+@pytest.fixture
+def log_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+# Test that queued records are written by the listener as JSON lines without ANSI codes
+def test_queued_json_lines_output(log_dir, request):
+    role = f"test_{request.node.name}"
+    logger_instance = CustomLogger(role, queued=True, json_lines=True)
+    logger_instance.get_logger().info("\033[92mAction: Continue mission\033[0m")
+    logger_instance.stop()
+
+    lines = (log_dir / "logs" / f"{role}.jsonl").read_text().splitlines()
+    record = json.loads(lines[0])
+    assert record["msg"] == "Action: Continue mission"
+    assert record["role"] == role and record["level"] == "INFO"
+
+# Test that the console output is rate limited while the file keeps every record
+def test_console_rate_limit(log_dir, request, capsys):
+    role = f"test_{request.node.name}"
+    logger_instance = CustomLogger(role, console_rate_limit=5)
+    logger = logger_instance.get_logger()
+    for i in range(50):
+        logger.info(f"message {i}")
+
+    assert len(capsys.readouterr().out.splitlines()) == 5
+    assert len((log_dir / "logs" / f"{role}.log").read_text().splitlines()) == 50
+
+# Test that nothing is created before the logger is first requested
+def test_lazy_setup(log_dir, request):
+    role = f"test_{request.node.name}"
+    logger_instance = CustomLogger(role)
+    assert not (log_dir / "logs").exists()
+    logger_instance.get_logger().info("first record")
+    assert logger_instance.get_logger() is logger_instance.get_logger()
+    assert (log_dir / "logs" / f"{role}.log").exists()
+
+# Test that the log file is rotated into a bounded number of compressed backups
+def test_rotation(log_dir, request):
+    role = f"test_{request.node.name}"
+    logger_instance = CustomLogger(role, max_bytes=1000, backup_count=2)
+    logger = logger_instance.get_logger()
+    for i in range(200):
+        logger.info(f"message {i}")
+
+    files = sorted(path.name for path in (log_dir / "logs").iterdir())
+    assert files == [f"{role}.log", f"{role}.log.1.gz", f"{role}.log.2.gz"]
+    assert (log_dir / "logs" / f"{role}.log").stat().st_size <= 1000
+    with gzip.open(log_dir / "logs" / f"{role}.log.1.gz", "rt") as backup:
+        assert "message" in backup.read()
+
+# Test that a role is only set up once, whatever the number of CustomLoggers created for it
+def test_role_set_up_once(log_dir, request):
+    role = f"test_{request.node.name}"
+    first, second = CustomLogger(role, queued=True), CustomLogger(role, queued=True)
+    assert first.get_logger() is second.get_logger()
+    assert len(logging.getLogger(role).handlers) == 1
+    second.get_logger().info("single record")
+    first.stop()
+    assert (log_dir / "logs" / f"{role}.log").read_text().count("single record") == 1
@@ -0,0 +1,41 @@
+import random
+import pytest
+from decision_table import SPECS, UseCaseSpec, classify, clips_source, CLIPS_STATE_RULES_PATH
+
+# Test the decision table lookup on the band boundaries
+@pytest.mark.parametrize("use_case, value, expected_state", [
+    ("battery_status", 100.0, 0),
+    ("battery_status", 75.0, 1),
+    ("battery_status", 50.0001, 1),
+    ("battery_status", 50.0, 2),
+    ("battery_status", 25.0, 3),
+    ("battery_status", 0.0, 3),
+    ("sensor_anomaly", 0.0, 0),
+    ("sensor_anomaly", 0.25, 0),
+    ("sensor_anomaly", 0.3, 1),
+    ("sensor_anomaly", 0.75, 2),
+    ("sensor_anomaly", 0.9, 3),
+])
+def test_classify(use_case, value, expected_state):
+    assert classify(use_case, value) == expected_state
+
+# Test the binary search against the band predicates the rules are generated from
+@pytest.mark.parametrize("use_case, high", [("battery_status", 100.0), ("sensor_anomaly", 1.0)])
+def test_classify_matches_band_limits(use_case, high):
+    spec = SPECS[use_case]
+    rng = random.Random(3)
+    for value in [rng.uniform(0, high) for _ in range(500)] + spec.bounds:
+        matching = [state for state, lower, upper in spec.band_limits()
+                    if (lower is None or value > lower) and (upper is None or value <= upper)]
+        assert matching == [spec.classify(value)]
+
+# Test that the generated CLIPS rules are in sync with the specs
+def test_clips_state_rules_are_up_to_date():
+    with open(CLIPS_STATE_RULES_PATH, encoding="utf-8") as clp_file:
+        assert clp_file.read() == clips_source(), "Run: python decision_table.py"
+
+# Test the spec validation
+def test_invalid_spec():
+    with pytest.raises(ValueError):
+        UseCaseSpec("test", "value", "Status", "State", "test_state", "Test State",
+                    [{"state": 0, "upper": 5}, {"state": 1, "upper": 2}, {"state": 2, "upper": None}])
@@ -0,0 +1,180 @@
+import asyncio
+import logging
+import time
+import pytest
+from custom_logger import CustomLogger
+from fleet_runner import BackendEngineFactory
+from engine_worker import EngineWorker, EngineWorkerError
+
+
+class SlowEngine:
+    """Engine stand-in whose run() blocks like a heavy rule set."""
+    def __init__(self, run_time=0.02):
+        self.run_time = run_time
+        self.percent = None
+
+    def apply_event(self, data):
+        if data["percent"] < 0:
+            raise ValueError("invalid reading")
+        self.percent = data["percent"]
+
+    def run(self):
+        time.sleep(self.run_time)
+
+    def state_values(self):
+        return {"BatteryState": 3 if self.percent <= 25 else 0}
+
+
+class SlowEngineFactory:
+    def __init__(self, run_time=0.02):
+        self.run_time = run_time
+
+    def __call__(self):
+        return SlowEngine(self.run_time)
+
+
+class FailingEngineFactory:
+    def __call__(self):
+        raise OSError("rule file not found")
+
+
+async def timer_lateness(duration=0.2, interval=0.005):
+    """Returns the largest delay of a periodic provider-like timer."""
+    loop = asyncio.get_running_loop()
+    worst = 0.0
+    end = loop.time() + duration
+    while loop.time() < end:
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        worst = max(worst, loop.time() - expected)
+    return worst
+
+
+async def publish(listener, count):
+    for index in range(count):
+        await listener.notify({"use_case": "battery_status", "percent": 100.0 - index})
+        await asyncio.sleep(0.01)
+
+# Test that decisions come back in order through the futures and the callback
+@pytest.mark.parametrize("use_process", [False, True])
+def test_decisions(use_process):
+    async def scenario():
+        decisions = []
+        worker = EngineWorker(SlowEngineFactory(), use_process=use_process,
+                              on_decision=lambda data, decision: decisions.append((data["percent"], decision)))
+        worker.start()
+        futures = [worker.submit({"use_case": "battery_status", "percent": percent}) for percent in (80.0, 20.0)]
+        results = await asyncio.gather(*futures)
+        await worker.stop()
+        return results, decisions, worker.stats()
+
+    results, decisions, stats = asyncio.run(scenario())
+    assert results == [{"BatteryState": 0}, {"BatteryState": 3}]
+    assert decisions == [(80.0, {"BatteryState": 0}), (20.0, {"BatteryState": 3})]
+    assert stats == {"submitted": 2, "completed": 2, "errors": 0, "pending": 0}
+
+# Test that an engine error fails its future without stopping the worker
+def test_engine_error():
+    async def scenario():
+        worker = EngineWorker(SlowEngineFactory())
+        worker.start()
+        failing = worker.submit({"use_case": "battery_status", "percent": -1.0})
+        with pytest.raises(EngineWorkerError):
+            await failing
+        decision = await worker.submit({"use_case": "battery_status", "percent": 10.0})
+        await worker.stop()
+        return decision, worker.stats()
+
+    decision, stats = asyncio.run(scenario())
+    assert decision == {"BatteryState": 3}
+    assert stats["errors"] == 1 and stats["completed"] == 1
+
+# Test that a failing engine factory fails the pending and later payloads instead of blocking drain and stop
+@pytest.mark.parametrize("use_process", [False, True])
+def test_engine_factory_error(use_process):
+    async def scenario():
+        worker = EngineWorker(FailingEngineFactory(), use_process=use_process)
+        worker.start()
+        pending = worker.submit({"use_case": "battery_status", "percent": 10.0})
+        await worker.drain()
+        later = worker.submit({"use_case": "battery_status", "percent": 20.0})
+        await worker.stop()
+        return pending, later, worker.stats()
+
+    pending, later, stats = asyncio.run(scenario())
+    for future in (pending, later):
+        with pytest.raises(EngineWorkerError, match="rule file not found"):
+            future.result()
+    assert stats["errors"] == 2 and stats["pending"] == 0
+
+# Test that the pending payloads fail when the subprocess dies
+def test_killed_subprocess():
+    async def scenario():
+        worker = EngineWorker(SlowEngineFactory(run_time=10), use_process=True)
+        worker.start()
+        pending = worker.submit({"use_case": "battery_status", "percent": 10.0})
+        worker.process.kill()
+        await asyncio.wait_for(worker.drain(), 5)
+        await worker.stop()
+        return pending
+
+    with pytest.raises(EngineWorkerError, match="exited with code"):
+        asyncio.run(scenario()).result()
+
+def test_submit_before_start():
+    worker = EngineWorker(SlowEngineFactory())
+    with pytest.raises(RuntimeError, match="start"):
+        worker.submit({"use_case": "battery_status", "percent": 10.0})
+
+# Test that inference in the worker does not delay the event loop's timers
+def test_worker_keeps_timers_on_time():
+    async def scenario(listener):
+        return (await asyncio.gather(timer_lateness(), publish(listener, 10)))[0]
+
+    class InlineEngine(SlowEngine):
+        async def notify(self, data):
+            self.apply_event(data)
+            self.run()
+
+    async def with_worker():
+        worker = EngineWorker(SlowEngineFactory())
+        worker.start()
+        lateness = await scenario(worker)
+        await worker.stop()
+        return lateness
+
+    inline_lateness = asyncio.run(scenario(InlineEngine()))
+    worker_lateness = asyncio.run(with_worker())
+    assert inline_lateness >= 0.015
+    assert worker_lateness < inline_lateness / 2
+
+@pytest.fixture
+def parent_drone_actions_logger(tmp_path, monkeypatch):
+    """
+    Queued drone_actions logging running in the test process, which a forked child would inherit.
+    Its listener and handlers are removed after the test, and the roles set up earlier are registered again.
+    """
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(CustomLogger, "loggers", {})
+    earlier_handlers = list(logging.getLogger("drone_actions").handlers)
+    custom_logger = CustomLogger("drone_actions", queued=True)
+    logger = custom_logger.get_logger()
+    added_handlers = [handler for handler in logger.handlers if handler not in earlier_handlers]
+    listener = custom_logger.listener
+    yield logger
+    custom_logger.stop()
+    for handler in listener.handlers:
+        handler.close()
+    for handler in added_handlers:
+        logger.removeHandler(handler)
+
+# Test that the actions logged by an engine in a subprocess reach the log file
+def test_subprocess_logs_reach_file(tmp_path, parent_drone_actions_logger):
+    async def scenario():
+        worker = EngineWorker(BackendEngineFactory("experta"), use_process=True)
+        worker.start()
+        await worker.submit({"use_case": "battery_status", "percent": 10.0})
+        await worker.stop()
+
+    asyncio.run(scenario())
+    assert "Emergency landing is advised" in (tmp_path / "logs" / "drone_actions.log").read_text()
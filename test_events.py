@@ -0,0 +1,43 @@
+import pytest
+import clipspy_decision_engine
+import experta_decision_engine
+from events import USE_CASE_CODES, EventTable, Reading, as_payload, as_reading
+from use_cases.battery_status import BatteryStatusProvider
+
+
+def test_table_dispatch():
+    table = EventTable()
+    received = []
+    table.register("battery_status", received.append)
+    table.dispatch(Reading(USE_CASE_CODES["battery_status"], 40.0))
+    table.dispatch({"use_case": "battery_status", "percent": 30.0})
+    # Use cases without a handler, or unknown altogether, are ignored
+    table.dispatch(Reading(USE_CASE_CODES["sensor_anomaly"], 0.5))
+    table.dispatch({"use_case": "unknown"})
+    assert received == [40.0, 30.0]
+
+def test_adapters_round_trip():
+    data = {"use_case": "sensor_anomaly", "confidence": 0.7, "drone_id": "drone-1"}
+    reading = as_reading(data)
+    assert (reading.use_case, reading.value, reading.drone_id) == ("sensor_anomaly", 0.7, "drone-1")
+    assert as_payload(reading) == data
+    assert as_reading(reading) is reading
+
+def test_typed_provider():
+    provider = BatteryStatusProvider(start_percent=50.0, drone_id=3)
+    assert provider.next_event() == Reading(USE_CASE_CODES["battery_status"], 45.0, 3)
+    assert provider.next_reading() == {"use_case": "battery_status", "percent": 40.0}
+
+# Test that both engines reach the same state from Readings as from dict payloads
+@pytest.mark.parametrize("module", [experta_decision_engine, clipspy_decision_engine])
+def test_engine_accepts_readings(module, mocker):
+    if module is experta_decision_engine:
+        mocker.patch("experta_decision_engine.CustomLogger.get_logger")
+    payloads = [{"use_case": "battery_status", "percent": 15.0}, {"use_case": "sensor_anomaly", "confidence": 0.95}]
+    engines = module.DecisionEngine(), module.DecisionEngine()
+    for data in payloads:
+        engines[0].apply_event(data)
+        engines[1].apply_event(as_reading(data))
+    for engine in engines:
+        engine.run()
+    assert engines[0].state_values() == engines[1].state_values()
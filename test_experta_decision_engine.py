@@ -83,4 +83,48 @@ def test_actions_for_overall_states(decision_engine, mocker, state, expected_log
     decision_engine.run()
     # Check if the expected message part is present in any of the logged messages, ignoring color codes
     log_messages = [call_args[0][0] for call_args in mock_log_info.call_args_list]  # Extracts logged messages
-    assert any(expected_log in message for message in log_messages)
\ No newline at end of file
+    assert any(expected_log in message for message in log_messages)
+
+# Test that the fact index stays in sync with declare/retract
+def test_fact_index_tracks_declare_and_retract(decision_engine):
+    decision_engine.update_fact(BatteryStatus, percent=80.0)
+    decision_engine.update_fact(BatteryStatus, percent=40.0)
+    assert decision_engine.get_fact(BatteryStatus)["percent"] == 40.0
+    assert len(decision_engine.facts.of_type(BatteryStatus)) == 1
+    decision_engine.remove_fact(BatteryStatus)
+    assert decision_engine.get_fact(BatteryStatus) is None
+    decision_engine.reset()
+    assert decision_engine.get_fact(OverallState)["state_value"] == 0
+
+
+# Test lookups by the optional index key field
+def test_fact_index_by_key(decision_engine):
+    class DroneBatteryStatus(BatteryStatus):
+        __index_key__ = "drone_id"
+        drone_id = Field(str, mandatory=True)
+
+    decision_engine.update_fact(DroneBatteryStatus, drone_id="a", percent=90.0)
+    decision_engine.update_fact(DroneBatteryStatus, drone_id="b", percent=20.0)
+    decision_engine.update_fact(DroneBatteryStatus, drone_id="a", percent=70.0)
+    assert decision_engine.get_fact(DroneBatteryStatus, key="a")["percent"] == 70.0
+    assert decision_engine.get_fact(DroneBatteryStatus, key="b")["percent"] == 20.0
+    # Subclassed facts are still found through their parent type
+    assert len(decision_engine.facts.of_type(BatteryStatus)) == 2
+
+
+# Test that edge-triggered mode only logs state changes and counts the suppressed activations
+def test_edge_triggered_mode(mocker):
+    mocker.patch('experta_decision_engine.CustomLogger.get_logger')
+    engine = DecisionEngine(edge_triggered=True)
+    mock_log_info = mocker.patch.object(engine.logger, "info")
+    for percent in (90.0, 85.0, 85.0, 80.0, 60.0):
+        engine.apply_event({"use_case": "battery_status", "percent": percent})
+        engine.run()
+
+    log_messages = [call_args[0][0] for call_args in mock_log_info.call_args_list]
+    assert log_messages.count("Battery State 0: Normal") == 1
+    assert log_messages.count("Battery State 1: Mild") == 1
+    assert sum("Continue mission" in message for message in log_messages) == 1
+    assert sum("Consider returning to home soon" in message for message in log_messages) == 1
+    assert engine.suppressed["battery_state_normal"] == 2
+    assert engine.suppressed["BatteryStatus"] == 1
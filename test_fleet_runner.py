@@ -0,0 +1,83 @@
+import time
+import pytest
+from fleet_runner import BackendEngineFactory, FleetRunner, shard_for
+
+
+class RecordingEngine:
+    """Engine stand-in that fails if a drone's events arrive out of order."""
+    def __init__(self, drone_id):
+        self.drone_id = drone_id
+        self.last_seq = -1
+
+    def apply_event(self, data):
+        assert data["drone_id"] == self.drone_id
+        assert data["seq"] > self.last_seq
+        self.last_seq = data["seq"]
+
+    def run(self):
+        pass
+
+
+class SlowEngine(RecordingEngine):
+    def run(self):
+        time.sleep(0.05)
+
+
+class CrashingEngine(RecordingEngine):
+    def apply_event(self, data):
+        raise RuntimeError("engine crashed")
+
+
+# Test that routing is stable for a drone and spreads drones over the shards
+def test_shard_for_is_stable():
+    assert shard_for("drone-7", 4) == shard_for("drone-7", 4)
+    assert len({shard_for(f"drone-{i}", 4) for i in range(50)}) == 4
+
+
+# Test that every submitted event is processed and reported per shard
+@pytest.mark.parametrize("batch_size", [1, 16])
+def test_fleet_processes_all_events(batch_size):
+    fleet = FleetRunner(RecordingEngine, num_shards=2, batch_size=batch_size)
+    fleet.start()
+    for seq in range(200):
+        fleet.submit({"drone_id": f"drone-{seq % 10}", "use_case": "battery_status", "percent": 50.0, "seq": seq})
+    fleet.stop(timeout=10)
+
+    report = fleet.report()
+    assert [shard["shard"] for shard in report] == [0, 1]
+    assert sum(shard["processed"] for shard in report) == 200
+    assert all(shard["queue_depth"] == 0 for shard in report)
+
+# Test that a full shard queue drops batches instead of blocking the caller
+def test_full_queue_drops_batches():
+    fleet = FleetRunner(SlowEngine, num_shards=1, queue_size=1)
+    fleet.start()
+    start = time.perf_counter()
+    for seq in range(50):
+        fleet.submit({"drone_id": "drone-1", "use_case": "battery_status", "percent": 50.0, "seq": seq})
+    assert time.perf_counter() - start < 0.5
+    assert fleet.stop(timeout=10) == [0]
+    shard = fleet.report()[0]
+    assert shard["dropped"] > 0
+    assert shard["processed"] + shard["dropped"] == 50
+
+# Test that a crashed shard worker is reported and its later events are dropped
+def test_crashed_shard_is_reported():
+    fleet = FleetRunner(CrashingEngine, num_shards=1)
+    fleet.start()
+    fleet.submit({"drone_id": "drone-1", "use_case": "battery_status", "percent": 50.0, "seq": 0})
+    fleet.workers[0].join(10)
+    shard = fleet.report()[0]
+    assert not shard["alive"] and shard["exitcode"] != 0
+    fleet.submit({"drone_id": "drone-1", "use_case": "battery_status", "percent": 50.0, "seq": 1})
+    assert fleet.report()[0]["dropped"] == 1
+    assert fleet.stop(timeout=1) == [shard["exitcode"]]
+
+# Test that the lines logged by the per-drone experta engines carry their drone id
+def test_engine_log_lines_name_the_drone(mocker):
+    logger = mocker.patch('experta_decision_engine.CustomLogger.get_logger').return_value
+    engine = BackendEngineFactory("experta")("drone-3")
+    engine.apply_event({"use_case": "battery_status", "percent": 10.0})
+    engine.run()
+    messages = [call.args[1] for call in logger.log.call_args_list]
+    assert messages and all(message.startswith("[drone-3] ") for message in messages)
@@ -0,0 +1,108 @@
+import asyncio
+import pytest
+import clipspy_decision_engine
+import experta_decision_engine
+from instrumentation import EngineMetrics, Histogram, MetricsExporter, prometheus_text
+
+EVENTS = [
+    {"use_case": "battery_status", "percent": 90.0},
+    {"use_case": "battery_status", "percent": 60.0},
+    {"use_case": "sensor_anomaly", "confidence": 0.9},
+]
+
+
+async def notify_all(engine):
+    for data in EVENTS:
+        await engine.notify(data)
+
+# Test that histogram buckets are cumulative and end with +Inf
+def test_histogram_snapshot():
+    histogram = Histogram((0.001, 0.01))
+    for value in (0.0005, 0.001, 0.005, 1.0):
+        histogram.observe(value)
+    snapshot = histogram.snapshot()
+    assert snapshot["buckets"] == {0.001: 2, 0.01: 3, float("inf"): 4}
+    assert snapshot["count"] == 4 and snapshot["sum"] == pytest.approx(1.0065)
+
+# Test the Prometheus text rendering of a snapshot
+def test_prometheus_text():
+    metrics = EngineMetrics(buckets=(0.01,))
+    metrics.observe_activation("rule_a")
+    metrics.observe_firing("rule_a", 0.002)
+    metrics.observe_notify(0.005, 7)
+    text = prometheus_text([(metrics.snapshot(), {"backend": "experta"})])
+    assert 'decision_engine_rule_activations_total{backend="experta",rule="rule_a"} 1' in text
+    assert 'decision_engine_rule_firings_total{backend="experta",rule="rule_a"} 1' in text
+    assert 'decision_engine_rule_latency_seconds_bucket{backend="experta",rule="rule_a",le="+Inf"} 1' in text
+    assert 'decision_engine_notify_latency_seconds_count{backend="experta"} 1' in text
+    assert 'decision_engine_working_memory_facts{backend="experta"} 7' in text
+
+# Test that label values are escaped, so a drone id cannot break the exposition format
+def test_prometheus_label_escaping():
+    metrics = EngineMetrics()
+    metrics.observe_firing("rule_a", 0.001)
+    text = prometheus_text([(metrics.snapshot(), {"drone": 'a"b\\c\nd'})])
+    assert 'decision_engine_rule_firings_total{drone="a\\"b\\\\c\\nd",rule="rule_a"} 1' in text
+
+# Test that the experta engine counts activations and times firings per rule
+def test_experta_metrics(mocker):
+    mocker.patch('experta_decision_engine.CustomLogger.get_logger')
+    engine = experta_decision_engine.DecisionEngine(instrumented=True)
+    asyncio.run(notify_all(engine))
+    snapshot = engine.metrics_snapshot()
+    assert snapshot["rules"]["battery_state_mild"]["activations"] == 1
+    assert snapshot["rules"]["battery_state_mild"]["firings"] == 1
+    assert snapshot["rules"]["sensor_anomaly_state_critical"]["latency"]["count"] == 1
+    assert snapshot["notify_latency"]["count"] == len(EVENTS)
+    assert snapshot["working_memory_size"] == len(engine.facts)
+
+# Test that the engines record nothing unless instrumented
+def test_uninstrumented_by_default(mocker):
+    mocker.patch('experta_decision_engine.CustomLogger.get_logger')
+    for engine in (experta_decision_engine.DecisionEngine(), clipspy_decision_engine.DecisionEngine()):
+        asyncio.run(notify_all(engine))
+        assert engine.metrics_snapshot() is None
+
+# Test that only the instrumented experta engine times its rule handlers
+def test_experta_rules_timed_when_instrumented(mocker):
+    mocker.patch('experta_decision_engine.CustomLogger.get_logger')
+    engine = experta_decision_engine.DecisionEngine()
+    instrumented = experta_decision_engine.DecisionEngine(instrumented=True)
+    assert type(engine) is experta_decision_engine.DecisionEngine
+    assert isinstance(instrumented, experta_decision_engine.DecisionEngine)
+    assert engine.action_critical.__wrapped__ is experta_decision_engine.DecisionEngine.action_critical.__wrapped__
+    assert instrumented.action_critical.__wrapped__ is not engine.action_critical.__wrapped__
+
+# Test both CLIPS modes: profiling, or stepping with rule_timing
+@pytest.mark.parametrize("rule_timing", [False, True])
+def test_clipspy_metrics(rule_timing):
+    engine = clipspy_decision_engine.DecisionEngine(instrumented=True, rule_timing=rule_timing)
+    asyncio.run(notify_all(engine))
+    snapshot = engine.metrics_snapshot()
+    rule = snapshot["rules"]["sensor_anomaly_state_critical"]
+    assert rule["firings"] == 1
+    assert (rule["activations"] == 1) if rule_timing else (rule["activations"] is None)
+    assert (rule["latency"] is not None) == rule_timing
+    assert snapshot["notify_latency"]["count"] == len(EVENTS)
+    assert snapshot["working_memory_size"] == len(list(engine.env.facts()))
+
+# Test that the exporter serves the metrics over HTTP
+def test_metrics_exporter():
+    engine = clipspy_decision_engine.DecisionEngine(instrumented=True)
+
+    async def scrape():
+        exporter = MetricsExporter(port=0)
+        exporter.add(engine, backend="clipspy")
+        server = await exporter.start()
+        port = server.sockets[0].getsockname()[1]
+        await notify_all(engine)
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(b"GET /metrics HTTP/1.1\r\nHost: localhost\r\n\r\n")
+        response = await reader.read()
+        writer.close()
+        await exporter.stop()
+        return response.decode()
+
+    response = asyncio.run(scrape())
+    assert response.startswith("HTTP/1.1 200 OK")
+    assert 'decision_engine_rule_firings_total{backend="clipspy",rule="battery_state_mild"} 1' in response
@@ -0,0 +1,55 @@
+import asyncio
+import pytest
+from load_generator import BurstRate, ConstantRate, LoadGenerator, RampRate, build_fleet, saturation_point
+
+
+class CountingListener:
+    def __init__(self, delay=0.0):
+        self.received = []
+        self.delay = delay
+
+    async def notify(self, data):
+        self.received.append(data)
+        if self.delay:
+            await asyncio.sleep(self.delay)
+
+# Test the requested rate of each profile
+def test_rate_profiles():
+    assert ConstantRate(100).rate_at(5.0) == 100
+    ramp = RampRate(100, 1100, 10.0)
+    assert ramp.rate_at(0.0) == 100 and ramp.rate_at(5.0) == 600 and ramp.rate_at(20.0) == 1100
+    burst = BurstRate(10, 1000, period=2.0, burst_length=0.5)
+    assert [burst.rate_at(t) for t in (0.1, 1.0, 2.2, 3.9)] == [1000, 10, 1000, 10]
+
+# Test that a fleet built with the same seed produces the same readings
+def test_fleet_is_reproducible():
+    def readings(seed):
+        return [provider.next_reading() for provider in build_fleet(3, seed) for _ in range(5)]
+    assert readings(7) == readings(7)
+    assert readings(7) != readings(8)
+    assert {provider.drone_id for provider in build_fleet(3)} == {"drone-0", "drone-1", "drone-2"}
+
+# Test that the battery levels of a long run stay within 0 and 100 percent
+def test_fleet_battery_stays_in_range():
+    battery_providers = build_fleet(5, seed=3)[::2]
+    percents = [provider.next_reading()["percent"] for provider in battery_providers for _ in range(200)]
+    assert min(percents) == 0.0 and max(percents) == 100.0
+
+# Test that the generator reaches a modest target rate, spreading events over all drones
+def test_generator_reaches_target_rate():
+    listener = CountingListener()
+    providers = build_fleet(4, listeners=[listener])
+    report = asyncio.run(LoadGenerator(providers, ConstantRate(2000), duration=0.5, window=0.25).run())
+    assert report["emitted"] == len(listener.received)
+    assert report["achieved_rate"] == pytest.approx(report["requested_rate"], rel=0.1)
+    assert {data["drone_id"] for data in listener.received} == {f"drone-{index}" for index in range(4)}
+    assert saturation_point(report, tolerance=0.8) is None
+
+# Test that a listener slower than the requested rate shows up as saturation
+def test_generator_reports_saturation():
+    listener = CountingListener(delay=0.002)
+    providers = build_fleet(1, listeners=[listener])
+    report = asyncio.run(LoadGenerator(providers, ConstantRate(5000), duration=0.5, window=0.25).run())
+    assert report["achieved_rate"] < 0.5 * report["requested_rate"]
+    assert report["max_backlog"] > 0
+    assert saturation_point(report) is not None
@@ -0,0 +1,71 @@
+import asyncio
+import logging
+import logging.handlers
+import pytest
+import clipspy_decision_engine
+import experta_decision_engine
+from benchmarks.bench_engines import synthetic_stream
+from partitioned_engine import OverallStateAggregator, PartitionedEngine
+
+
+@pytest.fixture(autouse=True)
+def quiet_loggers(mocker):
+    mocker.patch('experta_decision_engine.CustomLogger.get_logger')
+    mocker.patch('partitioned_engine.CustomLogger.get_logger')
+
+
+def test_aggregator():
+    actions = []
+    aggregator = OverallStateAggregator(on_action=lambda rule_name, state: actions.append(rule_name))
+    aggregator.update("BatteryState", 0)
+    aggregator.update("SensorAnomalyState", 2)
+    aggregator.update("BatteryState", 3)
+    aggregator.update("SensorAnomalyState", 0)  # Battery still critical
+    aggregator.update("BatteryState", 1)
+    assert actions == ["action_normal", "action_severe", "action_critical", "action_mild"]
+    assert aggregator.state_values() == {"BatteryState": 1, "SensorAnomalyState": 0, "OverallState": 1}
+
+# Test that the partitioned engine reaches the same states as the single engine of the backend
+@pytest.mark.parametrize("backend, module", [("experta", experta_decision_engine), ("clipspy", clipspy_decision_engine)])
+def test_matches_single_engine(backend, module):
+    partitioned = PartitionedEngine(backend)
+    single = module.DecisionEngine()
+    for data in synthetic_stream(200, seed=4):
+        for engine in (partitioned, single):
+            engine.apply_event(data)
+            engine.run()
+        # The experta engine only declares a use case state with its first reading
+        declared = {name: value for name, value in single.state_values().items() if value is not None}
+        assert declared.items() <= partitioned.state_values().items()
+
+def test_subsystem_engines_only_hold_their_rules():
+    engine = PartitionedEngine("experta")
+    battery_engine = engine.engines[0]
+    assert {rule.__name__ for rule in battery_engine.get_rules()} == {
+        "battery_state_normal", "battery_state_mild", "battery_state_severe", "battery_state_critical"}
+
+def test_process_mode():
+    actions = []
+
+    async def scenario():
+        engine = PartitionedEngine("clipspy", use_processes=True, on_action=lambda rule_name, state: actions.append(rule_name))
+        engine.start()
+        engine.apply_event({"use_case": "sensor_anomaly", "confidence": 0.6})
+        engine.apply_event({"use_case": "battery_status", "percent": 10.0})
+        await engine.drain()
+        await engine.stop()
+        return engine.state_values()
+
+    assert asyncio.run(scenario()) == {"BatteryState": 3, "SensorAnomalyState": 2, "OverallState": 3}
+    assert actions[-1] == "action_critical"
+
+# Test that the aggregator and the subsystem engines share the single setup of the drone_actions logger
+def test_one_handler_per_role(mocker, tmp_path, monkeypatch):
+    mocker.stopall()
+    monkeypatch.chdir(tmp_path)
+    engine = PartitionedEngine("experta")
+    engine.apply_event({"use_case": "battery_status", "percent": 10.0})
+    engine.run()
+    # pytest attaches its own capture handlers to non-propagating loggers, only count the queue handlers
+    handlers = logging.getLogger("drone_actions").handlers
+    assert sum(isinstance(handler, logging.handlers.QueueHandler) for handler in handlers) == 1
@@ -0,0 +1,83 @@
+import asyncio
+import pytest
+from priority_ingest import PriorityIngest, classify, latency_report
+
+
+class RecordingEngine:
+    """Engine stub recording the payloads it evaluates, critical once a battery reading is at most 25 percent."""
+    def __init__(self, log):
+        self.log = log
+        self.overall_state = 0
+
+    def apply_event(self, data):
+        self.log.append(data)
+        if data["use_case"] == "battery_status":
+            self.overall_state = 3 if data["percent"] <= 25 else 0
+
+    def run(self):
+        pass
+
+    def state_values(self):
+        return {"OverallState": self.overall_state}
+
+
+def queue_all(ingest, payloads):
+    async def scenario():
+        for data in payloads:
+            await ingest.notify(data)
+    asyncio.run(scenario())
+
+
+def test_classify():
+    assert classify({"use_case": "battery_status", "percent": 10.0}) == 3
+    assert classify({"use_case": "sensor_anomaly", "confidence": 0.1}) == 0
+    assert classify({"use_case": "unknown"}) == 0
+
+# Test that the critical reading is served ahead of the routine backlog, and only once
+def test_critical_first():
+    log = []
+    ingest = PriorityIngest(lambda: RecordingEngine(log))
+    routine = [{"use_case": "sensor_anomaly", "confidence": 0.1, "drone_id": drone} for drone in range(5)]
+    critical = {"use_case": "battery_status", "percent": 10.0, "drone_id": 9}
+    queue_all(ingest, routine + [critical])
+    assert ingest.serve() == 6
+    assert log == [critical] + routine
+    assert len(ingest.critical_latencies) == 1
+    assert ingest.stats()["served"] == {"Normal": 5, "Mild": 0, "Severe": 0, "Critical": 1}
+
+def test_arrival_order_baseline():
+    log = []
+    ingest = PriorityIngest(lambda: RecordingEngine(log), prioritized=False)
+    payloads = [{"use_case": "sensor_anomaly", "confidence": 0.1, "drone_id": 1},
+                {"use_case": "battery_status", "percent": 10.0, "drone_id": 2}]
+    queue_all(ingest, payloads)
+    ingest.serve()
+    assert log == payloads
+
+# Test that a newer reading supersedes the pending one, even when it has a lower priority
+def test_superseded_reading():
+    log = []
+    ingest = PriorityIngest(lambda: RecordingEngine(log))
+    queue_all(ingest, [{"use_case": "battery_status", "percent": 10.0, "drone_id": 1},
+                       {"use_case": "battery_status", "percent": 90.0, "drone_id": 1}])
+    assert ingest.serve() == 1
+    assert log == [{"use_case": "battery_status", "percent": 90.0, "drone_id": 1}]
+    assert ingest.stats()["coalesced"] == 1
+
+# Test that a routine reading waiting longer than max_delay goes ahead of the critical ones
+def test_overdue_routine_reading():
+    log = []
+    ingest = PriorityIngest(lambda: RecordingEngine(log), max_delay=0.0)
+    routine = {"use_case": "sensor_anomaly", "confidence": 0.1, "drone_id": 1}
+    critical = {"use_case": "battery_status", "percent": 10.0, "drone_id": 2}
+    queue_all(ingest, [routine, critical])
+    ingest.serve()
+    assert log == [routine, critical]
+
+def test_latency_report():
+    report = latency_report([0.03, 0.01, 0.2, 0.02], target=0.05)
+    assert report["count"] == 4
+    assert report["p50_s"] == 0.02
+    assert report["max_s"] == 0.2
+    assert report["within_target"] == pytest.approx(0.75)
+    assert latency_report([], 0.05)["count"] == 0
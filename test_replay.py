@@ -0,0 +1,73 @@
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import pytest
+from custom_logger import CustomLogger
+from event_recorder import EventRecorder
+from experta_decision_engine import DecisionEngine
+from replay import replay, recorded_transitions
+
+# Record a mission: raw inputs through EventRecorder and the engine's log through CustomLogger,
+# under a role of its own as a role is only set up once per process
+def record_mission(tmp_path, **logger_options):
+    role = f"test_replay_{tmp_path.name}"
+    logger = CustomLogger(role, **logger_options).get_logger()
+    engine = DecisionEngine(logger=logger)
+    recorder = EventRecorder(tmp_path / "recording.jsonl")
+    rng = random.Random(7)
+
+    async def fly():
+        for _ in range(100):
+            data = {"use_case": "battery_status", "percent": rng.uniform(0, 100)}
+            if rng.random() < 0.5:
+                data = {"use_case": "sensor_anomaly", "confidence": rng.random()}
+            await recorder.notify(data)
+            await engine.notify(data)
+
+    asyncio.run(fly())
+    recorder.close()
+    for handler in logger.handlers:
+        handler.flush()
+    return tmp_path / "recording.jsonl", tmp_path / "logs" / f"{role}.log"
+
+@pytest.fixture
+def mission(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return record_mission(tmp_path)
+
+# Test that both backends reproduce the recorded state transitions
+@pytest.mark.parametrize("backend", ["experta", "clipspy"])
+def test_replay_matches_recorded_log(mission, backend):
+    recording, log = mission
+    report = replay(recording, log, backend=backend)
+    assert report["events"] == 100
+    assert report["transitions"] == len(list(recorded_transitions(log))) > 0
+    assert report["mismatches"] == 0
+
+# Test that a diverging log is reported
+def test_replay_reports_mismatches(mission):
+    recording, log = mission
+    lines = log.read_text().splitlines()
+    index = next(i for i, line in enumerate(lines) if "Battery State" in line and "State 3" not in line)
+    lines[index] = lines[index].split("Battery State")[0] + "Battery State 3: Critical"
+    log.write_text("\n".join(lines) + "\n")
+    report = replay(recording, log, backend="experta")
+    assert report["mismatches"] > 0
+    assert report["first_mismatches"][0]["produced"] != report["first_mismatches"][0]["recorded"]
+
+# Test that the transitions logged before the log was rotated are compared too
+def test_replay_reads_rotated_backups(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    recording, log = record_mission(tmp_path, max_bytes=2000, backup_count=50)
+    assert (log.parent / f"{log.name}.1.gz").exists()
+    report = replay(recording, log, backend="experta")
+    assert report["transitions"] == len(list(recorded_transitions(log))) > 0
+    assert report["mismatches"] == 0
+
+# Test that replaying through the experta backend does not need the CLIPS bindings
+def test_replay_without_clips(tmp_path):
+    code = "import sys; sys.modules['clips'] = None; import replay; replay.build_engine('experta')"
+    subprocess.run([sys.executable, "-c", code], check=True, cwd=tmp_path,
+                   env={**os.environ, "PYTHONPATH": os.path.dirname(os.path.abspath(__file__))})
@@ -0,0 +1,135 @@
+import asyncio
+import multiprocessing
+import numpy as np
+import pytest
+from events import as_payload
+from shared_ring import RECORD_DTYPE, USE_CASE_CODES, RingConsumer, RingWriter, SharedRing, drone_number
+
+
+class RecordingEngine:
+    """Engine stand-in recording the applied payloads and the runs."""
+    def __init__(self):
+        self.applied = []
+        self.runs = 0
+
+    def apply_event(self, data):
+        self.applied.append(data)
+
+    def run(self):
+        self.runs += 1
+
+
+@pytest.fixture
+def ring():
+    ring = SharedRing.create(capacity=8)
+    yield ring
+    ring.close()
+    ring.unlink()
+
+
+def records(values, drone=1, use_case="battery_status"):
+    batch = np.zeros(len(values), dtype=RECORD_DTYPE)
+    batch["drone"] = drone
+    batch["use_case"] = USE_CASE_CODES[use_case]
+    batch["value"] = values
+    return batch
+
+# Test that reads are views of the shared memory, wrap around the end and never overrun the consumer
+def test_write_read_wrap_around(ring):
+    assert ring.write_batch(records([1.0, 2.0, 3.0, 4.0, 5.0, 6.0])) == 6
+    batch = ring.read()
+    assert batch["value"].tolist() == [1.0, 2.0, 3.0, 4.0, 5.0, 6.0]
+    assert np.shares_memory(batch, ring.records)
+    ring.release(len(batch))
+
+    assert ring.write_batch(records([7.0, 8.0, 9.0, 10.0, 11.0, 12.0, 13.0, 14.0, 15.0])) == 8
+    assert ring.dropped == 1
+    assert not ring.write(0.0, 1, 0, 16.0)
+    assert ring.read()["value"].tolist() == [7.0, 8.0]
+    ring.release(2)
+    assert ring.read()["value"].tolist() == [9.0, 10.0, 11.0, 12.0, 13.0, 14.0]
+    assert len(ring) == 6
+
+def _produce(name, count):
+    ring = SharedRing.attach(name)
+    written = 0
+    while written < count:
+        if ring.write(0.0, 7, USE_CASE_CODES["sensor_anomaly"], written / count):
+            written += 1
+    ring.close()
+
+# Test the transport between processes, with a producer faster than the ring is large
+def test_records_from_another_process(ring):
+    producer = multiprocessing.Process(target=_produce, args=(ring.name, 100))
+    producer.start()
+    values = []
+    while len(values) < 100:
+        batch = ring.read()
+        values.extend(batch["value"].tolist())
+        ring.release(len(batch))
+    producer.join()
+    assert values == [index / 100 for index in range(100)]
+
+# Test that the consumer applies the latest reading of each drone and use case once per batch
+def test_consumer_coalesces_batches(ring):
+    engines = []
+
+    def engine_factory():
+        engines.append(RecordingEngine())
+        return engines[-1]
+
+    async def publish():
+        writer = RingWriter(ring)
+        await writer.notify({"use_case": "battery_status", "percent": 90.0, "drone_id": "drone-1"})
+        await writer.notify({"use_case": "sensor_anomaly", "confidence": 0.9, "drone_id": "drone-1"})
+        await writer.notify({"use_case": "battery_status", "percent": 80.0, "drone_id": "drone-1"})
+        await writer.notify({"use_case": "battery_status", "percent": 30.0, "drone_id": "drone-2"})
+
+    asyncio.run(publish())
+    consumer = RingConsumer([ring], engine_factory)
+    assert consumer.poll() == 4
+    assert [[as_payload(reading) for reading in engine.applied] for engine in engines] == [
+        [{"use_case": "sensor_anomaly", "confidence": 0.9}, {"use_case": "battery_status", "percent": 80.0}],
+        [{"use_case": "battery_status", "percent": 30.0}],
+    ]
+    assert [engine.runs for engine in engines] == [1, 1]
+    assert set(consumer.engines) == {drone_number("drone-1"), drone_number("drone-2")}
+    assert consumer.stats()["backlog"] == 0 and consumer.stats()["applied"] == 3
+
+# Test that payloads of unknown use cases are skipped instead of failing the provider
+def test_writer_skips_unknown_use_cases(ring):
+    writer = RingWriter(ring)
+    asyncio.run(writer.notify({"use_case": "gps_status", "fix": 3, "drone_id": "drone-1"}))
+    asyncio.run(writer.notify({"use_case": "battery_status", "percent": 50.0, "drone_id": "drone-1"}))
+    assert writer.skipped == 1
+    assert len(ring.read()) == 1
+
+# Test that the ring refuses weakly ordered machines, on which its records could be read before they are complete
+def test_refuses_weakly_ordered_machine(mocker):
+    mocker.patch("shared_ring.platform.machine", return_value="aarch64")
+    with pytest.raises(RuntimeError, match="x86"):
+        SharedRing.create(capacity=8)
+
+# Test that drones sharing a CRC-32 are rejected, and that an explicit table numbers them apart
+def test_writer_rejects_colliding_drones(ring):
+    assert drone_number("drone-29685295") == drone_number("drone-32060020")
+    writer = RingWriter(ring)
+    asyncio.run(writer.notify({"use_case": "battery_status", "percent": 50.0, "drone_id": "drone-29685295"}))
+    with pytest.raises(ValueError, match="share the number"):
+        asyncio.run(writer.notify({"use_case": "battery_status", "percent": 40.0, "drone_id": "drone-32060020"}))
+
+    writer = RingWriter(ring, drone_numbers={"drone-29685295": 1, "drone-32060020": 2})
+    asyncio.run(writer.notify({"use_case": "battery_status", "percent": 40.0, "drone_id": "drone-32060020"}))
+    assert ring.read()["drone"].tolist() == [drone_number("drone-29685295"), 2]
+    with pytest.raises(ValueError, match="number of its own"):
+        RingWriter(ring, drone_numbers={"drone-1": 1, "drone-2": 1})
+
+# Test that records of an unknown use case code are skipped instead of stopping the consumer
+def test_consumer_skips_invalid_codes(ring):
+    engine = RecordingEngine()
+    ring.write(0.0, 1, len(USE_CASE_CODES), 1.0)
+    ring.write(0.0, 1, USE_CASE_CODES["battery_status"], 50.0)
+    consumer = RingConsumer([ring], lambda: engine)
+    assert consumer.poll() == 2
+    assert [as_payload(reading) for reading in engine.applied] == [{"use_case": "battery_status", "percent": 50.0}]
+    assert consumer.stats()["invalid"] == 1 and consumer.stats()["applied"] == 1
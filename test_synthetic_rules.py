@@ -0,0 +1,24 @@
+import pytest
+from benchmarks.synthetic_rules import RULE_SET_ENGINES, rule_count, synthetic_events, synthetic_specs
+
+
+def test_synthetic_specs():
+    specs = synthetic_specs(100, bands=4, seed=1)
+    assert len(specs) == 20
+    assert rule_count(specs) == 100
+    assert synthetic_specs(100, seed=1)["synthetic_00007"].bounds == specs["synthetic_00007"].bounds
+    with pytest.raises(ValueError):
+        synthetic_specs(100, bands=1)
+
+# Test that both backends reach the same overall state over a generated rule set
+def test_backends_agree():
+    specs = synthetic_specs(50, seed=2)
+    engines = [backend(specs) for backend in RULE_SET_ENGINES.values()]
+    for spec, value in synthetic_events(specs, 40, seed=2):
+        states = set()
+        for engine in engines:
+            engine.apply(spec, value)
+            engine.run()
+            states.add(engine.overall_state())
+        assert len(states) == 1
+        assert states.pop() >= spec.classify(value)
@@ -0,0 +1,83 @@
+import asyncio
+import pytest
+from use_cases.use_case_base import UseCaseBase
+
+
+class GatedListener:
+    """Listener that blocks on a gate, to simulate a slow engine or sink."""
+    def __init__(self, open_gate=False):
+        self.gate = asyncio.Event()
+        if open_gate:
+            self.gate.set()
+        self.received = []
+
+    async def notify(self, data):
+        await self.gate.wait()
+        self.received.append(data["seq"])
+
+
+async def publish(provider, seqs):
+    for seq in seqs:
+        await provider.notify_listeners({"use_case": "battery_status", "seq": seq})
+
+
+# Test that a slow listener does not delay the provider or the other listeners
+def test_concurrent_dispatch_isolates_slow_listener():
+    async def scenario():
+        provider = UseCaseBase()
+        slow, fast = GatedListener(), GatedListener(open_gate=True)
+        provider.add_listener(slow)
+        provider.add_listener(fast)
+        provider.configure_dispatch(queue_size=10)
+        await publish(provider, range(5))
+        await asyncio.sleep(0.01)
+        assert fast.received == [0, 1, 2, 3, 4]
+        assert slow.received == []
+        slow.gate.set()
+        await provider.close()
+        assert slow.received == [0, 1, 2, 3, 4]
+
+    asyncio.run(scenario())
+
+# Test the lossy overflow policies when a listener falls behind
+@pytest.mark.parametrize("overflow, expected", [
+    ("drop_oldest", [0, 4, 5]),
+    ("keep_latest", [0, 5]),
+])
+def test_lossy_overflow_policies(overflow, expected):
+    async def scenario():
+        provider = UseCaseBase()
+        listener = GatedListener()
+        provider.add_listener(listener)
+        provider.configure_dispatch(queue_size=2, overflow=overflow)
+        await publish(provider, [0])
+        await asyncio.sleep(0)  # The consumer picks up the first event and waits on the gate
+        await publish(provider, range(1, 6))
+        metrics = provider.listener_metrics()[0]
+        listener.gate.set()
+        await provider.close()
+        assert listener.received == expected
+        assert metrics["dropped"] == 6 - len(expected)
+
+    asyncio.run(scenario())
+
+# Test that the block policy applies back-pressure to the provider
+def test_block_overflow_policy():
+    async def scenario():
+        provider = UseCaseBase()
+        listener = GatedListener()
+        provider.add_listener(listener)
+        provider.configure_dispatch(queue_size=2, overflow="block")
+        publishing = asyncio.ensure_future(publish(provider, range(6)))
+        await asyncio.sleep(0.01)
+        assert not publishing.done()
+        listener.gate.set()
+        await publishing
+        await provider.close()
+        assert listener.received == [0, 1, 2, 3, 4, 5]
+
+    asyncio.run(scenario())
+
+def test_unknown_overflow_policy():
+    with pytest.raises(ValueError):
+        UseCaseBase().configure_dispatch(overflow="drop_newest")
@@ -1,18 +1,41 @@
 import asyncio
+from events import USE_CASE_CODES, Reading
 from .use_case_base import UseCaseBase
 
+BATTERY_STATUS = USE_CASE_CODES["battery_status"]
+
 class BatteryStatusProvider(UseCaseBase):
-    def __init__(self, start_percent=100.0, step=-5.0, interval=2):
-        super().__init__()
+    def __init__(self, start_percent=100.0, step=-5.0, interval=2, drone_id=None, clamp=False):
+        """
+        With ``clamp``, the level stays within 0 and 100 percent when a step overshoots one of them,
+        for callers driving ``advance`` themselves; ``start`` stops on an overshoot otherwise.
+        """
+        super().__init__(drone_id)
         self.battery_percent = start_percent
         self.step = step
         self.interval = interval
+        self.clamp = clamp
+
+    def advance(self):
+        """Advances the simulated battery level by one step and returns it."""
+        percent = self.battery_percent + self.step
+        if self.clamp:
+            percent = min(100.0, max(0.0, percent))
+        self.battery_percent = percent
+        # print(f"Simulated battery level: {self.battery_percent}%")
+        if percent <= 0 or percent >= 100:
+            self.step = -self.step  # Reverse the direction of battery change
+        return percent
+
+    def next_reading(self):
+        """Advances the simulated battery level and returns the payload to publish."""
+        return {"use_case": "battery_status", "percent": self.advance()}
+
+    def next_event(self):
+        """Advances the simulated battery level and returns it as a Reading."""
+        return Reading(BATTERY_STATUS, self.advance(), self.drone_id)
 
     async def start(self):
         while 0 <= self.battery_percent <= 100:
             await asyncio.sleep(self.interval)
-            self.battery_percent += self.step
-            # print(f"Simulated battery level: {self.battery_percent}%")
-            await self.notify_listeners({"use_case": "battery_status", "percent": self.battery_percent})
-            if self.battery_percent <= 0 or self.battery_percent >= 100:
-                self.step = -self.step  # Reverse the direction of battery change
\ No newline at end of file
+            await self.notify_listeners(self.next_event() if self.typed_events else self.next_reading())
@@ -1,22 +1,32 @@
 import asyncio
 import random
+from events import USE_CASE_CODES, Reading
 from .use_case_base import UseCaseBase
 
+SENSOR_ANOMALY = USE_CASE_CODES["sensor_anomaly"]
+
 class SensorAnomalyProvider(UseCaseBase):
-    def __init__(self, interval=2):
-        super().__init__()
+    def __init__(self, interval=2, drone_id=None, seed=None):
+        super().__init__(drone_id)
         self.interval = interval  # Interval between checks in seconds
+        self.random = random.Random(seed)  # Seeded for reproducible runs, unseeded by default
+
+    def next_reading(self):
+        """Returns the payload of the next simulated anomaly check."""
+        confidence = self.random.random()  # Generate a random confidence level between 0 and 1
+
+        # Prepare the data with the confidence factor
+        return {
+            "use_case": "sensor_anomaly",
+            "confidence": confidence,  # Directly provide the confidence level
+            "detail": "Confidence level of anomaly detection."
+        }
+
+    def next_event(self):
+        """Returns the next simulated anomaly check as a Reading, without the constant detail text."""
+        return Reading(SENSOR_ANOMALY, self.random.random(), self.drone_id)
 
     async def start(self):
         while True:
             await asyncio.sleep(self.interval)
-            confidence = random.random()  # Generate a random confidence level between 0 and 1
-            
-            # Prepare the data with the confidence factor
-            data = {
-                "use_case": "sensor_anomaly",
-                "confidence": confidence,  # Directly provide the confidence level
-                "detail": "Confidence level of anomaly detection."
-            }
-
-            await self.notify_listeners(data)
\ No newline at end of file
+            await self.notify_listeners(self.next_event() if self.typed_events else self.next_reading())
@@ -1,12 +1,138 @@
 import asyncio
+import time
+
+# Overflow policies of the concurrent dispatch mode
+BLOCK = "block"               # Wait for room in the listener's queue
+DROP_OLDEST = "drop_oldest"   # Discard the oldest queued event to make room
+KEEP_LATEST = "keep_latest"   # Discard the whole backlog and keep only the newest event
+OVERFLOW_POLICIES = (BLOCK, DROP_OLDEST, KEEP_LATEST)
+
+
+class ListenerChannel:
+    """
+    Bounded queue and consumer task delivering events to a single listener, with lag metrics.
+    """
+    def __init__(self, listener, queue_size, overflow):
+        self.listener = listener
+        self.overflow = overflow
+        self.queue = asyncio.Queue(queue_size)
+        self.task = asyncio.get_running_loop().create_task(self._consume())
+        self.delivered = 0
+        self.dropped = 0
+        self.errors = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.total_lag = 0.0
+
+    async def put(self, data):
+        item = (time.monotonic(), data)
+        if self.overflow == BLOCK or not self.queue.full():
+            await self.queue.put(item)
+            return
+        if self.overflow == DROP_OLDEST:
+            self._discard(1)
+        else:
+            self._discard(self.queue.qsize())
+        self.queue.put_nowait(item)
+
+    def _discard(self, count):
+        for _ in range(count):
+            self.queue.get_nowait()
+            self.queue.task_done()
+            self.dropped += 1
+
+    async def _consume(self):
+        while True:
+            enqueued_at, data = await self.queue.get()
+            lag = time.monotonic() - enqueued_at
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+            self.total_lag += lag
+            try:
+                await self.listener.notify(data)
+            except Exception:
+                # A failing listener must not stop its channel
+                self.errors += 1
+            finally:
+                self.delivered += 1
+                self.queue.task_done()
+
+    def metrics(self):
+        return {
+            "listener": type(self.listener).__name__,
+            "queue_depth": self.queue.qsize(),
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "last_lag": self.last_lag,
+            "max_lag": self.max_lag,
+            "mean_lag": self.total_lag / self.delivered if self.delivered else 0.0,
+        }
+
 
 class UseCaseBase:
-    def __init__(self):
+    def __init__(self, drone_id=None):
         self.listeners = []
+        self.drone_id = drone_id  # Tags every notification when several drones share the listeners
+        self.concurrent = False
+        self.queue_size = 0
+        self.overflow = BLOCK
+        self.channels = {}
+        self.typed_events = False  # Publish Reading objects instead of dicts, see use_typed_events
 
     def add_listener(self, listener):
         self.listeners.append(listener)
 
+    def configure_dispatch(self, concurrent=True, queue_size=100, overflow=BLOCK):
+        """
+        Selects how notifications are delivered to the listeners.
+
+        By default listeners are awaited one after another. In concurrent mode every listener
+        gets a bounded queue of ``queue_size`` events and its own consumer task, so a slow
+        listener does not delay the provider or the other listeners. ``overflow`` decides what
+        happens when a listener's queue is full: ``block``, ``drop_oldest`` or ``keep_latest``.
+        """
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy '{overflow}', expected one of {OVERFLOW_POLICIES}")
+        self.concurrent = concurrent
+        self.queue_size = queue_size
+        self.overflow = overflow
+
+    def use_typed_events(self, typed=True):
+        """
+        Selects whether the provider publishes compact ``events.Reading`` objects, which carry an
+        integer use case code, instead of dicts. Every listener must accept Readings.
+        """
+        self.typed_events = typed
+
     async def notify_listeners(self, data):
+        # Readings are created with the drone id already set
+        if self.drone_id is not None and isinstance(data, dict):
+            data["drone_id"] = self.drone_id
+        if self.concurrent:
+            for listener in self.listeners:
+                await self._channel(listener).put(data)
+            return
         for listener in self.listeners:
-            await listener.notify(data)
\ No newline at end of file
+            await listener.notify(data)
+
+    def _channel(self, listener):
+        channel = self.channels.get(id(listener))
+        if channel is None:
+            channel = self.channels[id(listener)] = ListenerChannel(listener, self.queue_size, self.overflow)
+        return channel
+
+    def listener_metrics(self):
+        """Returns the queue depth, delivered and dropped counts and lag (in seconds) of each listener."""
+        return [channel.metrics() for channel in self.channels.values()]
+
+    async def drain(self):
+        """Waits until every queued notification has been delivered to its listener."""
+        await asyncio.gather(*(channel.queue.join() for channel in self.channels.values()))
+
+    async def close(self):
+        """Delivers the queued notifications and stops the consumer tasks."""
+        await self.drain()
+        for channel in self.channels.values():
+            channel.task.cancel()
+        self.channels = {}